@@ -0,0 +1,202 @@
+# bench_bridge.py
+# ------------------------------------------------------------
+# bridge_server 부하 테스트 (MySQL 없이)
+#   bridge_server.pool의 연결 함수를 SQLite 대체 연결로 바꾸고,
+#   httpx.AsyncClient(ASGITransport)로 동시 클라이언트 N개가 HMI / Unity / PLC 요청을 섞어 보낸다.
+#   DB 왕복 지연(--rtt-ms)과 연결 생성 비용(--connect-ms)은 asyncio.sleep으로 흉내 낸다.
+#
+#   python benchmarks/bench_bridge.py                                   # 200 클라이언트 × 20 요청
+#   python benchmarks/bench_bridge.py --clients 500 --rtt-ms 2 --pool 8
+# ------------------------------------------------------------
+import argparse
+import asyncio
+import os
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+import aiomysql
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bridge_server  # noqa: E402
+from vision_metrics import LatencyHistogram  # noqa: E402
+
+SCHEMA = """
+CREATE TABLE plc_status (
+    plc_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    val INTEGER NOT NULL,
+    ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (plc_id, tag)
+)
+"""
+
+_UPSERT_RE = re.compile(r"ON DUPLICATE KEY UPDATE\s+val\s*=\s*VALUES\(val\)", re.I)
+
+
+def to_sqlite(sql: str) -> str:
+    """bridge_server가 쓰는 MySQL 구문 → SQLite (placeholder / upsert만)"""
+    sql = sql.replace("%s", "?")
+    return _UPSERT_RE.sub("ON CONFLICT(plc_id, tag) DO UPDATE SET val = excluded.val", sql)
+
+
+# ============================================================
+# SQLite 대체 연결 (aiomysql.Connection에서 bridge_server가 쓰는 부분만)
+# ============================================================
+class ShimCursor:
+    def __init__(self, conn, as_dict: bool):
+        self.conn = conn
+        self.as_dict = as_dict
+        self._rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, args=None):
+        await self.conn.roundtrip()
+        cur = self.conn.db.execute(to_sqlite(sql), args or ())
+        rows = cur.fetchall()
+        if self.as_dict and cur.description:
+            names = [d[0] for d in cur.description]
+            rows = [dict(zip(names, r)) for r in rows]
+        self._rows = rows
+
+    async def executemany(self, sql, rows):
+        await self.conn.roundtrip()
+        with self.conn.db:
+            self.conn.db.executemany(to_sqlite(sql), rows)
+
+    async def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    async def fetchall(self):
+        return list(self._rows)
+
+
+class ShimConnection:
+    """
+    모든 연결이 sqlite3 연결 1개를 공유 (이벤트 루프 스레드에서만 접근).
+    SQL 1문장은 await 없이 실행되므로 begin / commit / rollback은 왕복 지연만 흉내 낸다.
+    """
+    def __init__(self, db: sqlite3.Connection, rtt_s: float):
+        self.db = db
+        self.rtt_s = rtt_s
+
+    async def roundtrip(self):
+        await asyncio.sleep(self.rtt_s)
+
+    def cursor(self, cursor_cls=None):
+        return ShimCursor(self, as_dict=cursor_cls is aiomysql.DictCursor)
+
+    async def begin(self):
+        await self.roundtrip()
+
+    async def commit(self):
+        await self.roundtrip()
+
+    async def rollback(self):
+        await self.roundtrip()
+
+    async def ping(self, reconnect=False):
+        await self.roundtrip()
+
+    def close(self):
+        pass
+
+
+# ============================================================
+# 부하
+# ============================================================
+TAGS = [f"M{n}" for n in (0, 100, 101, 102, 103, 200, 201, 202, 203, 300, 301, 302, 303, 400, 401, 500, 600)]
+HEADERS = {"x-api-key": bridge_server.API_KEY}
+
+# (이름, 비율)
+MIX = [
+    ("update", 0.70),           # PLC 단건 상태
+    ("update_many", 0.10),      # StatusPublisher 일괄 전송
+    ("snapshot", 0.15),         # HMI / Unity 폴링
+    ("health", 0.05),
+]
+
+
+async def one_request(client: httpx.AsyncClient, kind: str, rng: random.Random) -> int:
+    if kind == "update":
+        r = await client.post("/status/update", headers=HEADERS,
+                              json={"plc_id": "PLC1", "tag": rng.choice(TAGS), "val": rng.randint(0, 1)})
+    elif kind == "update_many":
+        items = [{"plc_id": "PLC1", "tag": t, "val": rng.randint(0, 1)} for t in rng.sample(TAGS, 7)]
+        r = await client.post("/status/update_many", headers=HEADERS, json={"items": items})
+    elif kind == "snapshot":
+        r = await client.get("/status/snapshot", headers=HEADERS)
+    else:
+        r = await client.get("/health")
+    return r.status_code
+
+
+async def run(args) -> None:
+    db = sqlite3.connect(":memory:", isolation_level=None)
+    db.execute(SCHEMA)
+    rtt_s = args.rtt_ms / 1e3
+
+    async def connect():
+        await asyncio.sleep(args.connect_ms / 1e3)     # TCP + 인증 handshake
+        return ShimConnection(db, rtt_s)
+
+    bridge_server.pool = bridge_server.ConnectionPool(connect, max_size=args.pool, timeout=args.pool_timeout)
+
+    hists = {name: LatencyHistogram() for name, _ in MIX}
+    statuses = {}
+    peak_threads = threading.active_count()
+    names = [name for name, _ in MIX]
+    weights = [w for _, w in MIX]
+
+    async def client_loop(idx: int, client: httpx.AsyncClient):
+        nonlocal peak_threads
+        rng = random.Random(idx)
+        for _ in range(args.requests):
+            kind = rng.choices(names, weights)[0]
+            t0 = time.perf_counter_ns()
+            code = await one_request(client, kind, rng)
+            hists[kind].record(time.perf_counter_ns() - t0)
+            statuses[code] = statuses.get(code, 0) + 1
+            peak_threads = max(peak_threads, threading.active_count())
+
+    transport = httpx.ASGITransport(app=bridge_server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bridge") as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client_loop(i, client) for i in range(args.clients)))
+        elapsed = time.perf_counter() - t0
+
+    total = args.clients * args.requests
+    print(f"clients {args.clients} × {args.requests} req  rtt {args.rtt_ms} ms  connect {args.connect_ms} ms  pool {args.pool}")
+    print(f"{total} requests in {elapsed:.2f} s → {total / elapsed:,.0f} req/s  status {statuses}  peak threads {peak_threads}")
+    print(f"{'endpoint':<12} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, h in hists.items():
+        s = h.stats()
+        if s["count"]:
+            print(f"{name:<12} {s['count']:>6} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} {s['max_ms']:>8.2f}")
+    print("pool", bridge_server.pool.stats())
+    print("rows", db.execute("SELECT COUNT(*) FROM plc_status").fetchone()[0])
+    await bridge_server.pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bridge_server 부하 테스트 (SQLite 대체 DB)")
+    parser.add_argument("--clients", type=int, default=200, help="동시 클라이언트 수")
+    parser.add_argument("--requests", type=int, default=20, help="클라이언트당 요청 수")
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="DB 1왕복 지연 (ms)")
+    parser.add_argument("--connect-ms", type=float, default=20.0, help="DB 연결 생성 비용 (ms)")
+    parser.add_argument("--pool", type=int, default=bridge_server.POOL_SIZE, help="풀 최대 연결 수")
+    parser.add_argument("--pool-timeout", type=float, default=bridge_server.POOL_TIMEOUT)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+# bench_pipeline.py
+# ------------------------------------------------------------
+# 합성 컨베이어 장면으로 비전 파이프라인 단계별 처리량 / 지연 측정 (카메라 / 모델 / GPU 불필요)
+#   camera_stream : CameraStream 리더 스레드 → FrameRingBuffer → get_frame() 큐 지연 / drop 비율
+#   tracking      : _update_tracks (IoU / 칼만) + _finalize 비용, 판정 수 / 정확도
+#   drawing       : ROI / 트랙 그리기 (frame.copy 포함)
+#   pipeline      : CameraStream 2대 + BatchedVision + StubEngine 전체 루프 처리량
+# 모델 비용은 StubEngine(정답 bbox 반환)으로 제외된다.
+#
+#   python benchmarks/bench_pipeline.py                              # → benchmarks/results/latest.json
+#   python benchmarks/bench_pipeline.py --quick --out new.json --compare benchmarks/results/baseline.json
+# ------------------------------------------------------------
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detector import BatchedVision, CameraStream, VisionAI, iou_matrix  # noqa: E402
+from synthetic import SceneRouterEngine, StubEngine, SyntheticCapture, SyntheticConveyor  # noqa: E402
+from vision_metrics import LatencyHistogram  # noqa: E402
+
+try:
+    cv2.utils.logging.setLogLevel(cv2.utils.logging.LOG_LEVEL_ERROR)   # 카메라 없음 경고 숨김
+except AttributeError:
+    pass
+
+SCENES = {
+    "nominal": dict(lanes=1, speed=300.0, gap_s=1.5, n_objects=20),
+    "dense": dict(lanes=4, speed=300.0, gap_s=0.5, n_objects=80),
+    "fast": dict(lanes=1, speed=900.0, gap_s=1.0, n_objects=20),
+}
+
+GOOD = ["Orange_Waper"]
+BAD = ["Brown_Waper"]
+
+
+def make_vision(engine, render: bool = False, motion_model: str | None = None) -> VisionAI:
+    return VisionAI("stub", good_list=GOOD, bad_list=BAD, engine=engine, imgsz=None,
+                    render=render, name="CAM0", motion_model=motion_model)
+
+
+def synthetic_stream(scenes: dict) -> CameraStream:
+    """카메라 대신 SyntheticCapture를 끼운 CameraStream (리더 스레드 / 링버퍼 경로는 실제 코드 그대로)"""
+    cam = CameraStream(list(scenes))
+    for cid, scene in scenes.items():
+        cam.captures[cid].release()
+        cam.captures[cid] = SyntheticCapture(scene)
+    return cam
+
+
+# ============================================================
+# 개별 벤치마크
+# ============================================================
+def bench_camera_stream(scene: SyntheticConveyor, seconds: float) -> dict:
+    """리더 스레드 최대 속도 생산 / 소비자 get_frame() — 큐 지연 = 소비 시점 - capture 시각"""
+    cam = synthetic_stream({0: scene})
+    queue_latency = LatencyHistogram()
+    consumed = 0
+
+    cam.start()
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        frame = cam.get_frame(0, timeout=0.1)
+        if frame is None:
+            continue
+        queue_latency.record(time.perf_counter_ns() - cam.capture_ns(0))
+        consumed += 1
+    elapsed = time.perf_counter() - started
+    cam.stop()
+    produced = cam.buffers[0].seq
+
+    return {
+        "produced_fps": round(produced / elapsed, 1),
+        "consumed_fps": round(consumed / elapsed, 1),
+        "drop_ratio": round(1 - consumed / produced, 3) if produced else 0.0,
+        "queue_latency": queue_latency.stats(),
+        "capture": cam.metrics[0].stats().get("capture", {}),
+    }
+
+
+def bench_tracking(scene: SyntheticConveyor, motion_model: str | None) -> dict:
+    """정답 검출을 매 프레임 넣어 _update_tracks / _finalize 비용과 판정 결과 측정"""
+    vision = make_vision(StubEngine(scene), motion_model=motion_model)
+    vision.prepare(scene.render(0))           # 프레임 크기 / ROI 설정
+
+    # 판정 결과 ↔ 정답 물체: finalize 시점 트랙 bbox와 가장 많이 겹치는 물체
+    frame_index = 0
+    judged = []
+
+    def on_result(r):
+        bbox = vision.tracked_objects[r.object_id].bbox
+        visible = scene.visible(frame_index)
+        if not visible:
+            return
+        iou = iou_matrix([bbox], [b for _, b in visible])[0]
+        judged.append((r, visible[int(iou.argmax())][0]))
+
+    vision.register_callback(on_result)
+
+    finalize_hist = LatencyHistogram()
+    finalize = vision._finalize
+
+    def timed_finalize(obj, out_list):
+        t0 = time.perf_counter_ns()
+        finalize(obj, out_list)
+        finalize_hist.record(time.perf_counter_ns() - t0)
+
+    vision._finalize = timed_finalize
+
+    frame = scene.render(0)
+    frame_ns = int(1e9 / scene.fps)
+    started = time.perf_counter()
+    for frame_index in range(scene.n_frames):
+        vision.process_detections(frame, scene.truth(frame_index), capture_ns=(frame_index + 1) * frame_ns)
+    elapsed = time.perf_counter() - started
+
+    bad_cls = set(BAD)
+    correct = sum(r.is_defective == (obj.cls_name in bad_cls) for r, obj in judged)
+    return {
+        "frames": scene.n_frames,
+        "frames_per_sec": round(scene.n_frames / elapsed, 1),
+        "update_tracks": vision.metrics.stats().get("tracking", {}),
+        "finalize": finalize_hist.stats(),
+        "objects": len(scene.objects),
+        "ids_created": vision.next_object_id,
+        "decisions": len(judged),
+        "objects_decided": len({obj.object_id for _, obj in judged}),
+        "decision_accuracy": round(correct / len(judged), 3) if judged else 0.0,
+        "decision_lead": {k: v for k, v in vision.decision_stats().items() if k in ("ready_at_roi_entry", "late")},
+    }
+
+
+def bench_drawing(scene: SyntheticConveyor, max_frames: int) -> dict:
+    vision = make_vision(StubEngine(scene), render=True)
+    buf = scene.render(0)
+    vision.prepare(buf)
+    for i in range(min(scene.n_frames, max_frames)):
+        scene.render(i, buf)
+        vision.process_detections(buf, scene.truth(i))
+    return {"drawing": vision.metrics.stats().get("drawing", {})}
+
+
+def bench_pipeline(scene_kwargs: dict, seconds: float) -> dict:
+    """카메라 2대 → BatchedVision(카메라별 장면 StubEngine) 최대 속도 — 모델 제외 루프 처리량"""
+    scenes = {cid: SyntheticConveyor(seed=cid, scene_id=cid, **scene_kwargs) for cid in (0, 1)}
+    cam = synthetic_stream(scenes)
+    engine = SceneRouterEngine(list(scenes.values()))
+    visions = {cid: VisionAI("stub", good_list=GOOD, bad_list=BAD, engine=engine, imgsz=None,
+                             render=False, name=f"CAM{cid}", metrics=cam.metrics[cid])
+               for cid in scenes}
+    batch = BatchedVision(engine, visions)
+
+    steps = 0
+    frames = 0
+    cam.start()
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        outputs = batch.step(cam, timeout=0.1)
+        if outputs:
+            steps += 1
+            frames += len(outputs)
+    elapsed = time.perf_counter() - started
+    cam.stop()
+
+    return {
+        "steps_per_sec": round(steps / elapsed, 1),
+        "frames_per_sec": round(frames / elapsed, 1),
+        "stages": {v.name: v.latency_stats() for v in visions.values()},
+    }
+
+
+# ============================================================
+# 결과 저장 / 비교
+# ============================================================
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def _flatten(d: dict, prefix: str = "") -> dict:
+    flat = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            flat.update(_flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            flat[key] = v
+    return flat
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> int:
+    """p50 / p95 지연(ms)과 처리량(fps / per_sec) 변화 출력 → 허용치 넘게 나빠진 항목 수 반환"""
+    cur = _flatten(current["results"])
+    base = _flatten(baseline["results"])
+    regressions = 0
+
+    print(f"\n비교: {baseline['meta'].get('commit', '?')} → {current['meta'].get('commit', '?')} "
+          f"(허용 {tolerance:.0%})")
+    for key in sorted(cur):
+        if key not in base or not base[key]:
+            continue
+        lower_is_better = key.endswith(("p50_ms", "p95_ms"))
+        higher_is_better = key.endswith(("_fps", "_per_sec"))
+        if not (lower_is_better or higher_is_better):
+            continue
+        change = (cur[key] - base[key]) / base[key]
+        worse = change > tolerance if lower_is_better else change < -tolerance
+        regressions += worse
+        mark = "  ⚠️ regression" if worse else ""
+        print(f"  {key:<60} {base[key]:>10} → {cur[key]:>10}  {change:+.1%}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 장면 비전 파이프라인 벤치마크")
+    parser.add_argument("--quick", action="store_true", help="짧게 실행 (장면 물체 수 / 측정 시간 축소)")
+    parser.add_argument("--seconds", type=float, default=3.0, help="camera_stream / pipeline 측정 시간")
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                      "results", "latest.json"))
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="회귀로 볼 변화율")
+    args = parser.parse_args()
+
+    seconds = 1.0 if args.quick else args.seconds
+    scale = 0.25 if args.quick else 1.0
+    scenes = {name: {**kw, "n_objects": max(4, int(kw["n_objects"] * scale))} for name, kw in SCENES.items()}
+
+    results = {}
+    print("camera_stream ...")
+    results["camera_stream"] = bench_camera_stream(SyntheticConveyor(**scenes["nominal"]), seconds)
+
+    for name, kw in scenes.items():
+        for model in (None, "kalman"):
+            label = f"tracking/{name}/{model or 'iou'}"
+            print(f"{label} ...")
+            results[label] = bench_tracking(SyntheticConveyor(**kw), model)
+
+    print("drawing ...")
+    results["drawing"] = bench_drawing(SyntheticConveyor(**scenes["dense"]), 300 if args.quick else 1000)
+
+    print("pipeline ...")
+    results["pipeline"] = bench_pipeline(scenes["nominal"], seconds)
+
+    report = {
+        "meta": {
+            "time": datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+
+    print(f"\n{'benchmark':<28}{'metric':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, res in results.items():
+        for metric in ("queue_latency", "capture", "update_tracks", "finalize", "drawing"):
+            s = res.get(metric)
+            if s and s.get("count"):
+                print(f"{label:<28}{metric:<22}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}")
+        if "decisions" in res:
+            print(f"{'':<28}decisions {res['decisions']} ({res['objects_decided']}/{res['objects']} objects)  "
+                  f"ids {res['ids_created']}  "
+                  f"accuracy {res['decision_accuracy']}")
+    print(f"camera_stream: produced {results['camera_stream']['produced_fps']} fps, "
+          f"consumed {results['camera_stream']['consumed_fps']} fps")
+    print(f"pipeline: {results['pipeline']['frames_per_sec']} frames/s "
+          f"({results['pipeline']['steps_per_sec']} batch steps/s)")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n→ {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
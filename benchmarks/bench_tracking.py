@@ -0,0 +1,100 @@
+# bench_tracking.py
+# ------------------------------------------------------------
+# _update_tracks 매칭 단계 마이크로 벤치마크
+#   기존 방식 : detection마다 모든 track과 _calculate_iou 를 파이썬 루프로 비교
+#   현재 방식 : iou_matrix() 한 번 + assign_detections() 1:1 매칭
+#
+#   python benchmarks/bench_tracking.py [--repeat 200]
+# ------------------------------------------------------------
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detector import iou_matrix, assign_detections  # noqa: E402
+
+
+def legacy_calculate_iou(b1, b2) -> float:
+    x1, y1, x2, y2 = b1
+    X1, Y1, X2, Y2 = b2
+    inter_x1 = max(x1, X1)
+    inter_y1 = max(y1, Y1)
+    inter_x2 = min(x2, X2)
+    inter_y2 = min(y2, Y2)
+
+    if inter_x2 < inter_x1 or inter_y2 < inter_y1:
+        return 0.0
+
+    inter = (inter_x2 - inter_x1) * (inter_y2 - inter_y1)
+    area1 = (x2 - x1) * (y2 - y1)
+    area2 = (X2 - X1) * (Y2 - Y1)
+    return inter / (area1 + area2 - inter)
+
+
+def legacy_match(tracks: dict, detections: list, threshold: float) -> dict:
+    """기존 _update_tracks 의 중첩 루프 (같은 track을 여러 detection이 가져갈 수 있음)"""
+    det_to_track = {}
+    for det_idx, (bbox, _, _) in enumerate(detections):
+        best_id = None
+        best_iou = threshold
+        for oid, track_bbox in tracks.items():
+            iou = legacy_calculate_iou(track_bbox, bbox)
+            if iou > best_iou:
+                best_iou = iou
+                best_id = oid
+        if best_id is not None:
+            det_to_track[det_idx] = best_id
+    return det_to_track
+
+
+def matrix_match(tracks: dict, detections: list, threshold: float, method: str) -> dict:
+    track_ids = list(tracks)
+    iou = iou_matrix([d[0] for d in detections], [tracks[oid] for oid in track_ids])
+    return {d: track_ids[t] for d, t in assign_detections(iou, threshold, method)}
+
+
+def make_scene(n_tracks: int, rng: np.random.Generator):
+    """화면 전체에 흩어진 track n개 + 각 track 근처로 조금 이동한 detection n개"""
+    xy = rng.uniform(0, 600, size=(n_tracks, 2))
+    wh = rng.uniform(30, 60, size=(n_tracks, 2))
+    tracks = {oid: (x, y, x + w, y + h) for oid, ((x, y), (w, h)) in enumerate(zip(xy, wh))}
+
+    shift = rng.normal(0, 3, size=(n_tracks, 2))
+    detections = [
+        ((x1 + dx, y1 + dy, x2 + dx, y2 + dy), "Orange_Waper", 0.9)
+        for (x1, y1, x2, y2), (dx, dy) in zip(tracks.values(), shift)
+    ]
+    return tracks, detections
+
+
+def bench(fn, repeat: int) -> float:
+    fn()    # warm-up: hungarian의 지연 import(scipy.optimize) 등 첫 호출 비용은 측정에서 제외
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IoU 매칭 마이크로 벤치마크")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'tracks':>6} | {'legacy loop':>12} | {'matrix+greedy':>14} | {'matrix+hungarian':>16} | speedup")
+    print("-" * 72)
+
+    for n in (10, 50, 200):
+        tracks, detections = make_scene(n, rng)
+        t_legacy = bench(lambda: legacy_match(tracks, detections, args.threshold), args.repeat)
+        t_greedy = bench(lambda: matrix_match(tracks, detections, args.threshold, "greedy"), args.repeat)
+        t_hung = bench(lambda: matrix_match(tracks, detections, args.threshold, "hungarian"), args.repeat)
+        print(f"{n:>6} | {t_legacy:>9.3f} ms | {t_greedy:>11.3f} ms | {t_hung:>13.3f} ms | x{t_legacy / t_greedy:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# synthetic.py
+# ------------------------------------------------------------
+# 카메라 / 모델 없이 비전 파이프라인을 돌리기 위한 합성 컨베이어 장면
+#   SyntheticConveyor : 640x480 벨트 위를 일정 속도로 지나가는 웨이퍼 모양 blob (클래스 / 위치 정답 포함)
+#   SyntheticCapture  : cv2.VideoCapture 대체 (grab / retrieve(image=) / set / release) → CameraStream에 끼워 넣음
+#   StubEngine        : 프레임에 새겨진 번호로 정답 bbox를 돌려주는 InferenceEngine (모델 비용 0)
+#   SceneRouterEngine : 카메라마다 장면이 다를 때 프레임의 장면 번호로 해당 장면 StubEngine에 전달 (배치 1회)
+#
+# 프레임 번호는 좌상단 픽셀 (0, 0)의 BGR 3바이트, 장면 번호(scene_id)는 (0, 1)의 B 값에 기록된다.
+# StubEngine은 원본 프레임을 받아야 하므로 VisionAI(imgsz=None, roi_crop=False)로 사용할 것.
+# ------------------------------------------------------------
+from __future__ import annotations
+
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import List
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detector import InferenceEngine  # noqa: E402
+
+# 클래스별 (모양, BGR 색)
+CLASS_STYLE = {
+    "Orange_Waper": ("circle", (0, 140, 255)),
+    "Brown_Waper": ("circle", (40, 70, 120)),
+    "Square": ("square", (200, 200, 200)),
+    "Not_Square": ("square", (60, 60, 200)),
+}
+
+
+@dataclass
+class SceneObject:
+    object_id: int
+    cls_name: str
+    lane_y: int
+    enter_t: float      # 화면 왼쪽 끝에 들어오기 시작하는 시각 (초)
+
+
+class SyntheticConveyor:
+    """
+    왼쪽 → 오른쪽으로 speed(px/s)로 이동하는 웨이퍼 n_objects개.
+    lanes개 레인에 gap_s 간격으로 투입, 각 물체 클래스는 bad_ratio 확률로 bad 클래스.
+    frame i 의 시각 = i / fps
+    """
+    def __init__(self, width: int = 640, height: int = 480, fps: float = 30.0, speed: float = 300.0,
+                 size: int = 60, lanes: int = 1, gap_s: float = 1.5, n_objects: int = 20,
+                 good_cls: str = "Orange_Waper", bad_cls: str = "Brown_Waper", bad_ratio: float = 0.2,
+                 conf: float = 0.92, seed: int = 0, scene_id: int = 0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.speed = speed
+        self.size = size
+        self.conf = conf
+        self.scene_id = scene_id
+        self.rng = np.random.default_rng(seed)
+
+        lane_ys = np.linspace(0, height, lanes + 2)[1:-1].astype(int)
+        self.objects: List[SceneObject] = []
+        for i in range(n_objects):
+            cls_name = bad_cls if self.rng.random() < bad_ratio else good_cls
+            self.objects.append(SceneObject(i, cls_name, int(lane_ys[i % lanes]), (i // lanes) * gap_s))
+
+        # 마지막 물체가 화면을 빠져나가는 프레임까지
+        self.n_frames = int(((self.objects[-1].enter_t if self.objects else 0)
+                             + (width + size) / speed) * fps) + 1
+
+        self._belt = np.full((height, width, 3), 90, dtype=np.uint8)
+        self._belt[:, :, 1] = 95
+        for y in lane_ys:
+            cv2.line(self._belt, (0, int(y) - size), (width, int(y) - size), (70, 70, 70), 2)
+
+    def visible(self, index: int) -> List[tuple]:
+        """frame index에 보이는 물체 [(SceneObject, bbox), ...] — 폭 1/4 미만으로 걸친 물체는 제외"""
+        t = index / self.fps
+        out = []
+        for obj in self.objects:
+            x1 = -self.size + (t - obj.enter_t) * self.speed
+            bx1, bx2 = max(0.0, x1), min(float(self.width), x1 + self.size)
+            if bx2 - bx1 < self.size / 4:
+                continue
+            y1 = obj.lane_y - self.size / 2
+            out.append((obj, (bx1, y1, bx2, y1 + self.size)))
+        return out
+
+    def truth(self, index: int) -> List[tuple]:
+        """frame index의 정답 [(bbox, cls_name, conf), ...]"""
+        return [(bbox, obj.cls_name, self.conf) for obj, bbox in self.visible(index)]
+
+    def render(self, index: int, into: np.ndarray | None = None) -> np.ndarray:
+        frame = into if into is not None and into.shape == self._belt.shape else np.empty_like(self._belt)
+        np.copyto(frame, self._belt)
+        for (x1, y1, x2, y2), cls_name, _ in self.truth(index):
+            shape, color = CLASS_STYLE.get(cls_name, ("square", (255, 255, 255)))
+            if shape == "circle":
+                cx = int(x2 - self.size / 2) if x1 <= 0 else int(x1 + self.size / 2)
+                cv2.circle(frame, (cx, int((y1 + y2) / 2)), self.size // 2, color, -1)
+            else:
+                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), color, -1)
+        frame[0, 0] = (index & 0xFF, (index >> 8) & 0xFF, (index >> 16) & 0xFF)
+        frame[0, 1] = (self.scene_id, 0, 0)
+        return frame
+
+    @staticmethod
+    def frame_index(frame: np.ndarray) -> int:
+        b, g, r = (int(v) for v in frame[0, 0])
+        return b | (g << 8) | (r << 16)
+
+    @staticmethod
+    def frame_scene(frame: np.ndarray) -> int:
+        return int(frame[0, 1, 0])
+
+
+class SyntheticCapture:
+    """CameraStream.captures[cid] 대체 — realtime=True면 fps 간격으로 grab() 대기"""
+    def __init__(self, scene: SyntheticConveyor, realtime: bool = False, loop: bool = True):
+        self.scene = scene
+        self.realtime = realtime
+        self.loop = loop
+        self.index = -1
+        self._next_time = time.monotonic()
+
+    def set(self, prop, value) -> bool:
+        return True
+
+    def get(self, prop) -> float:
+        return self.scene.fps if prop == cv2.CAP_PROP_FPS else 0.0
+
+    def grab(self) -> bool:
+        if self.index + 1 >= self.scene.n_frames:
+            if not self.loop:
+                time.sleep(0.001)
+                return False
+            self.index = -1
+        if self.realtime:
+            self._next_time += 1.0 / self.scene.fps
+            delay = self._next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.index += 1
+        return True
+
+    def retrieve(self, image: np.ndarray | None = None):
+        return True, self.scene.render(self.index, image)
+
+    def read(self, image: np.ndarray | None = None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def release(self) -> None:
+        pass
+
+
+class StubEngine(InferenceEngine):
+    """프레임 번호 → 정답 bbox (추론 비용 없이 트래킹 / 판정 / 그리기만 측정)"""
+    def __init__(self, scene: SyntheticConveyor, conf: float = 0.85):
+        super().__init__(conf)
+        self.scene = scene
+        self.calls = 0
+
+    def infer(self, frames: list) -> List[List[tuple]]:
+        self.calls += 1
+        return [self.scene.truth(SyntheticConveyor.frame_index(f)) for f in frames]
+
+
+class SceneRouterEngine(InferenceEngine):
+    """
+    BatchedVision용 — 카메라별 장면(scene_id가 서로 다른 SyntheticConveyor)을 엔진 1개로 배치 추론.
+    각 프레임은 자기 장면의 StubEngine 정답으로 채점된다.
+    """
+    def __init__(self, scenes: List[SyntheticConveyor], conf: float = 0.85):
+        super().__init__(conf)
+        self.engines = {scene.scene_id: StubEngine(scene, conf) for scene in scenes}
+        if len(self.engines) != len(scenes):
+            raise ValueError("scene_id must be unique per scene")
+        self.calls = 0
+
+    def infer(self, frames: list) -> List[List[tuple]]:
+        self.calls += 1
+        return [self.engines[SyntheticConveyor.frame_scene(f)].infer([f])[0] for f in frames]
@@ -1,11 +1,14 @@
 import asyncio
 import os
 import time
-from typing import Optional
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
-from fastapi import FastAPI, Body, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Body, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-import pymysql
+import aiomysql
 
 # =========================
 # CONFIG
@@ -17,19 +20,317 @@ MYSQL_USER = os.getenv("MYSQL_USER", "cimondb")
 MYSQL_PASS = os.getenv("MYSQL_PASS", "cimonedu1234")
 MYSQL_DB   = os.getenv("MYSQL_DB", "examen")
 
-app = FastAPI(title="PLC Bridge API", version="1.0.0")
-started_at = time.time()
+# 커넥션 풀
+POOL_SIZE         = int(os.getenv("MYSQL_POOL_SIZE", "8"))            # 최대 동시 연결 수
+POOL_TIMEOUT      = float(os.getenv("MYSQL_POOL_TIMEOUT", "5"))       # 빈 연결 대기 한도 (초) → 초과 시 503
+POOL_MAX_LIFETIME = float(os.getenv("MYSQL_POOL_MAX_LIFETIME", "1800"))  # 이보다 오래된 연결은 새로 만듦 (초)
+POOL_PING_IDLE    = float(os.getenv("MYSQL_POOL_PING_IDLE", "30"))    # 이만큼 쉬었던 연결은 꺼내기 전에 ping (초)
+
+# /status/ws 구독자별 미전송 메시지 한도 → 넘으면 밀린 diff를 버리고 snapshot으로 재동기화
+WS_QUEUE_SIZE = int(os.getenv("BRIDGE_WS_QUEUE_SIZE", "256"))
 
 
-def get_conn():
-    return pymysql.connect(
+async def get_conn():
+    return await aiomysql.connect(
         host=MYSQL_HOST, port=MYSQL_PORT,
-        user=MYSQL_USER, password=MYSQL_PASS, database=MYSQL_DB,
+        user=MYSQL_USER, password=MYSQL_PASS, db=MYSQL_DB,
         charset="utf8mb4",
         autocommit=True
     )
 
 
+# =========================
+# DB connection pool
+# =========================
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    aiomysql 연결 풀 (이벤트 루프 1개 공용, 스레드풀 사용 X).
+    - 최대 max_size개, 모두 사용 중이면 timeout초까지 대기 후 PoolTimeout
+    - 대기자는 FIFO: 반납된 연결은 새 요청보다 먼저 기다리던 요청에 바로 넘김
+    - max_lifetime 지난 연결은 폐기 후 재생성, ping_idle 이상 쉰 연결은 ping으로 확인
+    - 사용 중 연결 오류(OperationalError / InterfaceError), 취소, rollback 실패 시 폐기
+    connect: 연결을 만드는 코루틴 함수 (기본 get_conn, 부하 테스트에서는 SQLite 대체 연결)
+    """
+    def __init__(self, connect, max_size=8, timeout=5.0, max_lifetime=1800.0, ping_idle=30.0):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_idle = ping_idle
+
+        self._idle = []             # [conn, created, last_used]
+        self._waiters = deque()     # Future → [conn, ...] 또는 None(새 연결을 만들 자리)
+        self._size = 0              # 열린 연결 수 (idle + in_use + 생성 중)
+        self._in_use = 0
+        self._waits = 0
+        self._wait_s_total = 0.0
+        self._wait_s_max = 0.0
+        self._created = 0
+        self._recycled = 0
+        self._errors = 0
+
+    def _handoff(self, entry) -> bool:
+        """첫 대기자에게 entry(None = 새 연결 자리) 전달 → 대기자가 없으면 False"""
+        if not self._waiters:
+            return False
+        self._waiters.popleft().set_result(entry)
+        return True
+
+    async def _acquire(self):
+        # 이벤트 루프 스레드 1개에서만 호출되므로 await 전까지는 잠금 없이 안전
+        if self._idle and not self._waiters:
+            entry = self._idle.pop()        # 최근 사용한 연결 우선 (오래 쉰 연결은 자연히 만료)
+        elif self._size < self.max_size and not self._waiters:
+            self._size += 1
+            entry = None
+        else:
+            entry = await self._wait()
+        self._in_use += 1
+
+        now = time.monotonic()
+        if entry is not None:
+            if now - entry[1] > self.max_lifetime:
+                self._close(entry[0])
+                entry = None
+            elif now - entry[2] > self.ping_idle:
+                try:
+                    await entry[0].ping(reconnect=False)
+                except Exception:
+                    self._close(entry[0])
+                    entry = None
+                except BaseException:
+                    # ping 중 취소 → 응답 상태를 알 수 없으므로 폐기하고 자리 반납
+                    self._errors += 1
+                    self._close(entry[0])
+                    self._discard_slot()
+                    raise
+        if entry is None:
+            try:
+                entry = [await self._connect(), now, now]
+            except BaseException:
+                self._errors += 1
+                self._discard_slot()
+                raise
+            self._created += 1
+        return entry
+
+    async def _wait(self):
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self._waits += 1
+        t0 = time.perf_counter()
+        try:
+            return await asyncio.wait_for(asyncio.shield(fut), self.timeout)
+        except BaseException as e:
+            if fut.done():
+                # 시간 초과 / 취소와 동시에 넘겨받은 연결
+                if isinstance(e, asyncio.TimeoutError):
+                    return fut.result()
+                self._in_use += 1
+                if fut.result() is None:
+                    self._discard_slot()
+                else:
+                    self._give_back(fut.result())
+            else:
+                fut.cancel()
+                self._waiters.remove(fut)
+            if isinstance(e, asyncio.TimeoutError):
+                raise PoolTimeout(f"no free DB connection within {self.timeout}s") from None
+            raise
+        finally:
+            waited = time.perf_counter() - t0
+            self._wait_s_total += waited
+            self._wait_s_max = max(self._wait_s_max, waited)
+
+    def _discard_slot(self):
+        """사용 중이던 자리 1개 반납 (연결은 이미 닫힘) → 대기자가 있으면 새로 만들 자리로 넘김"""
+        self._in_use -= 1
+        if not self._handoff(None):
+            self._size -= 1
+
+    def _give_back(self, entry):
+        entry[2] = time.monotonic()
+        self._in_use -= 1
+        if not self._handoff(entry):
+            self._idle.append(entry)
+
+    def _close(self, conn):
+        self._recycled += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def connection(self):
+        entry = await self._acquire()
+        broken = False
+        try:
+            yield entry[0]
+        except BaseException as e:
+            # 취소(클라이언트 끊김 등)는 응답을 다 읽지 못한 상태일 수 있으므로 폐기
+            broken = not isinstance(e, Exception) or isinstance(
+                e, (aiomysql.OperationalError, aiomysql.InterfaceError))
+            if not broken:
+                try:
+                    await entry[0].rollback()
+                except Exception:
+                    broken = True
+            raise
+        finally:
+            if broken:
+                self._errors += 1
+                self._close(entry[0])
+                self._discard_slot()
+            else:
+                self._give_back(entry)
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        self._size -= len(idle)
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        return {
+            "size": self._size,
+            "max_size": self.max_size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "waiting": len(self._waiters),
+            "waits": self._waits,
+            "wait_ms_total": round(self._wait_s_total * 1e3, 2),
+            "wait_ms_max": round(self._wait_s_max * 1e3, 2),
+            "created": self._created,
+            "recycled": self._recycled,
+            "errors": self._errors,
+        }
+
+
+pool = ConnectionPool(get_conn, max_size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                      max_lifetime=POOL_MAX_LIFETIME, ping_idle=POOL_PING_IDLE)
+
+
+# =========================
+# status change hub (/status/ws)
+# =========================
+def _status_val(val):
+    """plc_status.val(INT) 비교용 정규화 — DB 드라이버가 Decimal / str로 돌려줘도 요청 값(int)과 같게 비교"""
+    try:
+        return int(val)
+    except (TypeError, ValueError):
+        return val
+
+
+class StatusHub:
+    """
+    태그 상태 변경 브로드캐스트 (프로세스 내, 이벤트 루프 1개).
+    - state: (plc_id, tag) → 마지막 값. publish()는 값이 바뀐 태그만 모아 diff 메시지 1개로 전달
+    - 구독자마다 bounded 큐 (max_queue). 가득 차면(느린 클라이언트) 밀린 diff를 버리고
+      재동기화 표시(None)만 남김 → 다음 전송 때 전체 snapshot을 보냄
+    - state는 첫 구독 때 DB(plc_status)에서 채움 (그 사이 들어온 변경이 우선)
+    - 값은 컬럼 타입(int)으로 맞춰 저장 / 비교 → 같은 값이 타입만 달라 diff로 나가지 않음
+    """
+    def __init__(self, max_queue=256):
+        self.max_queue = max_queue
+        self.state = {}
+        self.loaded = False
+        self.seq = 0
+        self._subs = set()
+        self._published = 0
+        self._dropped = 0
+        self._resyncs = 0
+
+    async def ensure_loaded(self):
+        if self.loaded:
+            return
+        try:
+            async with pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute("SELECT plc_id, tag, val FROM plc_status")
+                    rows = await cur.fetchall()
+        except Exception as e:
+            print(f"[StatusHub] 초기 상태 읽기 실패: {e}")
+            return
+        for plc_id, tag, val in rows:
+            self.state.setdefault((plc_id, tag), _status_val(val))
+        self.loaded = True
+
+    def snapshot(self):
+        return {
+            "type": "snapshot",
+            "seq": self.seq,
+            "rows": [{"plc_id": plc_id, "tag": tag, "val": val}
+                     for (plc_id, tag), val in sorted(self.state.items())],
+        }
+
+    def subscribe(self) -> asyncio.Queue:
+        sub = asyncio.Queue(maxsize=self.max_queue)
+        self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: asyncio.Queue):
+        self._subs.discard(sub)
+
+    def publish(self, rows):
+        """rows: [(plc_id, tag, val), ...] — DB 반영 후 호출. 바뀐 태그 수 반환"""
+        changed = []
+        for plc_id, tag, val in rows:
+            val = _status_val(val)
+            if self.state.get((plc_id, tag)) != val:
+                self.state[(plc_id, tag)] = val
+                changed.append({"plc_id": plc_id, "tag": tag, "val": val})
+        if not changed:
+            return 0
+
+        self.seq += 1
+        self._published += 1
+        msg = {"type": "diff", "seq": self.seq, "rows": changed}
+        for sub in self._subs:
+            try:
+                sub.put_nowait(msg)
+            except asyncio.QueueFull:
+                # 느린 클라이언트 — 밀린 diff 폐기, snapshot 재전송 표시
+                while not sub.empty():
+                    sub.get_nowait()
+                    self._dropped += 1
+                sub.put_nowait(None)
+                self._resyncs += 1
+        return len(changed)
+
+    def stats(self):
+        return {
+            "clients": len(self._subs),
+            "tags": len(self.state),
+            "seq": self.seq,
+            "published": self._published,
+            "dropped": self._dropped,
+            "resyncs": self._resyncs,
+        }
+
+
+hub = StatusHub(max_queue=WS_QUEUE_SIZE)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await pool.close()
+
+
+app = FastAPI(title="PLC Bridge API", version="1.0.0", lifespan=lifespan)
+started_at = time.time()
+
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    return JSONResponse(status_code=503, content={"ok": False, "detail": str(exc)})
+
+
 def auth(x_api_key: Optional[str]):
     if x_api_key != API_KEY:
         raise HTTPException(status_code=401, detail="Unauthorized")
@@ -43,25 +344,36 @@ class OrderInsert(BaseModel):
     qty: int
 
 
+class StatusItem(BaseModel):
+    plc_id: str
+    tag: str
+    val: int
+
+
+class StatusBatch(BaseModel):
+    items: List[StatusItem]
+
+
 # =========================
 # Health check
 # =========================
 @app.get("/health")
-def health():
+async def health():
     """
     서버 살아있나 확인용.
     - ok: True
     - uptime_sec: 서버 가동 시간
     - mysql_ok: DB 연결 가능 여부
+    - pool: 커넥션 풀 상태 (in_use, waits, wait_ms_total / max, recycled ...)
+    - ws: /status/ws 구독자 수 / diff 발행 / 느린 클라이언트 폐기 수
     """
     mysql_ok = False
     err = None
     try:
-        conn = get_conn()
-        with conn.cursor() as cur:
-            cur.execute("SELECT 1;")
-            cur.fetchone()
-        conn.close()
+        async with pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT 1;")
+                await cur.fetchone()
         mysql_ok = True
     except Exception as e:
         err = str(e)
@@ -71,6 +383,8 @@ def health():
         "uptime_sec": int(time.time() - started_at),
         "mysql_ok": mysql_ok,
         "mysql_error": err,
+        "pool": pool.stats(),
+        "ws": hub.stats(),
     }
 
 
@@ -79,7 +393,7 @@ def health():
 # (CIMON이 DB에 직접 insert하는 대신 API로 insert도 가능)
 # =========================
 @app.post("/orders")
-def insert_order(payload: OrderInsert, x_api_key: Optional[str] = Header(None)):
+async def insert_order(payload: OrderInsert, x_api_key: Optional[str] = Header(None)):
     auth(x_api_key)
 
     if payload.qty < 0:
@@ -87,43 +401,45 @@ def insert_order(payload: OrderInsert, x_api_key: Optional[str] = Header(None)):
 
     sql = "INSERT INTO order (order_id, qty) VALUES (%s, %s, NOW())"
 
-    conn = get_conn()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(sql, (payload.name, payload.qty))
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, (payload.name, payload.qty))
         return {"ok": True}
-    finally:
-        conn.close()
 
 
 # =========================
 # status read
 # =========================
 @app.get("/status/read")
-def read_status(x_api_key: Optional[str] = Header(None)):
+async def read_status(x_api_key: Optional[str] = Header(None)):
     auth(x_api_key)
 
     # 예시 테이블: plc_status(plc_id, tag, val)
-    conn = get_conn()
-    try:
-        with conn.cursor(pymysql.cursors.DictCursor) as cur:
-            cur.execute("""
+    async with pool.connection() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute("""
                 SELECT plc_id, tag, val
                 FROM plc_status
                 ORDER BY ts DESC
                 LIMIT 200
             """)
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
         return {"ok": True, "rows": rows}
-    finally:
-        conn.close()
 
 
 # =========================
 # status update
 # =========================
+UPSERT_STATUS_SQL = """
+    INSERT INTO plc_status (plc_id, tag, val)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        val = VALUES(val)
+"""
+
+
 @app.post("/status/update")
-def update_plc_status(
+async def update_plc_status(
     plc_id: str = Body(...),
     tag: str = Body(...),
     val: int = Body(...),
@@ -131,55 +447,93 @@ def update_plc_status(
 ):
     auth(x_api_key)
 
-    conn = get_conn()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO plc_status (plc_id, tag, val)
-                VALUES (%s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    val = VALUES(val)
-            """, (plc_id, tag, val))
-
-        conn.commit()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(UPSERT_STATUS_SQL, (plc_id, tag, val))
+
+        await conn.commit()
+        hub.publish([(plc_id, tag, val)])
         return {
             "ok": True,
             "plc_id": plc_id,
             "tag": tag,
             "val": val
         }
-    finally:
-        conn.close()
+
+
+@app.post("/status/update_many")
+async def update_plc_status_many(payload: StatusBatch, x_api_key: Optional[str] = Header(None)):
+    """
+    여러 태그 상태를 한 번에 upsert (plc_conn.StatusPublisher가 사용).
+    - 같은 (plc_id, tag)가 여러 번 오면 마지막 값만 반영
+    - executemany 1회 / 트랜잭션 1개
+    """
+    auth(x_api_key)
+
+    latest = {}
+    for item in payload.items:
+        latest[(item.plc_id, item.tag)] = item.val
+    rows = [(plc_id, tag, val) for (plc_id, tag), val in latest.items()]
+    if not rows:
+        return {"ok": True, "count": 0}
+
+    async with pool.connection() as conn:
+        await conn.begin()          # 실패 시 pool.connection()이 rollback
+        async with conn.cursor() as cur:
+            await cur.executemany(UPSERT_STATUS_SQL, rows)
+        await conn.commit()
+        hub.publish(rows)
+        return {"ok": True, "count": len(rows)}
+
 
 @app.get("/status/snapshot")
-def status_snapshot(x_api_key: Optional[str] = Header(None)):
+async def status_snapshot(x_api_key: Optional[str] = Header(None)):
     auth(x_api_key)
 
-    conn = get_conn()
-    try:
-        with conn.cursor(pymysql.cursors.DictCursor) as cur:
-            cur.execute("""
+    async with pool.connection() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cur:
+            await cur.execute("""
                 SELECT plc_id, tag, val
                 FROM plc_status
                 ORDER BY plc_id, tag
             """)
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
         return {"ok": True, "rows": rows}
-    finally:
-        conn.close()
+
 
 @app.websocket("/status/ws")
 async def websocket_endpoint(ws: WebSocket):
+    """
+    태그 상태 push (Unity 디지털 트윈).
+    - 접속 직후 {"type": "snapshot", "seq", "rows": [{plc_id, tag, val}, ...]}
+    - 이후 값이 바뀔 때마다 {"type": "diff", "seq", "rows": [바뀐 태그만]}
+    - 수신이 밀려 큐가 넘치면 밀린 diff 대신 snapshot을 다시 보냄
+    seq는 diff마다 1씩 증가 — snapshot의 seq 이하인 diff는 이미 반영된 내용
+    """
     await ws.accept()
-    try:
+    await hub.ensure_loaded()
+    sub = hub.subscribe()
+
+    async def sender():
+        await ws.send_json(hub.snapshot())
         while True:
-            result = {
-                "plc_id": "PLC1",
-                "tag": "M0",
-                "val": "1"
-            }
-
-            await ws.send_json(result)
-            await asyncio.sleep(0.5)
-    except WebSocketDisconnect:
-        print("Unity 연결 종료")
\ No newline at end of file
+            msg = await sub.get()
+            await ws.send_json(hub.snapshot() if msg is None else msg)
+
+    async def receiver():
+        # 클라이언트 메시지는 쓰지 않음 — 연결 종료 감지용
+        while (await ws.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.create_task(sender()), asyncio.create_task(receiver())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        hub.unsubscribe(sub)
+        print("Unity 연결 종료")
@@ -0,0 +1,109 @@
+# decision_policy.py
+# ------------------------------------------------------------
+# 객체 1개의 양/불 판정 정책 (카메라 / 제품별 YAML 설정)
+#
+#   method: ratio  — min_detections개 이상 모인 뒤 good confidence 비율 >= good_ratio 이면 Good (기존 방식)
+#   method: sprt   — 순차 확률비 검정: 프레임마다 log-likelihood ratio 누적,
+#                    경계(alpha / beta)를 넘는 순간 판정 (확실하면 sprt_min_frames 프레임 만에 결정)
+#                    min_detections까지 결정되지 않으면 ratio 방식으로 판정
+#
+# 설정 우선순위 : default < products[good 클래스 이름] < cameras[카메라 이름]
+# ------------------------------------------------------------
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass, field, fields
+from typing import Iterable
+
+import yaml
+
+
+@dataclass
+class DecisionPolicy:
+    method: str = "ratio"             # "ratio" | "sprt"
+    conf: float = 0.85                # 이 confidence 미만 검출은 판정에 쓰지 않음
+    min_detections: int = 15          # ratio 판정에 필요한 검출 수
+    good_ratio: float = 0.7
+    min_frames_for_decision: int = 10 # 이보다 짧게 보였다 사라진 트랙은 노이즈로 삭제
+    max_missing_times: int = 30       # 연속 미검출 허용 (카메라 프레임 기준, 추론 생략 프레임 포함)
+
+    # sprt — p_good : Good 물체에서 한 프레임이 good 클래스로 나올 확률
+    #        p_bad  : Bad 물체에서 한 프레임이 good 클래스로 나올 확률
+    #        alpha / beta : Bad를 Good으로 / Good을 Bad로 판정할 허용 오류율
+    p_good: float = 0.95
+    p_bad: float = 0.05
+    alpha: float = 0.001
+    beta: float = 0.001
+    sprt_min_frames: int = 5
+
+    _llr_good: float = field(init=False, repr=False, default=0.0)
+    _llr_bad: float = field(init=False, repr=False, default=0.0)
+    _upper: float = field(init=False, repr=False, default=0.0)
+    _lower: float = field(init=False, repr=False, default=0.0)
+
+    def __post_init__(self):
+        if self.method not in ("ratio", "sprt"):
+            raise ValueError(f"unknown decision method: {self.method}")
+        if not 0 < self.p_bad < self.p_good < 1:
+            raise ValueError("sprt requires 0 < p_bad < p_good < 1")
+
+        # good 클래스 1프레임 / 그 외 클래스 1프레임의 log-likelihood ratio (H1 = Good, H0 = Bad)
+        self._llr_good = math.log(self.p_good / self.p_bad)
+        self._llr_bad = math.log((1 - self.p_good) / (1 - self.p_bad))
+        # Wald 경계
+        self._upper = math.log((1 - self.beta) / self.alpha)
+        self._lower = math.log(self.beta / (1 - self.alpha))
+
+    @property
+    def ready_frames(self) -> int:
+        """판정을 시도할 최소 검출 수"""
+        return self.sprt_min_frames if self.method == "sprt" else self.min_detections
+
+    def llr_step(self, is_good_cls: bool, conf: float) -> float:
+        """검출 1개의 LLR 기여분 (confidence로 가중)"""
+        return conf * (self._llr_good if is_good_cls else self._llr_bad)
+
+    def decide(self, frame_count: int, good_score: float, total_score: float,
+               llr: float) -> tuple[bool, float] | None:
+        """누적 통계로 판정 → (is_good, 평균 confidence) 또는 아직 미정이면 None"""
+        if frame_count == 0 or total_score == 0:
+            return None
+        avg_conf = total_score / frame_count
+
+        if self.method == "sprt" and frame_count >= self.sprt_min_frames:
+            if llr >= self._upper:
+                return True, avg_conf
+            if llr <= self._lower:
+                return False, avg_conf
+
+        if frame_count < self.min_detections:
+            return None
+        return (good_score / total_score) >= self.good_ratio, avg_conf
+
+
+def load_policy(path: str | None, camera: str = "", good_list: Iterable[str] = ()) -> DecisionPolicy:
+    """
+    YAML에서 카메라 / 제품 정책 읽기 (파일이 없거나 path=None이면 기본값 = 기존 하드코딩 값)
+
+        default:  {method: ratio, conf: 0.85, ...}
+        products: {Orange_Waper: {method: sprt, sprt_min_frames: 5}}
+        cameras:  {CAM1: {good_ratio: 0.8}}
+    """
+    if not path or not os.path.exists(path):
+        return DecisionPolicy()
+
+    with open(path, encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+
+    merged = dict(config.get("default") or {})
+    products = config.get("products") or {}
+    for cls_name in good_list:
+        merged.update(products.get(cls_name) or {})
+    merged.update((config.get("cameras") or {}).get(camera) or {})
+
+    known = {f.name for f in fields(DecisionPolicy) if f.init}
+    unknown = set(merged) - known
+    if unknown:
+        raise ValueError(f"{path}: unknown decision policy keys {sorted(unknown)}")
+    return DecisionPolicy(**merged)
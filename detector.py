@@ -2,19 +2,34 @@
 # ------------------------------------------------------------
 from __future__ import annotations
 
-from ultralytics import YOLO
+import abc
+import ast
+import json
+import os
+import queue
 import cv2
+import numpy as np
 import threading
-from queue import Queue
+import time
+import yaml
+from collections import deque
 from datetime import datetime
 from dataclasses import dataclass, field
 from typing import List, Callable, Dict
 
+from decision_policy import DecisionPolicy, load_policy
+from result_store import ResultStore
+from vision_metrics import DecisionLead, FrameTrace, MetricsReporter, StageRecorder, e2e_tracer
+
+# ultralytics / torch / onnxruntime / openvino 는 선택한 엔진에서만 import (시작 시간 단축)
+
 
 # ----------------------------------------
 # 설정
 # ----------------------------------------
+# .pt (PyTorch) / .onnx (ONNX Runtime) / *_openvino_model 폴더 또는 .xml (OpenVINO) 모두 가능
 model_path = "./yolov8/dataset/weights/best.pt"
+dataset_yaml = "./yolov8/dataset/data.yaml"   # 모델 메타데이터에 클래스 이름이 없을 때 사용
 # 카메라별 Good / Bad 기준
 good_prod0 = ["Orange_Waper"]
 bad_prod0  = ["Brown_Waper"]
@@ -23,15 +38,98 @@ good_prod1 = ["Square"]
 bad_prod1  = ["Not_Square"]
 
 
+# ============================================================
+#  FrameRingBuffer — 카메라별 사전 할당 프레임 슬롯
+# ============================================================
+class FrameRingBuffer:
+    """
+    미리 할당한 uint8 슬롯을 돌려 쓰는 프레임 버퍼 (writer 1 / reader 1).
+    - writer : acquire_slot()으로 받은 슬롯을 cap.read(image=slot)로 직접 채운 뒤 publish()
+    - reader : read_latest(after_seq)로 after_seq보다 새로운 최신 프레임을 복사 없이 받음
+
+    reader가 받은 슬롯은 다음 read_latest() 호출 전까지 writer가 덮어쓰지 않는다.
+    그보다 오래 보관해야 하면 호출 측에서 copy() 할 것.
+    슬롯마다 capture 시각(perf_counter_ns)을 함께 저장 → reading_stamp (E2E 지연 추적용)
+    """
+    def __init__(self, height: int, width: int, channels: int = 3, slots: int = 4):
+        if slots < 3:
+            raise ValueError("slots must be >= 3 (latest / reading / writing)")
+        self.slots = [np.empty((height, width, channels), dtype=np.uint8) for _ in range(slots)]
+        self.stamps = [0] * slots
+        self.seq = 0            # 마지막으로 publish된 프레임 번호 (0 = 아직 없음)
+        self._latest = -1       # 최신 프레임이 들어있는 슬롯
+        self._reading = -1      # reader가 들고 있는 슬롯
+        self._writing = 0       # writer가 채우고 있는 슬롯
+        self._cond = threading.Condition()
+
+    def acquire_slot(self) -> np.ndarray:
+        """writer가 다음에 채울 슬롯 (최신 / 읽는 중인 슬롯은 건너뜀)"""
+        n = len(self.slots)
+        with self._cond:
+            idx = self._writing
+            for _ in range(n):
+                idx = (idx + 1) % n
+                if idx != self._latest and idx != self._reading:
+                    break
+            self._writing = idx
+        return self.slots[idx]
+
+    def publish(self, frame: np.ndarray, stamp_ns: int | None = None) -> int:
+        """
+        acquire_slot()으로 받은 슬롯을 최신 프레임으로 공개.
+        stamp_ns : 프레임 도착 시각 (perf_counter_ns), 생략 시 현재 시각
+        cap.read()가 슬롯을 재사용하지 못한 경우(해상도 불일치 등)에는 슬롯을 다시 할당한다.
+        """
+        idx = self._writing
+        stamp = stamp_ns if stamp_ns is not None else time.perf_counter_ns()
+        slot = self.slots[idx]
+        if frame is not slot and frame.shape == slot.shape and frame.dtype == slot.dtype:
+            np.copyto(slot, frame)      # writer 전용 슬롯 → 잠금 불필요
+
+        with self._cond:
+            if frame is not self.slots[idx]:
+                # 해상도 변경: 다음 프레임부터는 in-place로 채워지도록 전체 슬롯을 실제 해상도로 재할당
+                # (reader가 slots를 보는 중 교체되지 않도록 잠금 안에서 교체 + 복사 + 공개)
+                if frame.shape != self.slots[idx].shape or frame.dtype != self.slots[idx].dtype:
+                    self.slots = [np.empty_like(frame) for _ in self.slots]
+                    np.copyto(self.slots[idx], frame)
+            self.stamps[idx] = stamp
+            self._latest = idx
+            self.seq += 1
+            self._cond.notify_all()
+            return self.seq
+
+    def read_latest(self, after_seq: int = 0, timeout: float = 0.0) -> tuple[int, np.ndarray | None]:
+        """
+        after_seq보다 새로운 최신 프레임을 반환 → (seq, frame)
+        timeout 초까지 새 프레임을 기다리고, 없으면 (after_seq, None)
+        """
+        with self._cond:
+            if self.seq <= after_seq:
+                if timeout <= 0 or not self._cond.wait_for(lambda: self.seq > after_seq, timeout):
+                    return after_seq, None
+            self._reading = self._latest
+            return self.seq, self.slots[self._latest]
+
+    @property
+    def reading_stamp(self) -> int:
+        """마지막 read_latest()로 넘겨준 프레임의 capture 시각 (perf_counter_ns, 없으면 0)"""
+        return self.stamps[self._reading] if self._reading >= 0 else 0
+
+
 # ============================================================
 #  CameraStream — 카메라 프레임 수집
 # ============================================================
 class CameraStream:
-    def __init__(self, camera_ids, width=640, height=480):
+    def __init__(self, camera_ids, width=640, height=480, slots=4):
         self.camera_ids = camera_ids
-        self.queues = {cid: Queue(maxsize=1) for cid in camera_ids}
+        self.buffers = {cid: FrameRingBuffer(height, width, slots=slots) for cid in camera_ids}
         self.captures = {cid: cv2.VideoCapture(cid) for cid in camera_ids}
         self.running = False
+        # get_frame()이 마지막으로 넘겨준 프레임 번호
+        self._last_seq = {cid: 0 for cid in camera_ids}
+        # 카메라별 단계 지연 기록 (VisionAI(metrics=...)로 넘겨 같은 기록기에 모음)
+        self.metrics = {cid: StageRecorder(f"CAM{cid}") for cid in camera_ids}
 
         for _, cap in self.captures.items():
             cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
@@ -39,16 +137,24 @@ class CameraStream:
 
     def _reader(self, cam_id: int):
         cap = self.captures[cam_id]
-        q = self.queues[cam_id]
+        buf = self.buffers[cam_id]
+        metrics = self.metrics[cam_id]
 
         while self.running:
-            ret, frame = cap.read()
+            # grab()은 다음 프레임 도착까지 대기, retrieve()가 실제 디코딩 → capture 단계로 기록
+            if not cap.grab():
+                continue
+
+            # grab() 반환 시점 = 프레임 도착 시각 (E2E 추적 기준점)
+            # 사전 할당 슬롯에 바로 디코딩 (프레임마다 새 배열 할당 X)
+            t0 = time.perf_counter_ns()
+            slot = buf.acquire_slot()
+            ret, frame = cap.retrieve(image=slot)
             if not ret:
                 continue
+            metrics.record("capture", time.perf_counter_ns() - t0)
 
-            if q.full():
-                q.get()
-            q.put(frame)
+            buf.publish(frame, t0)
 
         cap.release()
 
@@ -63,9 +169,280 @@ class CameraStream:
     def stop(self):
         self.running = False
 
-    def get_frame(self, cam_id: int):
-        q = self.queues[cam_id]
-        return q.get() if not q.empty() else None
+    def read_latest(self, cam_id: int, after_seq: int = 0, timeout: float = 0.0):
+        """after_seq보다 새로운 최신 프레임 → (seq, frame | None), 복사 없음"""
+        return self.buffers[cam_id].read_latest(after_seq, timeout)
+
+    def get_frame(self, cam_id: int, timeout: float = 0.0):
+        """이전 get_frame() 이후 새로 들어온 최신 프레임 (없으면 timeout까지 대기 후 None)"""
+        seq, frame = self.read_latest(cam_id, self._last_seq[cam_id], timeout)
+        if frame is not None:
+            self._last_seq[cam_id] = seq
+        return frame
+
+    def capture_ns(self, cam_id: int) -> int:
+        """마지막으로 읽어간 프레임의 capture 시각 (perf_counter_ns)"""
+        return self.buffers[cam_id].reading_stamp
+
+
+# ============================================================
+#  FileStream — 녹화 영상 / 이미지 폴더 재생 (CameraStream 대체)
+# ============================================================
+class _FrameSource:
+    """영상 파일 또는 이미지 폴더에서 프레임을 순서대로 읽음"""
+    IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.images: List[str] | None = None
+        self.cap = None
+        self.index = 0
+
+        if os.path.isdir(path):
+            self.images = sorted(
+                os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(self.IMAGE_EXTS)
+            )
+            self.fps = 0.0
+        else:
+            self.cap = cv2.VideoCapture(path)
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+    def read(self, into: np.ndarray | None = None):
+        if self.images is not None:
+            if self.index >= len(self.images):
+                return None
+            frame = cv2.imread(self.images[self.index])
+            self.index += 1
+            return frame
+
+        ret, frame = self.cap.read(image=into) if into is not None else self.cap.read()
+        return frame if ret else None
+
+    def rewind(self) -> None:
+        self.index = 0
+        if self.cap is not None:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self) -> None:
+        if self.cap is not None:
+            self.cap.release()
+
+
+class FileStream:
+    """
+    녹화 영상(.mp4 등) / 이미지 폴더를 CameraStream과 같은 인터페이스로 재생.
+    sources       : {cam_id: 경로}
+    realtime=True : 원본 fps(이미지 폴더는 fps 인자)로 재생, 처리가 느리면 카메라처럼 프레임 drop
+    realtime=False: 최대 속도 — get_frame()/read_latest() 호출마다 다음 프레임을 바로 읽음 (drop 없음)
+    loop=True     : 끝나면 처음부터 다시 재생
+    모든 소스가 끝나면 finished == True
+    """
+    def __init__(self, sources: Dict[int, str], realtime: bool = False, fps: float = 30.0,
+                 loop: bool = False, slots: int = 4):
+        self.camera_ids = list(sources)
+        self.realtime = realtime
+        self.loop = loop
+        self.sources = {cid: _FrameSource(path) for cid, path in sources.items()}
+        self.fps = {cid: src.fps or fps for cid, src in self.sources.items()}
+        self.buffers = {cid: FrameRingBuffer(480, 640, slots=slots) for cid in self.camera_ids}
+        self.done = {cid: False for cid in self.camera_ids}
+        self.running = False
+        self._last_seq = {cid: 0 for cid in self.camera_ids}
+        self.metrics = {cid: StageRecorder(f"CAM{cid}") for cid in self.camera_ids}
+
+    @property
+    def finished(self) -> bool:
+        return all(self.done.values())
+
+    def _next(self, cam_id: int, into: np.ndarray | None = None):
+        t0 = time.perf_counter_ns()
+        src = self.sources[cam_id]
+        frame = src.read(into)
+        if frame is None and self.loop:
+            src.rewind()
+            frame = src.read(into)
+        if frame is None:
+            self.done[cam_id] = True
+        else:
+            self.metrics[cam_id].record("capture", time.perf_counter_ns() - t0)
+        return frame
+
+    def _reader(self, cam_id: int):
+        buf = self.buffers[cam_id]
+        interval = 1.0 / self.fps[cam_id]
+        next_time = time.monotonic()
+
+        while self.running:
+            frame = self._next(cam_id, buf.acquire_slot())
+            if frame is None:
+                break
+            buf.publish(frame)
+
+            next_time += interval
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        self.sources[cam_id].release()
+
+    def start(self):
+        self.running = True
+        self.threads = []
+        if not self.realtime:
+            return
+        for cam_id in self.camera_ids:
+            t = threading.Thread(target=self._reader, args=(cam_id,), daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        self.running = False
+        if not self.realtime:
+            for src in self.sources.values():
+                src.release()
+
+    def read_latest(self, cam_id: int, after_seq: int = 0, timeout: float = 0.0):
+        if self.realtime:
+            return self.buffers[cam_id].read_latest(after_seq, timeout)
+
+        buf = self.buffers[cam_id]
+        frame = self._next(cam_id, buf.acquire_slot())
+        if frame is None:
+            return after_seq, None
+        buf.publish(frame)
+        return buf.read_latest(after_seq)
+
+    def get_frame(self, cam_id: int, timeout: float = 0.0):
+        seq, frame = self.read_latest(cam_id, self._last_seq[cam_id], timeout)
+        if frame is not None:
+            self._last_seq[cam_id] = seq
+        return frame
+
+    def capture_ns(self, cam_id: int) -> int:
+        return self.buffers[cam_id].reading_stamp
+
+
+# ============================================================
+# IoU 행렬 / 1:1 매칭
+# ============================================================
+def iou_matrix(boxes_a, boxes_b) -> np.ndarray:
+    """
+    boxes_a (N, 4), boxes_b (M, 4) [x1, y1, x2, y2] → IoU 행렬 (N, M)
+    """
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    inter_w = np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0])
+    inter_h = np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1])
+    inter = np.clip(inter_w, 0, None) * np.clip(inter_h, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def assign_detections(iou: np.ndarray, threshold: float, method: str = "greedy") -> List[tuple[int, int]]:
+    """
+    IoU 행렬 (detection x track) 기반 1:1 매칭 → [(det_idx, track_idx), ...]
+    - greedy    : IoU 높은 쌍부터 확정 (detection/track 모두 한 번씩만 사용)
+    - hungarian : IoU 합 최대화 (scipy 필요, 없으면 greedy)
+    threshold 이하 IoU 쌍은 매칭하지 않는다.
+    """
+    if iou.size == 0:
+        return []
+
+    if method == "hungarian":
+        try:
+            from scipy.optimize import linear_sum_assignment
+        except ImportError:  # scipy 미설치 시 greedy 매칭으로 대체
+            linear_sum_assignment = None
+
+        if linear_sum_assignment is not None:
+            rows, cols = linear_sum_assignment(-iou)
+            return [(int(r), int(c)) for r, c in zip(rows, cols) if iou[r, c] > threshold]
+
+    rows, cols = np.nonzero(iou > threshold)
+    order = np.argsort(-iou[rows, cols], kind="stable")
+
+    pairs = []
+    used_rows: set[int] = set()
+    used_cols: set[int] = set()
+    for k in order:
+        r, c = int(rows[k]), int(cols[k])
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        pairs.append((r, c))
+    return pairs
+
+
+# ============================================================
+# BoxKalman — 트랙별 등속 운동 모델 (컨베이어 위 물체 위치 예측)
+# ============================================================
+class BoxKalman:
+    """
+    상태 [cx, cy, w, h, vx, vy] (px, px/s) 칼만 필터.
+    - 위치는 등속 운동, 크기(w, h)는 천천히 변하는 random walk
+    - 시간 간격은 프레임 capture 시각(ns) 기준 → 추론을 건너뛰거나 느려져도 실제 이동 거리만큼 예측
+    - predict(t_ns) : t_ns 시점까지 상태를 진행시키고 예측 bbox 반환 (매칭 실패 시 그대로 coasting)
+    - update(bbox, t_ns) : 검출 bbox로 보정
+    - center_distance(bbox) : 예측 중심과 검출 중심의 마하라노비스 거리² (IoU 매칭 실패 시 보조 매칭)
+    """
+    MEAS_STD = 4.0          # 검출 bbox 좌표 잡음 (px)
+    ACCEL_STD = 150.0       # 속도 변화 (px/s^2) — 컨베이어 정지 / 재출발 흡수
+    SIZE_STD = 20.0         # 크기 변화 (px/√s)
+    INIT_VEL_STD = 400.0    # 첫 검출 시 속도 불확실성 (px/s)
+
+    _H = np.hstack([np.eye(4), np.zeros((4, 2))])
+
+    def __init__(self, bbox, t_ns: int):
+        x1, y1, x2, y2 = bbox
+        self.x = np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1, 0.0, 0.0])
+        self.P = np.diag([self.MEAS_STD ** 2] * 4 + [self.INIT_VEL_STD ** 2] * 2)
+        self.R = np.eye(4) * self.MEAS_STD ** 2
+        self.t_ns = t_ns
+        # 마지막 검출 bbox (컨베이어 정지 / 스토퍼 등 급정지 시 예측 대신 매칭 기준)
+        self.last_bbox = tuple(bbox)
+
+    def predict(self, t_ns: int) -> tuple:
+        dt = (t_ns - self.t_ns) / 1e9
+        if dt > 0:
+            F = np.eye(6)
+            F[0, 4] = F[1, 5] = dt
+            q = self.ACCEL_STD ** 2
+            Q = np.zeros((6, 6))
+            for p, v in ((0, 4), (1, 5)):
+                Q[p, p] = q * dt ** 4 / 4
+                Q[p, v] = Q[v, p] = q * dt ** 3 / 2
+                Q[v, v] = q * dt ** 2
+            Q[2, 2] = Q[3, 3] = self.SIZE_STD ** 2 * dt
+            self.x = F @ self.x
+            self.P = F @ self.P @ F.T + Q
+            self.t_ns = t_ns
+        return self.bbox()
+
+    def update(self, bbox, t_ns: int) -> None:
+        self.predict(t_ns)
+        self.last_bbox = tuple(bbox)
+        x1, y1, x2, y2 = bbox
+        z = np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1])
+        S = self.P[:4, :4] + self.R
+        K = self.P[:, :4] @ np.linalg.inv(S)
+        self.x = self.x + K @ (z - self.x[:4])
+        self.P = (np.eye(6) - K @ self._H) @ self.P
+
+    def center_distance(self, bbox) -> float:
+        x1, y1, x2, y2 = bbox
+        d = np.array([(x1 + x2) / 2, (y1 + y2) / 2]) - self.x[:2]
+        S = self.P[:2, :2] + self.R[:2, :2]
+        return float(d @ np.linalg.solve(S, d))
+
+    def bbox(self) -> tuple:
+        cx, cy, w, h = self.x[:4]
+        return (cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2)
 
 
 # ============================================================
@@ -78,31 +455,65 @@ class DetectionResult:
     is_defective: bool
     confidence_avg: float
     frame_count: int
+    # capture → PLC ack 추적 (capture 시각을 알 때만), 로그에는 남기지 않음
+    trace: FrameTrace | None = field(default=None, repr=False, compare=False)
 
     def to_dict(self):
         return {
             "timestamp": self.timestamp.isoformat(),
             "object_id": self.object_id,
             "defective": self.is_defective,
-            "confidence": round(self.confidence_avg, 3),
+            "confidence": round(float(self.confidence_avg), 3),
             "frames": self.frame_count
         }
   
 
-@dataclass
 class TrackedObject:
-    object_id: int
-    bbox: tuple
-    good_list: List[str]  # VisionAI에서 camera별 기준을 받아 저장
-    
-    is_good: bool = None
-    detections: List[tuple] = field(default_factory=list)
-    frame_count: int = 0
-    missing_time: int = 0
-    in_roi: bool = False
-    finalized: bool = False
-    finalized_frame_count: int = 0
-    display_duration: int = 100
+    """
+    트랙 1개의 상태.
+    판정 점수는 detection이 들어올 때마다 누적 합으로 갱신 → get_final_decision()은 O(1),
+    원본 detection은 디버깅용으로 최근 DETECTION_WINDOW개만 보관 (트랙 수명과 무관하게 메모리 일정)
+    """
+    __slots__ = (
+        "object_id", "bbox", "good_list", "is_good", "detections", "frame_count",
+        "missing_time", "in_roi", "finalized", "finalized_frame_count", "display_duration",
+        "good_score", "total_score", "llr", "policy", "kalman",
+        "ready_frame", "ready_ns", "ready_decision", "roi_frame", "roi_ns",
+    )
+
+    DETECTION_WINDOW = 30
+
+    def __init__(self, object_id: int, bbox: tuple, good_list, display_duration: int = 100,
+                 policy: DecisionPolicy | None = None):
+        self.object_id = object_id
+        self.bbox = bbox
+        # VisionAI에서 camera별 기준을 받아 저장 (membership 검사용 frozenset)
+        self.good_list = good_list if isinstance(good_list, frozenset) else frozenset(good_list)
+
+        self.is_good: bool | None = None
+        self.detections: deque = deque(maxlen=self.DETECTION_WINDOW)
+        self.frame_count = 0
+        self.missing_time = 0
+        self.in_roi = False
+        self.finalized = False
+        self.finalized_frame_count = 0
+        self.display_duration = display_duration
+
+        # 누적 점수 (good 클래스 confidence 합 / 전체 confidence 합 / SPRT log-likelihood ratio)
+        self.good_score = 0.0
+        self.total_score = 0.0
+        self.llr = 0.0
+        self.policy = policy if policy is not None else DecisionPolicy()
+
+        # VisionAI(motion_model="kalman")일 때만 사용
+        self.kalman: BoxKalman | None = None
+
+        # 판정이 처음 가능해진 / ROI에 처음 들어온 추론 프레임 번호와 시각 (VisionAI 기준)
+        self.ready_frame: int | None = None
+        self.ready_ns = 0
+        self.ready_decision: tuple[bool, float] | None = None
+        self.roi_frame: int | None = None
+        self.roi_ns = 0
 
     def add_missing(self):
         self.missing_time += 1
@@ -111,27 +522,21 @@ class TrackedObject:
         self.missing_time = 0
 
     def add_detection(self, cls: str, conf: float):
+        conf = float(conf)
+        is_good_cls = cls in self.good_list
         self.detections.append((cls, conf))
         self.frame_count += 1
+        self.total_score += conf
+        if is_good_cls:
+            self.good_score += conf
+        self.llr += self.policy.llr_step(is_good_cls, conf)
 
     def get_final_decision(self) -> tuple[bool, float] | None:
-        # 감지 데이터 부족
-        if len(self.detections) < 15:
-            return None
-
-        # good_score / bad_score 계산을 camera 기준 good_list로만 수행
-        good_score = sum(c for cls, c in self.detections if cls in self.good_list)
-        total_score = sum(c for _, c in self.detections)
-
-        if total_score == 0:
-            return None
-
-        # is_good 판정 (예: good_score 비율 기반)
-        self.is_good = (good_score / total_score) >= 0.7
-
-        avg_conf = total_score / len(self.detections)
-
-        return self.is_good, avg_conf
+        # 판정 기준은 DecisionPolicy (ratio / sprt), 데이터 부족이면 None
+        decision = self.policy.decide(self.frame_count, self.good_score, self.total_score, self.llr)
+        if decision is not None:
+            self.is_good = decision[0]
+        return decision
 
 
 # ============================================================
@@ -141,12 +546,14 @@ class DetectionSignalController:
     """
     - request_start() : 상위 공정에서 '검출 시작' 신호가 들어올 때 호출
     - set_result_callback(cb) : cb(bool) 형태로 PLC 등에 보낼 콜백 등록
-    - handle_detection(is_good) : VisionAI에서 finalize 시 호출
+      (with_trace=True 이면 cb(bool, FrameTrace | None) — PLC 쓰기 완료 시점까지 E2E 추적)
+    - handle_detection(is_good, trace) : VisionAI에서 finalize 시 호출
     """
     def __init__(self, name: str = ""):
         self.name = name
         self._armed: bool = False
-        self._result_callback: Callable[[bool], None] | None = None
+        self._result_callback: Callable[..., None] | None = None
+        self._pass_trace = False
 
     def request_start(self) -> None:
         """
@@ -156,13 +563,15 @@ class DetectionSignalController:
         print("detector.py:Request confirmed")
         self._armed = True
 
-    def set_result_callback(self, cb: Callable[[bool], None]) -> None:
+    def set_result_callback(self, cb: Callable[..., None], with_trace: bool = False) -> None:
         """
         cb: (is_good: bool) -> None
+            with_trace=True 이면 (is_good: bool, trace: FrameTrace | None) -> None
         """
         self._result_callback = cb
+        self._pass_trace = with_trace
 
-    def handle_detection(self, is_good: bool) -> None:
+    def handle_detection(self, is_good: bool, trace: FrameTrace | None = None) -> None:
         """
         VisionAI에서 finalize될 때 호출.
         _armed 상태가 아니면 무시, _armed이면 cb를 1번 호출하고 disarm.
@@ -170,8 +579,551 @@ class DetectionSignalController:
         if not self._armed:
             return
         self._armed = False
+        if trace is not None:
+            trace.mark("dispatch")
         if self._result_callback is not None:
-            self._result_callback(is_good)
+            if self._pass_trace:
+                self._result_callback(is_good, trace)
+            else:
+                self._result_callback(is_good)
+
+
+# ============================================================
+# InferenceEngine — 추론 백엔드 (카메라들이 공유, 배치 추론)
+# ============================================================
+class InferenceEngine(abc.ABC):
+    """
+    추론 백엔드 공통 인터페이스. 여러 VisionAI가 하나의 엔진(모델 1개)을 공유한다.
+    - infer(frames) : 프레임 리스트를 한 번에 추론 (미구현 엔진은 생성 시점에 TypeError)
+    - 반환값 : 프레임별 [(bbox, cls_name, conf), ...] 리스트 (bbox는 원본 프레임 좌표)
+    """
+    def __init__(self, conf: float = 0.85):
+        self.conf = conf
+        # 여러 스레드에서 같은 모델을 호출할 수 있으므로 forward는 직렬화
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def infer(self, frames: list) -> List[List[tuple]]:
+        ...
+
+
+class UltralyticsEngine(InferenceEngine):
+    """PyTorch .pt 가중치 — ultralytics.YOLO 사용"""
+    def __init__(self, model_path: str, conf: float = 0.85, imgsz: int = 320):
+        super().__init__(conf)
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.imgsz = imgsz
+
+    def infer(self, frames: list) -> List[List[tuple]]:
+        if not frames:
+            return []
+
+        with self._lock:
+            results = self.model(frames, conf=self.conf, imgsz=self.imgsz, verbose=False)
+
+        return [self._to_detections(r) for r in results]
+
+    @staticmethod
+    def _to_detections(result) -> List[tuple]:
+        detections = []
+        boxes = result.boxes
+        if len(boxes) == 0:
+            return detections
+
+        names = result.names
+        xyxy = boxes.xyxy.cpu().numpy()
+        cls_ids = boxes.cls.cpu().numpy()
+        confs = boxes.conf.cpu().numpy()
+
+        for (x1, y1, x2, y2), cls_id, conf in zip(xyxy, cls_ids, confs):
+            detections.append(((x1, y1, x2, y2), names[int(cls_id)], float(conf)))
+        return detections
+
+
+class Letterbox:
+    """
+    비율 유지 resize + 패딩 전처리 (imgsz x imgsz 버퍼 재사용).
+    입력 해상도가 바뀌지 않으면 매 프레임 버퍼에 cv2.resize(dst=...)로 바로 써넣어 할당이 없다.
+    __call__() 이후 restore_boxes()/restore()로 박스를 원본 프레임 좌표로 되돌린다.
+    """
+    def __init__(self, imgsz: int = 320, color: int = 114):
+        self.imgsz = imgsz
+        self.color = color
+        self.buffer = np.full((imgsz, imgsz, 3), color, dtype=np.uint8)
+        self.scale = 1.0
+        self.pad = (0, 0)
+        self.shape: tuple[int, int] | None = None    # 마지막 입력 (h, w)
+        self._size = (imgsz, imgsz)                   # resize 결과 (w, h)
+        self._region = self.buffer
+
+    def _configure(self, h: int, w: int) -> None:
+        r = min(self.imgsz / h, self.imgsz / w)
+        nw, nh = int(round(w * r)), int(round(h * r))
+        pad_x = (self.imgsz - nw) // 2
+        pad_y = (self.imgsz - nh) // 2
+
+        self.buffer[:] = self.color
+        self.scale = r
+        self.pad = (pad_x, pad_y)
+        self.shape = (h, w)
+        self._size = (nw, nh)
+        self._region = self.buffer[pad_y:pad_y + nh, pad_x:pad_x + nw]
+
+    def __call__(self, frame) -> np.ndarray:
+        h, w = frame.shape[:2]
+        if (h, w) == (self.imgsz, self.imgsz):
+            # 이미 모델 입력 크기 → 그대로 사용
+            self.scale, self.pad, self.shape = 1.0, (0, 0), (h, w)
+            return frame
+
+        if (h, w) != self.shape:
+            self._configure(h, w)
+
+        if self._size == (w, h):
+            np.copyto(self._region, frame)
+        else:
+            cv2.resize(frame, self._size, dst=self._region, interpolation=cv2.INTER_LINEAR)
+        return self.buffer
+
+    def restore_boxes(self, boxes: np.ndarray) -> np.ndarray:
+        """(N, 4) 입력 이미지 좌표 → 원본 프레임 좌표 (in-place)"""
+        h, w = self.shape
+        pad_x, pad_y = self.pad
+        boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - pad_x) / self.scale, 0, w)
+        boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - pad_y) / self.scale, 0, h)
+        return boxes
+
+    def restore(self, detections: List[tuple]) -> List[tuple]:
+        """[(bbox, cls_name, conf), ...] 의 bbox를 원본 프레임 좌표로 변환"""
+        if not detections or self.scale == 1.0 and self.pad == (0, 0):
+            return detections
+        boxes = self.restore_boxes(np.array([d[0] for d in detections], dtype=np.float32))
+        return [(tuple(box), cls_name, conf) for box, (_, cls_name, conf) in zip(boxes, detections)]
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> List[int]:
+    """score 내림차순 NMS → 남길 인덱스 리스트"""
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size > 0:
+        i = int(order[0])
+        keep.append(i)
+        if order.size == 1:
+            break
+        ious = iou_matrix(boxes[i:i + 1], boxes[order[1:]])[0]
+        order = order[1:][ious <= iou_threshold]
+    return keep
+
+
+def _load_names(meta_names=None) -> Dict[int, str]:
+    """모델 메타데이터의 names (dict / repr 문자열) → {id: name}, 없으면 data.yaml 사용"""
+    if isinstance(meta_names, str):
+        meta_names = ast.literal_eval(meta_names)
+    if not meta_names:
+        with open(dataset_yaml, encoding="utf-8") as f:
+            meta_names = yaml.safe_load(f)["names"]
+    if isinstance(meta_names, list):
+        meta_names = dict(enumerate(meta_names))
+    return {int(k): v for k, v in meta_names.items()}
+
+
+class _YoloRawEngine(InferenceEngine):
+    """
+    ONNX / OpenVINO 공통 처리 — letterbox 전처리 + YOLOv8 raw 출력 디코딩 + NMS.
+    하위 클래스는 _forward(batch) 만 구현 (입력 NCHW float32, 출력 (B, 4 + nc, N)).
+    """
+    def __init__(self, names: Dict[int, str], imgsz: int, conf: float = 0.85,
+                 iou: float = 0.7, max_det: int = 300, batched: bool = True):
+        super().__init__(conf)
+        self.names = names
+        self.imgsz = imgsz
+        self.iou = iou
+        self.max_det = max_det
+        self.batched = batched   # 모델 입력 batch 차원이 고정(1)이면 False → 프레임별 forward
+        # 배치 슬롯별 전처리 버퍼 / 입력 텐서 (재사용)
+        self._letterboxes: List[Letterbox] = []
+        self._batch = np.empty((0, 3, imgsz, imgsz), dtype=np.float32)
+
+    @abc.abstractmethod
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        ...
+
+    def infer(self, frames: list) -> List[List[tuple]]:
+        if not frames:
+            return []
+
+        n = len(frames)
+        with self._lock:
+            while len(self._letterboxes) < n:
+                self._letterboxes.append(Letterbox(self.imgsz))
+            if len(self._batch) != n:
+                self._batch = np.empty((n, 3, self.imgsz, self.imgsz), dtype=np.float32)
+            batch = self._batch
+
+            for i, frame in enumerate(frames):
+                # VisionAI에서 이미 imgsz로 letterbox 된 입력이면 그대로 통과
+                img = self._letterboxes[i](frame)
+                # BGR HWC uint8 → RGB CHW float32 [0, 1]
+                np.multiply(img[:, :, ::-1].transpose(2, 0, 1), 1 / 255.0, out=batch[i])
+
+            if self.batched:
+                outputs = self._forward(batch)
+            else:
+                outputs = np.concatenate([self._forward(batch[i:i + 1]) for i in range(n)])
+
+            return [self._decode(outputs[i], self._letterboxes[i]) for i in range(n)]
+
+    def _decode(self, pred: np.ndarray, lb: Letterbox) -> List[tuple]:
+        pred = pred.T                       # (N, 4 + nc)
+        scores = pred[:, 4:]
+        cls_ids = scores.argmax(axis=1)
+        confs = scores[np.arange(len(scores)), cls_ids]
+
+        mask = confs >= self.conf
+        if not mask.any():
+            return []
+        pred, cls_ids, confs = pred[mask], cls_ids[mask], confs[mask]
+
+        # cx, cy, w, h → x1, y1, x2, y2 (letterbox 좌표)
+        boxes = np.empty((len(pred), 4), dtype=np.float32)
+        boxes[:, 0] = pred[:, 0] - pred[:, 2] / 2
+        boxes[:, 1] = pred[:, 1] - pred[:, 3] / 2
+        boxes[:, 2] = pred[:, 0] + pred[:, 2] / 2
+        boxes[:, 3] = pred[:, 1] + pred[:, 3] / 2
+
+        # 클래스별 NMS — 클래스마다 좌표를 크게 띄워서 한 번에 처리
+        offsets = cls_ids[:, None].astype(np.float32) * 4096
+        keep = nms(boxes + offsets, confs, self.iou)[:self.max_det]
+
+        # letterbox 좌표 → 입력 프레임 좌표
+        boxes = lb.restore_boxes(boxes[keep])
+
+        return [
+            (tuple(box), self.names[int(cls_id)], float(conf))
+            for box, cls_id, conf in zip(boxes, cls_ids[keep], confs[keep])
+        ]
+
+
+class OnnxEngine(_YoloRawEngine):
+    """yolo export format=onnx 로 내보낸 모델 — onnxruntime CPU 추론"""
+    def __init__(self, model_path: str, conf: float = 0.85, imgsz: int | None = None,
+                 providers: List[str] | None = None):
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(model_path, providers=providers or ["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        input_shape = self.session.get_inputs()[0].shape      # [batch, 3, h, w] (동적 차원은 문자열)
+        meta = self.session.get_modelmeta().custom_metadata_map
+
+        if imgsz is None:
+            imgsz = input_shape[2] if isinstance(input_shape[2], int) else ast.literal_eval(meta["imgsz"])[0]
+
+        super().__init__(_load_names(meta.get("names")), imgsz, conf,
+                         batched=not isinstance(input_shape[0], int) or input_shape[0] != 1)
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoEngine(_YoloRawEngine):
+    """yolo export format=openvino 로 내보낸 IR (폴더 또는 .xml) — OpenVINO CPU 추론"""
+    def __init__(self, model_path: str, conf: float = 0.85, imgsz: int | None = None, device: str = "CPU"):
+        import openvino as ov
+
+        xml_path = model_path
+        if os.path.isdir(model_path):
+            xml_path = next(os.path.join(model_path, f) for f in os.listdir(model_path) if f.endswith(".xml"))
+
+        meta = {}
+        meta_path = os.path.join(os.path.dirname(xml_path), "metadata.yaml")
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = yaml.safe_load(f) or {}
+
+        core = ov.Core()
+        model = core.read_model(xml_path)
+        input_shape = model.inputs[0].get_partial_shape()
+        self.compiled = core.compile_model(model, device)
+        self.output = self.compiled.output(0)
+
+        if imgsz is None:
+            imgsz = input_shape[2].get_length() if input_shape[2].is_static else meta["imgsz"][0]
+
+        super().__init__(_load_names(meta.get("names")), imgsz, conf,
+                         batched=input_shape[0].is_dynamic or input_shape[0].get_length() != 1)
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        return self.compiled(batch)[self.output]
+
+
+def create_engine(model_path: str, conf: float = 0.85, **kwargs) -> InferenceEngine:
+    """
+    모델 경로로 백엔드 선택
+    - *.onnx                         → OnnxEngine
+    - *.xml / *_openvino_model 폴더   → OpenVinoEngine
+    - 그 외 (*.pt)                    → UltralyticsEngine
+    """
+    path = model_path.rstrip("/\\")
+    if path.endswith(".onnx"):
+        return OnnxEngine(path, conf=conf, **kwargs)
+    if path.endswith(".xml") or path.endswith("_openvino_model"):
+        return OpenVinoEngine(path, conf=conf, **kwargs)
+    return UltralyticsEngine(path, conf=conf, **kwargs)
+
+
+# ============================================================
+# 그래픽 표시 (VisionAI / DisplayThread 공용)
+# ============================================================
+def draw_roi(frame, roi):
+    if roi:
+        x1, y1, x2, y2 = roi
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
+    return frame
+
+
+def draw_tracks(frame, tracks: List[tuple]):
+    """tracks : VisionAI.snapshot() 형식 [(oid, bbox, finalized, is_good, frame_count), ...]"""
+    for oid, bbox, finalized, is_good, frame_count in tracks:
+        x1, y1, x2, y2 = map(int, bbox)
+
+        if finalized:
+            color = (0, 255, 0) if is_good else (0, 0, 255)
+            label = "Good" if is_good else "Bad"
+        else:
+            color = (128, 128, 128)
+            label = f"{oid}({frame_count})"
+
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, label, (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return frame
+
+
+# ============================================================
+# MotionGate — 정지 장면이면 YOLO 추론 생략
+# ============================================================
+class MotionGate:
+    """
+    축소 grayscale 프레임 차분으로 장면 변화 여부를 판단한다.
+    - 기준 프레임 = 마지막으로 추론한 프레임 → 천천히 움직이는 물체도 누적 변화로 감지
+    - 변화 픽셀 비율 >= min_changed_ratio 이면 즉시 추론 재개
+    - max_skip 프레임 연속 생략 시 1회 강제 추론 (조명 변화 등 보정)
+    """
+    def __init__(self, width: int = 160, pixel_threshold: int = 25,
+                 min_changed_ratio: float = 0.002, max_skip: int = 30):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.max_skip = max_skip
+
+        # 재사용 버퍼 (입력 해상도가 정해지면 할당)
+        self._small: np.ndarray | None = None
+        self._gray: np.ndarray | None = None
+        self._diff: np.ndarray | None = None
+        self._reference: np.ndarray | None = None
+        self._since_infer = 0
+
+        # 통계
+        self.frames = 0
+        self.skipped = 0
+
+    def _allocate(self, h: int, w: int) -> None:
+        sh = max(1, int(round(h * self.width / w)))
+        self._small = np.empty((sh, self.width, 3), dtype=np.uint8)
+        self._gray = np.empty((sh, self.width), dtype=np.uint8)
+        self._diff = np.empty((sh, self.width), dtype=np.uint8)
+        self._reference = None
+
+    def check(self, frame, force: bool = False) -> bool:
+        """True → 이 프레임은 추론 필요 / False → 생략 가능"""
+        h, w = frame.shape[:2]
+        if self._small is None or self._small.shape[0] != max(1, int(round(h * self.width / w))):
+            self._allocate(h, w)
+
+        cv2.resize(frame, (self.width, self._small.shape[0]), dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        cv2.GaussianBlur(self._gray, (5, 5), 0, dst=self._gray)
+        self.frames += 1
+
+        motion = force or self._reference is None or self._since_infer >= self.max_skip
+        if not motion:
+            cv2.absdiff(self._gray, self._reference, dst=self._diff)
+            cv2.threshold(self._diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+            motion = cv2.countNonZero(self._diff) >= self.min_changed_ratio * self._diff.size
+
+        if motion:
+            if self._reference is None:
+                self._reference = self._gray.copy()
+            else:
+                np.copyto(self._reference, self._gray)
+            self._since_infer = 0
+        else:
+            self.skipped += 1
+            self._since_infer += 1
+        return motion
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def stats(self) -> dict:
+        return {"frames": self.frames, "skipped": self.skipped, "skip_ratio": round(self.skip_ratio, 3)}
+
+    def reset_stats(self) -> None:
+        self.frames = 0
+        self.skipped = 0
+
+
+# ============================================================
+# InferenceScheduler — 트랙 상태에 따라 카메라별 추론 주기 조절
+# ============================================================
+class InferenceScheduler:
+    """
+    매 프레임 VisionAI의 트랙 상태로 모드를 고르고, 모드별 최소 간격이 지난 프레임만 추론한다.
+    - full : 판정 전 트랙이 ROI 안 / ROI를 지나친 뒤에도 화면 안이거나, approach_s 안에 ROI에 도달 예정
+             → 매 프레임 추론
+             칼만 없는 트랙(motion_model=None)은 예측이 없어 추론 간격이 벌어지면 IoU 매칭이 끊기고
+             finalized 물체가 새 ID로 다시 판정되므로, 트랙이 하나라도 있으면 항상 full
+    - mid  : 판정 전 트랙이 있지만 칼만 예측상 ROI에서 멂 → mid_fps
+    - idle : finalized 트랙만 있거나 트랙 없음 → 새 물체 진입 감지용 간격
+    idle 간격은 idle_fps를 상한으로, ROI 기하와 컨베이어 속도에서 계산한다:
+        새 물체가 화면 가장자리 → ROI 경계(rx1 또는 W - rx2)를 지나는 시간
+        + ROI 통과 시간 x late_allowance 안에 첫 검출 + 판정 샘플(policy.ready_frames) 수집이 끝나도록 간격을 줄임
+    late_allowance : 판정 준비가 ROI 진입 뒤로 밀려도 되는 정도 (ROI 통과 시간 대비 비율)
+        0이면 ROI 진입 시점에 판정 준비를 요구 → ratio 15프레임 / 300 px/s / ROI 0.6에서는 idle도 매 프레임 추론
+        (idle 간격이 프레임 간격보다 짧아지면 1회 경고). 늦게 준비된 판정은 ROI 안에서 준비되는 즉시 finalize
+    full 전환 시점 = ROI 도달 approach_s + 최악의 검출 지연(mid 간격) + 남은 검출 수 x 프레임 간격 전
+    판정 준비가 끝난 트랙도 ROI 진입 주기에 바로 finalize되도록 mid 이상으로 샘플링한다.
+    제약: 매 프레임 추론해도 가장자리 → ROI 구간에서 ready_frames개를 못 모으는 속도 / ROI 배치
+          (예: 640 px 폭, ROI 0.6, ratio 15프레임 @30fps, 600 px/s 이상)에서는 판정이 ROI 안에서 늦게 확정된다
+          → 시작 시 1회 경고, decision_stats()의 late로 확인 (sprt 정책이나 ROI를 하류로 옮겨 해결)
+    max_speed : 예상 최대 컨베이어 속도 (px/s), 칼만 트랙에서 더 빠른 속도가 관측되면 자동으로 올림
+                실제보다 낮게 주면 속도를 배우기 전 첫 물체가 idle 간격 사이에 ROI를 지나 판정 없이 지나갈 수 있음
+    """
+    MODES = ("full", "mid", "idle")
+
+    def __init__(self, idle_fps: float = 3.0, mid_fps: float = 10.0, approach_s: float = 0.5,
+                 max_speed: float = 300.0, late_allowance: float = 0.25):
+        self.intervals = {"full": 0, "mid": int(1e9 / mid_fps), "idle": int(1e9 / idle_fps)}
+        self.max_idle_ns = self.intervals["idle"]
+        self.approach_s = approach_s
+        self.max_speed = max_speed
+        self.late_allowance = late_allowance
+        self.object_width = 0.0           # 관측된 최대 물체 폭 (px) — 가장자리에 걸친 순간부터 검출됨
+        self._warned_late = False
+        self._warned_idle = False
+        self._last_infer_ns = 0
+        self._last_check_ns = 0
+        self._frame_interval = 1 / 30     # 카메라 프레임 간격 (초, EMA)
+        self.mode = "idle"
+
+        # 통계
+        self.frames = 0
+        self.skipped = 0
+        self.mode_frames = {m: 0 for m in self.MODES}
+
+    def _time_to_roi(self, obj: TrackedObject, roi: tuple, now_ns: int) -> float:
+        """
+        칼만 예측 중심 x가 ROI x 범위에 들 때까지 남은 시간 (초) — _is_in_roi와 같은 기준
+        ROI 안이거나 ROI를 지나쳐 멀어지는 중이면 0, 멈춰 있으면 inf
+        """
+        kf = obj.kalman
+        dt = max(0.0, (now_ns - kf.t_ns) / 1e9)
+        vx = kf.x[4]
+        cx = kf.x[0] + vx * dt
+        rx1, _, rx2, _ = roi
+        if rx1 <= cx <= rx2:
+            return 0.0
+        gap, v = (rx1 - cx, vx) if cx < rx1 else (cx - rx2, -vx)
+        if v > 0:
+            return gap / v
+        return 0.0 if v < 0 else float("inf")
+
+    def _idle_interval_ns(self, vision: VisionAI) -> int:
+        """새 물체를 판정 허용 시점(ROI 진입 + late_allowance) 전에 보고 판정 샘플까지 모을 수 있는 idle 추론 간격"""
+        rx1, _, rx2, _ = vision.roi
+        # 물체 중심 기준 이동 거리: 화면 밖(-폭/2)에서 ROI 경계까지
+        entry_px = min(rx1, vision.frame_width - rx2) + self.object_width / 2
+        entry_s = entry_px / self.max_speed
+        late_s = self.late_allowance * (rx2 - rx1) / self.max_speed
+        sampling_s = vision.policy.ready_frames * self._frame_interval
+        interval_ns = max(0, min(self.max_idle_ns, int((entry_s + late_s - sampling_s) * 1e9)))
+
+        # 물체를 한 번 본 뒤(폭을 알 때)의 계산만 경고 대상
+        if self.object_width:
+            if entry_s < sampling_s and not self._warned_late:
+                self._warned_late = True
+                print(f"[InferenceScheduler {vision.name}] {self.max_speed:.0f} px/s에서는 ROI 진입 전에 "
+                      f"검출 {vision.policy.ready_frames}개를 모을 수 없음 → 판정이 ROI 안에서 늦게 확정됨")
+            if interval_ns < self._frame_interval * 1e9 and not self._warned_idle:
+                self._warned_idle = True
+                print(f"[InferenceScheduler {vision.name}] idle 간격 {interval_ns / 1e6:.0f} ms < 프레임 간격 "
+                      f"→ 물체가 없어도 매 프레임 추론 (late_allowance={self.late_allowance}, "
+                      f"ready_frames={vision.policy.ready_frames}, {self.max_speed:.0f} px/s)")
+        return interval_ns
+
+    def select_mode(self, vision: VisionAI, now_ns: int) -> str:
+        mode = "idle"
+        for obj in vision.tracked_objects.values():
+            if obj.kalman is None or vision.roi is None:
+                return "full"
+            if obj.frame_count >= 3:
+                self.max_speed = max(self.max_speed, abs(float(obj.kalman.x[4])))
+                self.object_width = max(self.object_width, float(obj.kalman.x[2]))
+            if obj.finalized:
+                continue
+            mid_s = self.intervals["mid"] / 1e9
+            if obj.ready_frame is not None:
+                # 판정 준비 완료 → ROI 진입 직전에는 full로 진입 프레임에 바로 finalize
+                if self._time_to_roi(obj, vision.roi, now_ns) <= mid_s:
+                    return "full"
+                mode = "mid"
+                continue
+            # 속도 추정 전(검출 3개 미만)인 새 트랙은 예측이 불확실하므로 full
+            if obj.frame_count < 3:
+                return "full"
+            # mid 모드 트랙은 최대 mid 간격만큼 늦게 full로 전환될 수 있으므로 그만큼 일찍 시작
+            remaining = max(0, vision.policy.ready_frames - obj.frame_count)
+            lead_s = self.approach_s + mid_s + remaining * self._frame_interval
+            if self._time_to_roi(obj, vision.roi, now_ns) <= lead_s:
+                return "full"
+            mode = "mid"
+        return mode
+
+    def check(self, vision: VisionAI, now_ns: int) -> bool:
+        """True → 이 프레임은 추론 / False → 생략"""
+        if self._last_check_ns:
+            dt = (now_ns - self._last_check_ns) / 1e9
+            if 0 < dt < 1.0:
+                self._frame_interval += 0.1 * (dt - self._frame_interval)
+        self._last_check_ns = now_ns
+
+        self.mode = self.select_mode(vision, now_ns)
+        self.frames += 1
+        self.mode_frames[self.mode] += 1
+
+        interval = self.intervals[self.mode]
+        if self.mode == "idle" and vision.roi is not None:
+            interval = self._idle_interval_ns(vision)
+        if now_ns - self._last_infer_ns >= interval:
+            self._last_infer_ns = now_ns
+            return True
+        self.skipped += 1
+        return False
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def stats(self) -> dict:
+        return {"frames": self.frames, "skipped": self.skipped, "skip_ratio": round(self.skip_ratio, 3),
+                "mode_frames": dict(self.mode_frames)}
+
+    def reset_stats(self) -> None:
+        self.frames = 0
+        self.skipped = 0
+        self.mode_frames = {m: 0 for m in self.MODES}
 
 
 # ============================================================
@@ -179,23 +1131,67 @@ class DetectionSignalController:
 # ============================================================
 class VisionAI:
     def __init__(self, model_path:str, good_list:List[str], bad_list:List[str],
-                 roi_center_ratio:float=0.5, roi_width_ratio:float=0.6, roi_height_ratio:float=0.4):
-        self.model = YOLO(model_path)
+                 roi_center_ratio:float=0.5, roi_width_ratio:float=0.6, roi_height_ratio:float=0.4,
+                 engine: InferenceEngine | None = None, imgsz: int | None = 320,
+                 roi_crop: bool = False, roi_crop_pad: float = 0.1,
+                 motion_gate: MotionGate | None = None, render: bool = True,
+                 name: str = "", metrics: StageRecorder | None = None,
+                 motion_model: str | None = None, scheduler: InferenceScheduler | None = None,
+                 policy: DecisionPolicy | None = None):
+        # engine을 넘기면 모델을 공유 (카메라 여러 대 → 모델 1개)
+        # 판정 정책 (None이면 기존 기본값: 검출 15개 / good 비율 0.7 / conf 0.85)
+        self.policy = policy if policy is not None else DecisionPolicy()
+        self.engine = engine if engine is not None else create_engine(model_path, conf=self.policy.conf)
+        # 추론 입력 크기 (학습 해상도 320). None이면 원본 프레임을 그대로 엔진에 전달
+        self.letterbox = Letterbox(imgsz) if imgsz else None
         self.callbacks: List[Callable[[DetectionResult], None]] = []
         self.tracked_objects: Dict[int, TrackedObject] = {}
         self.next_object_id = 0
         
         self.good_list = good_list
         self.bad_list = bad_list
+        self._good_set = frozenset(good_list)
+        self._class_set = frozenset(good_list) | frozenset(bad_list)
 
         self.roi_center_ratio = roi_center_ratio
         self.roi_width_ratio = roi_width_ratio
         self.roi_height_ratio = roi_height_ratio
         self.roi: tuple[int, int, int, int] | None = None
 
-        self.max_missing_times = 30
-        self.min_frames_for_decision = 10
+        # ROI 크롭 모드: ROI 사각형 + 여유(roi_crop_pad x 프레임 크기)만 모델에 넣는다.
+        # 크롭 밖 물체는 검출되지 않으므로 roi_height_ratio가 컨베이어 폭을 덮도록 설정할 것
+        self.roi_crop = roi_crop
+        self.roi_crop_pad = roi_crop_pad
+        self.crop: tuple[int, int, int, int] | None = None
+
+        # 정지 장면 추론 생략 (None이면 매 프레임 추론)
+        self.motion_gate = motion_gate
+        # 트랙 상태 기반 추론 주기 조절 (None이면 매 프레임 추론)
+        self.scheduler = scheduler
+
+        # False면 process_*()에서 화면 합성 생략 (headless / DisplayThread 사용 시)
+        self.render = render
+
+        # 단계별 지연 기록 (preprocess / inference / tracking / callbacks / drawing)
+        self.name = name
+        self.metrics = metrics if metrics is not None else StageRecorder(name)
+        self._callback_ns = 0
+        # 현재 처리 중인 프레임의 capture 시각 (0 = 모름 → E2E trace 생략)
+        self._capture_ns = 0
+
+        # 판정 준비 시점 vs ROI 진입 시점 (프레임 / ms) 통계
+        self.decision_lead = DecisionLead()
+        self._frame_index = 0
+
+        self.max_missing_times = self.policy.max_missing_times
+        self.min_frames_for_decision = self.policy.min_frames_for_decision
         self.iou_threshold = 0.3
+        self.assign_method = "greedy"   # "greedy" | "hungarian"
+
+        # "kalman"이면 트랙별 등속 예측 bbox로 매칭 (추론 주기가 길어져도 ID 유지), None이면 마지막 bbox
+        if motion_model not in (None, "kalman"):
+            raise ValueError(f"unknown motion_model: {motion_model}")
+        self.motion_model = motion_model
 
         self.frame_width: int | None = None
         self.frame_height: int | None = None
@@ -203,6 +1199,14 @@ class VisionAI:
     def register_callback(self, fn: Callable[[DetectionResult], None]) -> None:
         self.callbacks.append(fn)
 
+    def latency_stats(self) -> Dict[str, dict]:
+        """단계별 {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}"""
+        return self.metrics.stats()
+
+    def decision_stats(self) -> dict:
+        """판정이 ROI 진입보다 몇 프레임 / ms 먼저 준비됐는지 (DecisionLead.stats())"""
+        return self.decision_lead.stats()
+
     def _setup_roi(self, w: int, h: int) -> None:
         rw = int(w * self.roi_width_ratio)
         rh = int(h * self.roi_height_ratio)
@@ -214,6 +1218,11 @@ class VisionAI:
         y2 = min(h, cy + rh // 2)
         self.roi = (x1, y1, x2, y2)
 
+        if self.roi_crop:
+            px = int(w * self.roi_crop_pad)
+            py = int(h * self.roi_crop_pad)
+            self.crop = (max(0, x1 - px), max(0, y1 - py), min(w, x2 + px), min(h, y2 + py))
+
     def _is_outside_frame(self, obj: TrackedObject) -> bool:
         x1, y1, x2, y2 = obj.bbox
         if x2 < 0:
@@ -226,22 +1235,6 @@ class VisionAI:
             return True
         return False
 
-    def _calculate_iou(self, b1, b2) -> float:
-        x1, y1, x2, y2 = b1
-        X1, Y1, X2, Y2 = b2
-        inter_x1 = max(x1, X1)
-        inter_y1 = max(y1, Y1)
-        inter_x2 = min(x2, X2)
-        inter_y2 = min(y2, Y2)
-
-        if inter_x2 < inter_x1 or inter_y2 < inter_y1:
-            return 0.0
-
-        inter = (inter_x2 - inter_x1) * (inter_y2 - inter_y1)
-        area1 = (x2 - x1) * (y2 - y1)
-        area2 = (X2 - X1) * (Y2 - Y1)
-        return inter / (area1 + area2 - inter)
-
     def _is_in_roi(self, box) -> bool:
         if not self.roi:
             return False
@@ -254,6 +1247,7 @@ class VisionAI:
     # 트래킹 업데이트
     # ============================================================
     def _update_tracks(self, detections, out_list: List[bool]) -> None:
+        self._frame_index += 1
         matched: set[int] = set()
         to_remove: List[int] = []
 
@@ -261,31 +1255,52 @@ class VisionAI:
         for obj in self.tracked_objects.values():
             obj.add_missing()
 
-        # IOU 매칭 (finalized 포함, bbox 업데이트용)
-        for bbox, cls, conf in detections:
-            best_id = None
-            best_iou = self.iou_threshold
-
-            for oid, obj in self.tracked_objects.items():
-                iou = self._calculate_iou(obj.bbox, bbox)
-                if iou > best_iou:
-                    best_iou = iou
-                    best_id = oid
+        # 칼만 모드: 모든 트랙을 이번 프레임 capture 시각까지 진행 → 예측 bbox로 매칭 / 표시
+        now_ns = self._capture_ns or time.perf_counter_ns()
+        if self.motion_model == "kalman":
+            for obj in self.tracked_objects.values():
+                if obj.kalman is not None:
+                    obj.bbox = obj.kalman.predict(now_ns)
+
+        # IOU 매칭 (finalized 포함, bbox 업데이트용) — detection 1개 ↔ track 1개
+        track_ids = list(self.tracked_objects)
+        det_to_track: Dict[int, int] = {}
+        if detections and track_ids:
+            det_boxes = [d[0] for d in detections]
+            iou = iou_matrix(det_boxes, [self.tracked_objects[oid].bbox for oid in track_ids])
+            if self.motion_model == "kalman":
+                # 예측 bbox / 마지막 검출 bbox 중 더 잘 겹치는 쪽 (급정지한 물체도 같은 ID 유지)
+                last = [obj.kalman.last_bbox if obj.kalman is not None else obj.bbox
+                        for obj in (self.tracked_objects[oid] for oid in track_ids)]
+                np.maximum(iou, iou_matrix(det_boxes, last), out=iou)
+            for det_idx, track_idx in assign_detections(iou, self.iou_threshold, self.assign_method):
+                det_to_track[det_idx] = track_ids[track_idx]
+            if self.motion_model == "kalman":
+                self._gate_match(detections, track_ids, det_to_track)
+
+        for det_idx, (bbox, cls, conf) in enumerate(detections):
+            best_id = det_to_track.get(det_idx)
 
             if best_id is not None:
                 obj = self.tracked_objects[best_id]
                 obj.clear_missing()
                 obj.bbox = bbox
+                if obj.kalman is not None:
+                    obj.kalman.update(bbox, now_ns)
 
                 if not obj.finalized:
                     obj.add_detection(cls, conf)
                     obj.in_roi = self._is_in_roi(bbox)
+                    self._precompute_decision(obj, now_ns)
 
                 matched.add(best_id)
             else:
-                new_obj = TrackedObject(self.next_object_id, bbox, self.good_list)
+                new_obj = TrackedObject(self.next_object_id, bbox, self._good_set, policy=self.policy)
                 new_obj.add_detection(cls, conf)
                 new_obj.in_roi = self._is_in_roi(bbox)
+                self._precompute_decision(new_obj, now_ns)
+                if self.motion_model == "kalman":
+                    new_obj.kalman = BoxKalman(bbox, now_ns)
                 self.tracked_objects[self.next_object_id] = new_obj
                 matched.add(self.next_object_id)
                 self.next_object_id += 1
@@ -304,7 +1319,9 @@ class VisionAI:
                 continue
 
             # 비-finalized: 짧게 감지되었다가 사라지면 삭제
-            if (not obj.finalized) and obj.frame_count < self.min_frames_for_decision and oid not in matched:
+            # (판정 준비가 끝난 트랙은 노이즈가 아님 → 검출 1회 누락으로 버리지 않음, sprt는 10프레임 전에 준비됨)
+            if ((not obj.finalized) and obj.ready_frame is None
+                    and obj.frame_count < self.min_frames_for_decision and oid not in matched):
                 to_remove.append(oid)
                 continue
 
@@ -313,73 +1330,153 @@ class VisionAI:
                 to_remove.append(oid)
                 continue
 
-            # ROI 내부 + 프레임 수 충족 + 아직 finalize 안 됨 → 단 한 번 finalize
-            if (not obj.finalized) and obj.in_roi and obj.frame_count >= self.min_frames_for_decision:
+            if not obj.finalized:
+                # 이번 프레임에 검출되지 않은 칼만 트랙은 예측 위치로 ROI 진입 판단
+                if oid not in matched and obj.kalman is not None:
+                    obj.in_roi = self._is_in_roi(obj.bbox)
+                if obj.in_roi and obj.roi_frame is None:
+                    obj.roi_frame = self._frame_index
+                    obj.roi_ns = now_ns
+
+            # ROI 진입 + 판정 준비 완료 → 진입한 바로 그 주기에 단 한 번 finalize
+            # (판정은 ROI 밖에서부터 검출마다 미리 계산해 둠 → _precompute_decision)
+            if (not obj.finalized) and obj.in_roi and obj.ready_frame is not None:
                 self._finalize(obj, out_list)
 
         for oid in to_remove:
             del self.tracked_objects[oid]
 
+    # 예측 중심 거리 게이트 (χ², 자유도 2, 99%)
+    GATE_CHI2 = 9.21
+
+    def _gate_match(self, detections, track_ids: List[int], det_to_track: Dict[int, int]) -> None:
+        """
+        IoU로 매칭되지 않은 detection ↔ 칼만 트랙을 예측 중심 거리로 보조 매칭.
+        새 트랙은 속도를 모르는 상태라(불확실성 큼) 한 주기에 bbox 폭 이상 이동해도 2번째 검출에서 이어진다.
+        """
+        used = set(det_to_track.values())
+        free_tracks = [oid for oid in track_ids
+                       if oid not in used and self.tracked_objects[oid].kalman is not None]
+        free_dets = [i for i in range(len(detections)) if i not in det_to_track]
+        if not free_tracks or not free_dets:
+            return
+
+        pairs = sorted(
+            (self.tracked_objects[oid].kalman.center_distance(detections[i][0]), i, oid)
+            for i in free_dets for oid in free_tracks
+        )
+        taken_dets: set[int] = set()
+        taken_tracks: set[int] = set()
+        for dist, i, oid in pairs:
+            if dist > self.GATE_CHI2:
+                break
+            if i in taken_dets or oid in taken_tracks:
+                continue
+            det_to_track[i] = oid
+            taken_dets.add(i)
+            taken_tracks.add(oid)
+
+    def _precompute_decision(self, obj: TrackedObject, now_ns: int) -> None:
+        """검출이 추가될 때마다 판정 가능 여부 확인 (O(1)) → 처음 가능해진 프레임 기록"""
+        if obj.ready_frame is None:
+            decision = obj.get_final_decision()
+            if decision is not None:
+                obj.ready_frame = self._frame_index
+                obj.ready_ns = now_ns
+                obj.ready_decision = decision
+
     def _finalize(self, obj: TrackedObject, out_list: List[bool]) -> None:
         if obj.finalized:
             return
 
-        decision = obj.get_final_decision()
+        # 최신 검출까지 반영한 판정, SPRT 경계 안으로 되돌아간 경우 등은 준비 시점의 판정 사용
+        decision = obj.get_final_decision() or obj.ready_decision
         if not decision:
             return
 
         is_good, avg_conf = decision
         is_def = not is_good
+
+        # 판정을 확정시킨 프레임의 capture 시각부터 PLC ack까지 추적
+        trace = None
+        if self._capture_ns:
+            trace = FrameTrace(self.name, obj.object_id, self._capture_ns)
+            trace.mark("finalize")
         
         result = DetectionResult(
             timestamp=datetime.now(),
             object_id=obj.object_id,
             is_defective=is_def,
             confidence_avg=avg_conf,
-            frame_count=obj.frame_count
+            frame_count=obj.frame_count,
+            trace=trace,
         )
 
         obj.finalized = True
+        if obj.roi_frame is not None and obj.ready_frame is not None:
+            self.decision_lead.record(obj.roi_frame - obj.ready_frame, obj.roi_ns - obj.ready_ns)
 
         # 내부용 bool 결과 (True = Good, False = Bad)
         out_list.append(is_good)
 
         # 상위 콜백들 호출 (DetectionResult 단위)
+        t0 = time.perf_counter_ns()
         for cb in self.callbacks:
             try:
                 cb(result)
             except Exception as e:
                 print(f"Vision callback error: {e}")
+        elapsed = time.perf_counter_ns() - t0
+        self._callback_ns += elapsed
+        self.metrics.record("callbacks", elapsed)
 
     # ============================================================
     # 그래픽 표시
     # ============================================================
+    def snapshot(self) -> List[tuple]:
+        """표시용 트랙 상태 복사본 [(oid, bbox, finalized, is_good, frame_count), ...]"""
+        return [
+            (oid, obj.bbox, obj.finalized, obj.is_good, obj.frame_count)
+            for oid, obj in self.tracked_objects.items()
+        ]
+
     def _draw_roi(self, frame):
-        if self.roi:
-            x1, y1, x2, y2 = self.roi
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
-        return frame
+        return draw_roi(frame, self.roi)
 
     def _draw_tracks(self, frame):
-        for oid, obj in self.tracked_objects.items():
-            x1, y1, x2, y2 = map(int, obj.bbox)
-
-            if obj.finalized:
-                color = (0, 255, 0) if obj.is_good else (0, 0, 255)
-                label = "Good" if obj.is_good else "Bad"
-            else:
-                color = (128, 128, 128)
-                label = f"{oid}({obj.frame_count})"
-
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            cv2.putText(frame, label, (x1, y1 - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-        return frame
+        return draw_tracks(frame, self.snapshot())
 
     # ============================================================
     # 프레임 처리 API
     # ============================================================
-    def process_frame(self, frame):
+    def _has_tracks_in_view(self) -> bool:
+        return any(not self._is_outside_frame(obj) for obj in self.tracked_objects.values())
+
+    def _age_tracks(self) -> None:
+        """
+        추론 생략 프레임: 모든 트랙 missing_time 증가 (칼만 트랙은 예측 위치로 진행)
+        → 화면을 벗어난 finalized 트랙 / 오래 미검출 트랙은 추론 프레임과 같은 규칙으로 삭제
+        """
+        now_ns = self._capture_ns or time.perf_counter_ns()
+        for oid, obj in list(self.tracked_objects.items()):
+            obj.add_missing()
+            if obj.kalman is not None:
+                obj.bbox = obj.kalman.predict(now_ns)
+            if (obj.finalized and self._is_outside_frame(obj)) or obj.missing_time > self.max_missing_times:
+                del self.tracked_objects[oid]
+
+    def prepare(self, frame, capture_ns: int = 0):
+        """
+        프레임 크기 / ROI 초기화 + 전처리 → 엔진에 넣을 입력 이미지 반환.
+        imgsz가 설정되어 있으면 재사용 버퍼에 letterbox 된 이미지 (다음 prepare() 전까지 유효)
+        InferenceScheduler / MotionGate가 생략을 결정하면 None (이번 프레임 추론 생략)
+        """
+        t0 = time.perf_counter_ns()
+        image = self._preprocess(frame, capture_ns or t0)
+        self.metrics.record("preprocess", time.perf_counter_ns() - t0)
+        return image
+
+    def _preprocess(self, frame, now_ns: int):
         h, w = frame.shape[:2]
         self.frame_width = w
         self.frame_height = h
@@ -387,31 +1484,205 @@ class VisionAI:
         if self.roi is None:
             self._setup_roi(w, h)
 
-        results = self.model(frame, conf=0.85, verbose=False)
-        detections = []
-
-        if len(results[0].boxes) > 0:
-            boxes = results[0].boxes
-            names = results[0].names
-
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                cls_id = int(box.cls[0])
-                conf = float(box.conf[0])
-                cls_name = names[cls_id]
+        if self.scheduler is not None and not self.scheduler.check(self, now_ns):
+            return None
 
-                if cls_name in self.good_list or cls_name in self.bad_list:
-                    detections.append(((x1, y1, x2, y2), cls_name, conf))
+        # 화면 안에 트랙이 있으면 (finalized 포함) 정지해 있어도 계속 추론
+        # → 판정 샘플 확보 + 저대비 물체가 finalized 트랙 자리를 이어받아 판정 없이 지나가는 것 방지
+        if self.motion_gate is not None and not self.motion_gate.check(frame, force=self._has_tracks_in_view()):
+            return None
 
+        if self.crop is not None:
+            cx1, cy1, cx2, cy2 = self.crop
+            frame = frame[cy1:cy2, cx1:cx2]     # 복사 없는 view
+
+        if self.letterbox is None:
+            return frame
+        return self.letterbox(frame)
+
+    def _to_frame_detections(self, raw_detections: List[tuple]) -> List[tuple]:
+        """입력 이미지 좌표 → 전체 프레임 좌표 + 카메라 기준 클래스만 남김"""
+        if self.letterbox is not None:
+            raw_detections = self.letterbox.restore(raw_detections)
+
+        if self.crop is not None:
+            # 크롭 좌표 → 전체 프레임 좌표
+            cx1, cy1, _, _ = self.crop
+            raw_detections = [
+                ((x1 + cx1, y1 + cy1, x2 + cx1, y2 + cy1), cls_name, conf)
+                for (x1, y1, x2, y2), cls_name, conf in raw_detections
+            ]
+
+        return [
+            (bbox, cls_name, conf) for bbox, cls_name, conf in raw_detections
+            if cls_name in self._class_set and conf >= self.policy.conf
+        ]
+
+    def process_detections(self, frame, raw_detections: List[tuple] | None, capture_ns: int = 0):
+        """
+        엔진 추론 결과(raw_detections)로 트래킹/판정/그리기 수행.
+        raw_detections : prepare()가 반환한 입력 이미지 기준 [(bbox, cls_name, conf), ...]
+                         None이면 추론 생략 프레임 → 검출 없이 트랙만 진행 (_age_tracks)
+        capture_ns     : 프레임 capture 시각 (perf_counter_ns) → DetectionResult.trace 기준점
+        반환 : (화면 합성 이미지 | render=False면 None, finalize된 bool 결과 리스트)
+        """
         out_list: List[bool] = []
-        self._update_tracks(detections, out_list)
+        self._capture_ns = capture_ns
+        if raw_detections is not None:
+            t0 = time.perf_counter_ns()
+            self._callback_ns = 0
+            self._update_tracks(self._to_frame_detections(raw_detections), out_list)
+            # 콜백 시간은 callbacks 단계로 따로 기록되므로 제외
+            self.metrics.record("tracking", time.perf_counter_ns() - t0 - self._callback_ns)
+        else:
+            self._age_tracks()
 
+        if not self.render:
+            return None, out_list
+
+        t0 = time.perf_counter_ns()
         disp = frame.copy()
         disp = self._draw_roi(disp)
         disp = self._draw_tracks(disp)
+        self.metrics.record("drawing", time.perf_counter_ns() - t0)
 
         return disp, out_list
 
+    def process_frame(self, frame, capture_ns: int = 0):
+        image = self.prepare(frame, capture_ns)
+        raw_detections = None
+        if image is not None:
+            t0 = time.perf_counter_ns()
+            raw_detections = self.engine.infer([image])[0]
+            self.metrics.record("inference", time.perf_counter_ns() - t0)
+        return self.process_detections(frame, raw_detections, capture_ns)
+
+
+# ============================================================
+# BatchedVision — 모든 카메라의 최신 프레임을 모아 1회 배치 추론
+# ============================================================
+class BatchedVision:
+    """
+    카메라별 VisionAI가 같은 InferenceEngine을 공유할 때 사용.
+    step() 1회 = 각 카메라 최신 프레임 수집 → 배치 forward 1회 → 카메라별 트래커로 분배
+    """
+    def __init__(self, engine: InferenceEngine, visions: Dict[int, VisionAI]):
+        self.engine = engine
+        self.visions = visions
+        self.last_frames: Dict[int, np.ndarray] = {}   # 마지막 step()에서 처리한 원본 프레임
+
+    def step(self, cam: CameraStream, timeout: float = 0.0) -> Dict[int, tuple]:
+        """timeout : 새 프레임이 하나도 없을 때 첫 카메라 프레임을 기다릴 최대 시간(초)"""
+        frames = {}
+        stamps = {}
+        for cam_id in self.visions:
+            frame = cam.get_frame(cam_id)
+            if frame is not None:
+                frames[cam_id] = frame
+                stamps[cam_id] = cam.capture_ns(cam_id)
+
+        if not frames and timeout > 0:
+            first = next(iter(self.visions))
+            frame = cam.get_frame(first, timeout)
+            if frame is None:
+                return {}
+            frames[first] = frame
+            stamps[first] = cam.capture_ns(first)
+            for cam_id in self.visions:
+                if cam_id not in frames:
+                    frame = cam.get_frame(cam_id)
+                    if frame is not None:
+                        frames[cam_id] = frame
+                        stamps[cam_id] = cam.capture_ns(cam_id)
+
+        if not frames:
+            return {}
+        self.last_frames = frames
+
+        images = {cam_id: self.visions[cam_id].prepare(frame, stamps[cam_id]) for cam_id, frame in frames.items()}
+
+        # InferenceScheduler / MotionGate로 생략된 카메라는 배치에서 제외
+        infer_ids = [cam_id for cam_id, image in images.items() if image is not None]
+        t0 = time.perf_counter_ns()
+        batch_detections = dict(zip(infer_ids, self.engine.infer([images[cam_id] for cam_id in infer_ids])))
+        if infer_ids:
+            # 배치 1회 시간을 참여한 카메라 모두에 기록
+            elapsed = time.perf_counter_ns() - t0
+            for cam_id in infer_ids:
+                self.visions[cam_id].metrics.record("inference", elapsed)
+
+        outputs = {}
+        for cam_id, frame in frames.items():
+            outputs[cam_id] = self.visions[cam_id].process_detections(
+                frame, batch_detections.get(cam_id), stamps[cam_id])
+        return outputs
+
+
+# ============================================================
+# DisplayThread — 추론 루프와 분리된 화면 표시 (최대 max_fps)
+# ============================================================
+class DisplayThread:
+    """
+    비전 루프는 publish()로 최신 프레임/트랙 스냅샷만 넘기고,
+    ROI/트랙 그리기 + imshow + waitKey는 이 스레드가 max_fps 이하로 수행한다.
+    - due(cam_id)가 True일 때만 publish() → 표시 주기마다 1회만 프레임 복사 / 스냅샷 생성
+    - ESC 입력 시 quit_requested = True, 그 외 키는 on_key(key) 콜백으로 전달
+    """
+    def __init__(self, max_fps: float = 15.0, on_key: Callable[[int], None] | None = None):
+        self.interval = 1.0 / max_fps
+        self.on_key = on_key
+        self.running = False
+        self.quit_requested = False
+
+        self._lock = threading.Lock()
+        self._pending: Dict[int, tuple] = {}       # cam_id → (frame, roi, tracks)
+        self._last_publish: Dict[int, float] = {}
+
+    def due(self, cam_id: int) -> bool:
+        """이 카메라 화면을 갱신할 때가 되었는지 (True면 표시 주기 시작)"""
+        now = time.monotonic()
+        if now - self._last_publish.get(cam_id, 0.0) < self.interval:
+            return False
+        self._last_publish[cam_id] = now
+        return True
+
+    def publish(self, cam_id: int, frame, roi, tracks: List[tuple]) -> None:
+        # 링버퍼 슬롯은 곧 재사용되므로 표시할 프레임만 복사해 둔다
+        with self._lock:
+            self._pending[cam_id] = (frame.copy(), roi, tracks)
+
+    def _loop(self) -> None:
+        while self.running:
+            start = time.monotonic()
+
+            with self._lock:
+                pending, self._pending = self._pending, {}
+
+            for cam_id, (frame, roi, tracks) in pending.items():
+                draw_roi(frame, roi)
+                draw_tracks(frame, tracks)
+                cv2.imshow(f"CAM{cam_id}", frame)
+
+            key = cv2.waitKey(1)
+            if key == 27:
+                self.quit_requested = True
+            elif key != -1 and self.on_key is not None:
+                self.on_key(key)
+
+            remain = self.interval - (time.monotonic() - start)
+            if remain > 0:
+                time.sleep(remain)
+
+        cv2.destroyAllWindows()
+
+    def start(self) -> None:
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="Display")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.running = False
+
 
 # ============================================================
 # 품질 검사 & 로그 (원하면 사용)
@@ -430,30 +1701,213 @@ class QualityInspector:
 
 
 class DataLogger:
-    def __init__(self, fname: str):
+    """
+    DetectionResult → JSON Lines 파일 (1줄 = to_dict() 1개).
+    - on_detection()은 큐에 넣기만 함 → 비전 스레드에서 디스크 I/O 없음
+    - 쓰기 스레드가 batch_size개 또는 flush_interval초마다 모아서 write + flush + fsync 1회
+    - 크기(max_bytes) 또는 날짜가 바뀌면 현재 파일을 {이름}.{YYYYMMDD}.{n}{확장자}로 돌리고 새 파일 시작
+    - 큐가 가득 차면(디스크 정지 등) 대기하지 않고 버림 → dropped 카운트
+    - close() : 남은 기록을 모두 쓴 뒤 종료
+    - store   : ResultStore가 주어지면 같은 배치를 camera 번호로 이력 저장소에도 append (구간 조회용)
+    """
+    def __init__(self, fname: str, max_bytes: int = 10 * 1024 * 1024, rotate_daily: bool = True,
+                 batch_size: int = 256, flush_interval: float = 0.5, fsync: bool = True,
+                 max_queue: int = 10000, store: ResultStore | None = None, camera: int = 0):
         self.fname = fname
-        with open(self.fname, "w") as f:
-            f.write("=== LOG START ===\n")
+        self.store = store
+        self.camera = camera
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.dropped = 0
+        self.written = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._file_date = ""
+        self._closed = False
+
+        # 이전 실행의 기록은 지우지 않고 날짜 이름으로 보관
+        if os.path.exists(fname) and os.path.getsize(fname) > 0:
+            self._rotate(datetime.fromtimestamp(os.path.getmtime(fname)).strftime("%Y%m%d"))
+
+        self._thread = threading.Thread(target=self._writer, daemon=True, name=f"DataLogger-{fname}")
+        self._thread.start()
 
     def on_detection(self, r: DetectionResult):
-        with open(self.fname, "a") as f:
-            f.write(str(r.to_dict()) + "\n")
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(r.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    # ---------------- 쓰기 스레드 ----------------
+    def _rotate(self, date: str) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        root, ext = os.path.splitext(self.fname)
+        n = 0
+        while os.path.exists(f"{root}.{date}.{n}{ext}"):
+            n += 1
+        os.replace(self.fname, f"{root}.{date}.{n}{ext}")
+
+    def _open(self, date: str) -> None:
+        self._file = open(self.fname, "a", encoding="utf-8")
+        self._file_date = date
+
+    def _write_batch(self, batch: List[dict]) -> None:
+        for record in batch:
+            date = record["timestamp"][:10].replace("-", "")
+            if self._file is None:
+                self._open(date)
+            elif (self.rotate_daily and date != self._file_date) or self._file.tell() >= self.max_bytes:
+                self._rotate(self._file_date)
+                self._open(date)
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.written += len(batch)
+
+    def _writer(self) -> None:
+        stop = False
+        while not stop:
+            batch: List[dict] = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # 첫 기록 이후 batch_size까지는 이미 쌓인 것만 모음 (대기 X)
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                stop = True     # None = close() 신호
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    print(f"[DataLogger] 쓰기 오류 ({self.fname}): {e}")
+                if self.store is not None:
+                    try:
+                        self.store.append(self.camera, batch)
+                    except Exception as e:
+                        print(f"[DataLogger] 이력 저장 오류 (camera {self.camera}): {e}")
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self, timeout: float = 5.0) -> None:
+        """남은 기록을 모두 쓰고 쓰기 스레드 종료"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
 
 # ============================================================
 # 실행부 — 카메라 0, 1 독립 처리 + 시작 신호/콜백 컨트롤러 예시
 # ============================================================
-def setup_camera(callbacks: list[Callable], shared_signals: dict):
+def setup_camera(callbacks: list[Callable], shared_signals: dict, use_processes: bool = False,
+                 headless: bool = False, display_fps: float | None = 15.0,
+                 metrics_json: str | None = "vision_metrics.json",
+                 callbacks_with_trace: bool = False, e2e_deadline_ms: float = 500.0,
+                 results_dir: str = "results", motion_model: str | None = None,
+                 adaptive_rate: bool = False, policy_path: str | None = "decision_policy.yaml",
+                 motion_gate: bool = False, conveyor_speed: float = 300.0):
+    """
+    use_processes=False : 비전 스레드 1개에서 두 카메라를 배치 추론 (모델 1개 공유)
+    use_processes=True  : 카메라별 워커 프로세스에서 VisionAI 실행 (GIL 분리, 모델은 프로세스마다 1개)
+    headless=True       : 그리기 / imshow 전부 생략
+    display_fps         : 화면 표시를 별도 스레드에서 최대 display_fps로 수행
+                          (None이면 기존처럼 비전 루프에서 매 프레임 표시, use_processes=True면 워커가 같은 주기로 표시)
+    metrics_json        : 단계별 지연 통계 JSON 스냅샷 경로 (None이면 로그만)
+    callbacks_with_trace: True면 callbacks[i](is_good, trace) 형태로 호출
+                          → PLC 쓰기 완료 후 trace.finish()하면 capture → PLC ack 지연이 기록된다
+    e2e_deadline_ms     : capture → PLC ack 허용 시간, 초과한 객체는 경고 로그 + 스냅샷에 기록
+    results_dir         : 판정 이력 저장소 경로 (ResultStore.defect_rate()로 구간 불량률 조회)
+    motion_model        : "kalman"이면 트랙별 등속 예측으로 매칭 (추론 주기가 길어도 ID 유지)
+    adaptive_rate       : 카메라별 InferenceScheduler로 트랙 상태에 따라 추론 주기 조절
+                          (motion_model="kalman"과 함께 써야 ROI에서 먼 / 판정 끝난 물체 구간을 줄일 수 있음)
+    conveyor_speed      : 예상 최대 컨베이어 속도 (px/s) → adaptive_rate의 idle 추론 간격 계산에 사용
+    policy_path         : 카메라 / 제품별 판정 정책 YAML (없으면 기존 기본값)
+    motion_gate         : 카메라별 MotionGate로 트랙이 없는 정지 장면의 추론 생략
+                          (프레임 차분 기준이라 벨트와 대비가 낮은 물체는 진입이 늦게 감지될 수 있음 → 기본 꺼짐)
+    """
     cam = CameraStream([0, 1])
     cam.start()
 
-    vision0 = VisionAI(model_path, good_list=good_prod0, bad_list=bad_prod0)
-    vision1 = VisionAI(model_path, good_list=good_prod1, bad_list=bad_prod1)
+    e2e_tracer.deadline_ms = e2e_deadline_ms
+    e2e_tracer.attach("CAM0", cam.metrics[0])
+    e2e_tracer.attach("CAM1", cam.metrics[1])
+
+    display = DisplayThread(display_fps) if not headless and display_fps else None
+    render_in_loop = not headless and display is None
+
+    policy0 = load_policy(policy_path, "CAM0", good_prod0)
+    policy1 = load_policy(policy_path, "CAM1", good_prod1)
+
+    if use_processes:
+        from vision_worker import VisionProcess
+        vision0 = VisionProcess(0, model_path, good_prod0, bad_prod0, show=not headless,
+                                display_fps=display_fps,
+                                metrics=cam.metrics[0], motion_gate=MotionGate() if motion_gate else None, name="CAM0",
+                                motion_model=motion_model, policy=policy0,
+                                scheduler=InferenceScheduler(max_speed=conveyor_speed) if adaptive_rate else None)
+        vision1 = VisionProcess(1, model_path, good_prod1, bad_prod1, show=not headless,
+                                display_fps=display_fps,
+                                metrics=cam.metrics[1], motion_gate=MotionGate() if motion_gate else None, name="CAM1",
+                                motion_model=motion_model, policy=policy1,
+                                scheduler=InferenceScheduler(max_speed=conveyor_speed) if adaptive_rate else None)
+        reporter = MetricsReporter([vision0, vision1], json_path=metrics_json,
+                                   extra=lambda: {"CAM0_decision_lead": vision0.decision_stats(),
+                                                  "CAM1_decision_lead": vision1.decision_stats(),
+                                                  "e2e": e2e_tracer.stats()})
+    else:
+        # 모델 1개를 두 카메라가 공유, 프레임은 배치로 한 번에 추론
+        # (엔진은 낮은 쪽 conf로 검출, 카메라별 conf는 VisionAI에서 다시 거름)
+        engine = create_engine(model_path, conf=min(policy0.conf, policy1.conf))
+        vision0 = VisionAI(model_path, good_list=good_prod0, bad_list=bad_prod0, engine=engine,
+                           motion_gate=MotionGate() if motion_gate else None, render=render_in_loop,
+                           name="CAM0", metrics=cam.metrics[0], motion_model=motion_model, policy=policy0,
+                           scheduler=InferenceScheduler(max_speed=conveyor_speed) if adaptive_rate else None)
+        vision1 = VisionAI(model_path, good_list=good_prod1, bad_list=bad_prod1, engine=engine,
+                           motion_gate=MotionGate() if motion_gate else None, render=render_in_loop,
+                           name="CAM1", metrics=cam.metrics[1], motion_model=motion_model, policy=policy1,
+                           scheduler=InferenceScheduler(max_speed=conveyor_speed) if adaptive_rate else None)
+        batch = BatchedVision(engine, {0: vision0, 1: vision1})
+        reporter = MetricsReporter(
+            [vision0.metrics, vision1.metrics], json_path=metrics_json,
+            extra=lambda: {**({"CAM0_motion_gate": vision0.motion_gate.stats(),
+                               "CAM1_motion_gate": vision1.motion_gate.stats()} if motion_gate else {}),
+                           **({"CAM0_scheduler": vision0.scheduler.stats(),
+                               "CAM1_scheduler": vision1.scheduler.stats()} if adaptive_rate else {}),
+                           "CAM0_decision_lead": vision0.decision_stats(),
+                           "CAM1_decision_lead": vision1.decision_stats(),
+                           "e2e": e2e_tracer.stats()},
+        )
+    # 30초마다 단계별 p50/p95/p99 로그 + JSON 스냅샷
+    reporter.start()
 
     inspector0 = QualityInspector("CAM0")
     inspector1 = QualityInspector("CAM1")
 
-    logger0 = DataLogger("cam0_log.txt")
-    logger1 = DataLogger("cam1_log.txt")
+    # JSONL 로그 + 구간 조회용 이력 저장소 (results/camN/YYYYMMDD.bin)
+    store = ResultStore(results_dir)
+    logger0 = DataLogger("cam0_log.jsonl", store=store, camera=0)
+    logger1 = DataLogger("cam1_log.jsonl", store=store, camera=1)
 
     # 시작 신호 + bool 콜백 컨트롤러 (카메라별 1개)
     signal0 = DetectionSignalController("CAM0")
@@ -465,14 +1919,14 @@ def setup_camera(callbacks: list[Callable], shared_signals: dict):
     def bridge_cam0(res: DetectionResult):
         try:
             is_good = not res.is_defective
-            signal0.handle_detection(is_good)
+            signal0.handle_detection(is_good, res.trace)
         except Exception as e:
             print(f"Bridge CAM0 error: {e}")
 
     def bridge_cam1(res: DetectionResult):
         try:
             is_good = not res.is_defective
-            signal1.handle_detection(is_good)
+            signal1.handle_detection(is_good, res.trace)
         except Exception as e:
             print(f"Bridge CAM1 error: {e}")
 
@@ -485,32 +1939,55 @@ def setup_camera(callbacks: list[Callable], shared_signals: dict):
     vision1.register_callback(logger1.on_detection)
     vision1.register_callback(bridge_cam1)
 
-    signal0.set_result_callback(callbacks[0])
-    signal1.set_result_callback(callbacks[1])
+    signal0.set_result_callback(callbacks[0], with_trace=callbacks_with_trace)
+    signal1.set_result_callback(callbacks[1], with_trace=callbacks_with_trace)
 
     def vision_loop_cam():
-        while True:
-            f0 = cam.get_frame(0)
-            f1 = cam.get_frame(1)
-
-            if f0 is not None:
-                out0, _ = vision0.process_frame(f0)
-                cv2.imshow("CAM0", out0)
-
-            if f1 is not None:
-                out1, _ = vision1.process_frame(f1)
-                cv2.imshow("CAM1", out1)
+        if display is not None:
+            display.start()
 
-            if cv2.waitKey(1) == 27:
-                break
+        while True:
+            outputs = batch.step(cam, timeout=0.05)
+
+            if display is not None:
+                # 표시 주기가 된 카메라만 스냅샷 전달 (그리기는 DisplayThread에서)
+                for cam_id in outputs:
+                    if display.due(cam_id):
+                        vision = batch.visions[cam_id]
+                        display.publish(cam_id, batch.last_frames[cam_id], vision.roi, vision.snapshot())
+                if display.quit_requested:
+                    break
+            elif render_in_loop:
+                for cam_id, (disp, _) in outputs.items():
+                    cv2.imshow(f"CAM{cam_id}", disp)
+                if cv2.waitKey(1) == 27:
+                    break
 
         cam.stop()
+        reporter.stop()
         logger0.close()
         logger1.close()
-        cv2.destroyAllWindows()
-        
+        if display is not None:
+            display.stop()
+        elif render_in_loop:
+            cv2.destroyAllWindows()
+
+    def vision_loop_proc():
+        # 화면/추론은 워커가 담당, 부모는 종료(ESC 또는 워커 이상)만 감시
+        vision0.start(cam)
+        vision1.start(cam)
+        while vision0.running and vision1.running:
+            time.sleep(0.2)
+
+        vision0.stop()
+        vision1.stop()
+        cam.stop()
+        reporter.stop()
+        logger0.close()
+        logger1.close()
+
 	  # Vision thread 시작
-    t = threading.Thread(target=vision_loop_cam, daemon=True)
+    t = threading.Thread(target=vision_loop_proc if use_processes else vision_loop_cam, daemon=True)
     t.start()
 
     shared_signals["RUNNING"] = True
@@ -522,14 +1999,16 @@ if __name__ == "__main__":
     cam = CameraStream([0, 1])
     cam.start()
 
-    vision0 = VisionAI(model_path, good_list=good_prod0, bad_list=bad_prod0)
-    vision1 = VisionAI(model_path, good_list=good_prod1, bad_list=bad_prod1)
+    engine = create_engine(model_path)
+    vision0 = VisionAI(model_path, good_list=good_prod0, bad_list=bad_prod0, engine=engine)
+    vision1 = VisionAI(model_path, good_list=good_prod1, bad_list=bad_prod1, engine=engine)
+    batch = BatchedVision(engine, {0: vision0, 1: vision1})
 
     inspector0 = QualityInspector("CAM0")
     inspector1 = QualityInspector("CAM1")
 
-    logger0 = DataLogger("cam0_log.txt")
-    logger1 = DataLogger("cam1_log.txt")
+    logger0 = DataLogger("cam0_log.jsonl")
+    logger1 = DataLogger("cam1_log.jsonl")
 
     # 시작 신호 + bool 콜백 컨트롤러 (카메라별 1개)
     signal0 = DetectionSignalController("CAM0")
@@ -564,16 +2043,10 @@ if __name__ == "__main__":
     signal1.set_result_callback(plc_cam1_callback)
 
     while True:
-        f0 = cam.get_frame(0)
-        f1 = cam.get_frame(1)
-
-        if f0 is not None:
-            out0, _ = vision0.process_frame(f0)
-            cv2.imshow("CAM0", out0)
+        outputs = batch.step(cam)
 
-        if f1 is not None:
-            out1, _ = vision1.process_frame(f1)
-            cv2.imshow("CAM1", out1)
+        for cam_id, (disp, _) in outputs.items():
+            cv2.imshow(f"CAM{cam_id}", disp)
 
         key = cv2.waitKey(1)
 
@@ -587,4 +2060,6 @@ if __name__ == "__main__":
             break
 
     cam.stop()
+    logger0.close()
+    logger1.close()
     cv2.destroyAllWindows()
@@ -195,14 +195,16 @@ def dobot_step(step_index, _api_map=None):
 if __name__ == "__main__":
     print("🔌 PLC 신호 감시 시작 (Ctrl+C로 종료)\n")
 
-    plc = PLC(ip='192.168.3.10', port=5010)
+    # 상태 전송(write_bit_in_real_time)은 백그라운드 스레드로 → 두봇 시퀀스가 HTTP 응답을 기다리지 않음
+    plc = PLC(ip='192.168.3.10', port=5010, status_async=True)
 		
     setup_camera(
         callbacks=[
-            lambda r: plc.async_plc_write(idx=1, is_good_bad=r),            # 0번 카메라 양품 신호
-            lambda r: plc.async_plc_write(idx=0, is_good_bad=r)             # 1번 카메라 양품 신호
+            lambda r, t: plc.async_plc_write(idx=1, is_good_bad=r, trace=t),    # 0번 카메라 양품 신호
+            lambda r, t: plc.async_plc_write(idx=0, is_good_bad=r, trace=t)     # 1번 카메라 양품 신호
         ],
-        shared_signals=shared_signals
+        shared_signals=shared_signals,
+        callbacks_with_trace=True,      # capture → PLC ack 지연 기록 (vision_metrics.json "e2e")
     )
     
     # 검사용 프로그램 완전 작동 시까지 대기
@@ -5,9 +5,130 @@ import threading
 import time
 import pymcprotocol
 import requests
+from requests.adapters import HTTPAdapter
+
+class StatusPublisher:
+    """
+    태그 상태를 짧은 구간(window초) 동안 모았다가 /status/update_many로 한 번에 전송
+    - 같은 태그는 마지막 값만 남김 (M103 ON → OFF가 한 구간이면 OFF 1건)
+    - 연결 오류 / 타임아웃 / 5xx : 구간 안에 더 새 값이 없는 태그만 되돌려 재전송
+      (retry_interval부터 실패할 때마다 2배, 최대 max_retry_interval — 성공하면 초기화)
+    - 4xx (인증 / 형식 오류) : 다시 보내도 같은 결과이므로 로그만 남기고 batch 버림 (rejected 카운트)
+    - 대기 태그가 max_pending개를 넘으면 새 태그는 버리고 dropped 카운트
+    """
+    def __init__(self, session, url, plc_id="PLC1", window=0.05, max_pending=1000, retry_interval=1.0,
+                 max_retry_interval=30.0):
+        self.session = session
+        self.url = url
+        self.plc_id = plc_id
+        self.window = window
+        self.max_pending = max_pending
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.stats = {"published": 0, "coalesced": 0, "dropped": 0,
+                      "batches": 0, "sent": 0, "failed": 0, "rejected": 0}
+
+        self._pending = {}          # tag → val (처음 들어온 순서 유지)
+        self._inflight = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="PLC-Status")
+        self._thread.start()
+
+    def publish(self, tag, val):
+        with self._cond:
+            self.stats["published"] += 1
+            if tag in self._pending:
+                self.stats["coalesced"] += 1
+            elif len(self._pending) >= self.max_pending:
+                self.stats["dropped"] += 1
+                print(f"[⚠️ 상태 전송 대기 가득 참] {tag}={val} 버림")
+                return
+            self._pending[tag] = val
+            self._cond.notify_all()
+
+    def _run(self):
+        backoff = self.retry_interval
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                closing = self._closed
+            # 첫 변경 후 window초 동안 더 모음 (종료 중이면 바로 전송)
+            if not closing:
+                time.sleep(self.window)
+
+            with self._cond:
+                batch, self._pending = self._pending, {}
+                self._inflight = True
+
+            result = self._send(batch)
+
+            with self._cond:
+                self._inflight = False
+                if result == "retry" and not self._closed:
+                    for tag, val in batch.items():
+                        self._pending.setdefault(tag, val)
+                self._cond.notify_all()
+
+                if result != "retry":
+                    backoff = self.retry_interval
+                elif not closing:
+                    # 재시도 대기 (close() 하면 바로 깨어남)
+                    self._cond.wait_for(lambda: self._closed, backoff)
+                    backoff = min(backoff * 2, self.max_retry_interval)
+
+    def _send(self, batch):
+        """"ok" / "retry" (연결 오류, 5xx) / "drop" (4xx 등 다시 보내도 실패할 요청)"""
+        items = [{"plc_id": self.plc_id, "tag": tag, "val": val} for tag, val in batch.items()]
+        try:
+            resp = self.session.post(self.url, json={"items": items}, timeout=1)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            self.stats["failed"] += 1
+            print(f"[⚠️ 상태 일괄 전송 실패] {len(items)}건 재시도 예정: {e}")
+            return "retry"
+        except Exception as e:
+            self.stats["rejected"] += len(items)
+            print(f"[⚠️ 상태 일괄 전송 오류] {len(items)}건 버림: {e}")
+            return "drop"
+
+        if resp.status_code >= 500:
+            self.stats["failed"] += 1
+            print(f"[⚠️ 상태 일괄 전송 실패] {len(items)}건 재시도 예정: HTTP {resp.status_code}")
+            return "retry"
+        if resp.status_code >= 400:
+            self.stats["rejected"] += len(items)
+            print(f"[⚠️ 상태 일괄 전송 거부] {len(items)}건 버림: HTTP {resp.status_code} {resp.text[:200]}")
+            return "drop"
+
+        self.stats["batches"] += 1
+        self.stats["sent"] += len(items)
+        return "ok"
+
+    def flush(self, timeout=2.0):
+        """대기 중 / 전송 중인 상태가 모두 나갈 때까지 대기 (최대 timeout초) → 비었으면 True"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._inflight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=2.0):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=timeout)
+
 
 class PLC:
     url = "http://127.0.0.1:8080/status/update" if len(sys.argv) > 1 else "http://127.0.0.1:8080/status/update"
+    url_many = "http://127.0.0.1:8080/status/update_many"
     headers = {"x-api-key": "1111"}
     signal_for_OD_result = {
         "Waper1Good": "M2100",
@@ -16,13 +137,17 @@ class PLC:
         "Waper2Bad": "M2103",
     }
 
-    def __init__(self, ip='192.168.3.10', port=5010, retry=3, retry_interval=2):
+    def __init__(self, ip='192.168.3.10', port=5010, retry=3, retry_interval=2,
+                 status_async=False, status_window=0.05):
         """
         Mitsubishi PLC 연결 클래스
         :param ip: PLC IP 주소
         :param port: PLC 통신 포트
         :param retry: 연결 재시도 횟수
         :param retry_interval: 재시도 간격 (초)
+        :param status_async: True면 write_bit_in_real_time이 StatusPublisher에 넣고 바로 반환
+                             (status_window초 동안 모은 태그를 /status/update_many로 일괄 전송)
+        :param status_window: 일괄 전송 모음 구간 (초)
         """
         self.ip = ip
         self.port = port
@@ -31,6 +156,18 @@ class PLC:
         self.mc = pymcprotocol.Type3E()
         self.plc_lock = threading.Lock()
         self.connected = False
+
+        # 브리지 서버 상태 전송 — keep-alive 세션 1개를 재사용 (요청마다 TCP 연결 생성 X)
+        self.http = requests.Session()
+        self.http.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self.status_stats = {"sent": 0, "failed": 0}
+
+        self.status_async = status_async
+        self.publisher = StatusPublisher(self.http, self.url_many, window=status_window) if status_async else None
+
         self.connect()
 
     def connect(self):
@@ -64,7 +201,7 @@ class PLC:
         except Exception as e:
             print(f"[⚠️ PLC 비트 쓰기 오류] {e}")
 
-    def write_bit_for_vision_callback(self, idx:int, is_good: bool):
+    def write_bit_for_vision_callback(self, idx:int, is_good: bool, trace=None):
         """
             2025.12.09 추가 로직\n
             Vision 검사에서 양불량 판정 시 해당 로직을 작동시켜
@@ -78,8 +215,12 @@ class PLC:
             M2102 : 양품 검출 / M2103 : 불량품 검출
 
             :param is_good_bad: 양/불량 검출 신호
+            :param trace: vision_metrics.FrameTrace — 있으면 lock 획득 / ON 쓰기 완료 시점 기록 후 finish()
         """
         with self.plc_lock:
+            if trace is not None:
+                # 이전 판정의 ON 유지(3초~) 중이면 여기서 대기 → plc_lock 구간으로 드러남
+                trace.mark("plc_lock")
             try:
                 print(f"[PLC Write] idx={idx}, is_good_bad={is_good}, thread={threading.current_thread().name}")
                 if idx == 0:
@@ -97,6 +238,9 @@ class PLC:
                 
                 # PLC 쓰기 (ON)
                 self.mc.batchwrite_bitunits(device, [1])
+                if trace is not None:
+                    trace.mark("plc_ack")
+                    trace.finish()
                 print(f"[PLC] {device} = ON")
 
                 # 3초 유지
@@ -116,16 +260,17 @@ class PLC:
             except Exception as e:
                 print(f"[⚠️ PLC 비트 쓰기 오류] {e}")
 
-    def async_plc_write(self, idx:int, is_good_bad: bool):
+    def async_plc_write(self, idx:int, is_good_bad: bool, trace=None):
         """
         2025.12.09 추가 로직\n
         write_bit_for_vision_callback을 비동기적으로 실행하여
         실시간 PLC 데이터 쓰기를 보장함
         
         :param is_good_bad: 양/불량 검출 신호
+        :param trace: capture → PLC ack 추적 (DetectionSignalController가 넘겨줌)
         """
         threading.Thread(
-            target=lambda: self.write_bit_for_vision_callback(idx, is_good_bad),
+            target=lambda: self.write_bit_for_vision_callback(idx, is_good_bad, trace),
             daemon=True,
             name=f"PLC-CAM{idx}"  # 디버깅용 스레드 이름
         ).start()
@@ -152,7 +297,11 @@ class PLC:
         return self.connected
 
     def close(self):
-        """PLC 연결 해제"""
+        """PLC 연결 해제 (남은 상태 전송을 먼저 비움)"""
+        if self.publisher is not None:
+            self.publisher.close()
+            self.publisher = None
+        self.http.close()
         try:
             self.mc.close()
             print("[🔌 PLC 연결 해제 완료]")
@@ -161,6 +310,10 @@ class PLC:
         self.connected = False
 
     def write_bit_in_real_time(self, tag: str, val: str):
+        """
+        브리지 서버(/status/update)에 태그 상태 전송
+        status_async=True면 StatusPublisher에 넣고 바로 반환 → 두봇 동작 중 HTTP 왕복을 기다리지 않음
+        """
         if not self.connected:
             return
 
@@ -170,16 +323,26 @@ class PLC:
             "val" : val
         }
 
+        if self.publisher is not None:
+            self.publisher.publish(tag, val)
+            return
+
+        self._post_status(payload)
+
+    def _post_status(self, payload):
         try:
-            requests.post(
-                    self.url,
-                    json=payload,
-                    headers=self.headers,
-                    timeout=1
-                ) 
+            self.http.post(self.url, json=payload, timeout=1)
+            self.status_stats["sent"] += 1
         except Exception as e:
+            self.status_stats["failed"] += 1
             print(f"[⚠️ 상태 전송 실패] {e}")
 
+    def flush_status(self, timeout=2.0):
+        """비동기 상태 전송이 모두 나갈 때까지 대기 (최대 timeout초) → 비었으면 True"""
+        if self.publisher is None:
+            return True
+        return self.publisher.flush(timeout)
+
     def _parse_device(self, addr):
         dev = addr[0]
         body = addr[1:]
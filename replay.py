@@ -0,0 +1,122 @@
+# replay.py
+# ------------------------------------------------------------
+# 녹화 영상 / 이미지 폴더를 VisionAI에 흘려서 처리량·단계별 지연 측정 (카메라 없이 실행 가능)
+#
+#   python replay.py yolov8/dataset/valid/images                 # CAM0 = 폴더, 최대 속도
+#   python replay.py cam0.mp4 cam1.mp4 --realtime               # CAM0/CAM1 영상, 원본 fps 재생
+#   python replay.py line.mp4 --model yolov8/dataset/weights/best.onnx --json replay.json
+# ------------------------------------------------------------
+import argparse
+import json
+import time
+
+import detector
+from decision_policy import load_policy
+from detector import (BatchedVision, DetectionResult, FileStream, InferenceScheduler, MotionGate, VisionAI,
+                      create_engine)
+
+
+def run(stream: FileStream, batch: BatchedVision, max_frames: int = 0) -> dict:
+    """스트림이 끝날 때까지 BatchedVision.step() 반복 → 처리량 + 카메라별 단계 지연"""
+    frame_count = {cam_id: 0 for cam_id in batch.visions}
+    wait = 0.05 if stream.realtime else 0.0
+
+    stream.start()
+    started = time.perf_counter()
+
+    while max_frames <= 0 or sum(frame_count.values()) < max_frames:
+        outputs = batch.step(stream, timeout=wait)
+        if not outputs:
+            if stream.finished:
+                break
+            continue
+        for cam_id in outputs:
+            frame_count[cam_id] += 1
+
+    elapsed = time.perf_counter() - started
+    stream.stop()
+
+    total = sum(frame_count.values())
+    return {
+        "frames": total,
+        "frames_per_camera": frame_count,
+        "elapsed_sec": round(elapsed, 3),
+        "fps": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        "stages": {vision.name: vision.latency_stats() for vision in batch.visions.values()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="녹화 영상 / 이미지 폴더로 VisionAI 재생 벤치마크")
+    parser.add_argument("sources", nargs="+", help="CAM0, CAM1 ... 순서의 영상 파일 또는 이미지 폴더")
+    parser.add_argument("--model", default=detector.model_path)
+    parser.add_argument("--imgsz", type=int, default=320)
+    parser.add_argument("--realtime", action="store_true", help="원본 fps로 재생 (기본: 최대 속도)")
+    parser.add_argument("--fps", type=float, default=30.0, help="이미지 폴더 재생 fps (--realtime)")
+    parser.add_argument("--loop", action="store_true")
+    parser.add_argument("--max-frames", type=int, default=0)
+    parser.add_argument("--roi-crop", action="store_true")
+    parser.add_argument("--motion-gate", action="store_true")
+    parser.add_argument("--kalman", action="store_true", help="칼만 예측 bbox로 트랙 매칭")
+    parser.add_argument("--adaptive-rate", action="store_true", help="트랙 상태 기반 추론 주기 조절")
+    parser.add_argument("--policy", default="decision_policy.yaml", help="판정 정책 YAML")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    args = parser.parse_args()
+
+    goods = [detector.good_prod0, detector.good_prod1]
+    bads = [detector.bad_prod0, detector.bad_prod1]
+
+    stream = FileStream(dict(enumerate(args.sources)), realtime=args.realtime, fps=args.fps, loop=args.loop)
+    policies = {cam_id: load_policy(args.policy, f"CAM{cam_id}", goods[cam_id % 2]) for cam_id in stream.camera_ids}
+    engine = create_engine(args.model, conf=min(p.conf for p in policies.values()))
+
+    decisions = {cam_id: [] for cam_id in stream.camera_ids}
+    visions = {}
+    for cam_id in stream.camera_ids:
+        vision = VisionAI(args.model, good_list=goods[cam_id % 2], bad_list=bads[cam_id % 2],
+                          engine=engine, imgsz=args.imgsz, roi_crop=args.roi_crop,
+                          motion_gate=MotionGate() if args.motion_gate else None, render=False,
+                          name=f"CAM{cam_id}", metrics=stream.metrics[cam_id],
+                          motion_model="kalman" if args.kalman else None,
+                          scheduler=InferenceScheduler() if args.adaptive_rate else None,
+                          policy=policies[cam_id])
+        vision.register_callback(decisions[cam_id].append)
+        visions[cam_id] = vision
+
+    summary = run(stream, BatchedVision(engine, visions), args.max_frames)
+
+    def _decision_summary(results: list[DetectionResult]) -> dict:
+        return {
+            "good": sum(not r.is_defective for r in results),
+            "bad": sum(r.is_defective for r in results),
+            "results": [r.to_dict() for r in results],
+        }
+
+    summary["schedulers"] = {vision.name: vision.scheduler.stats()
+                             for vision in visions.values() if vision.scheduler is not None}
+    summary["decision_lead"] = {vision.name: vision.decision_stats() for vision in visions.values()}
+    summary["decisions"] = {cam_id: _decision_summary(results) for cam_id, results in decisions.items()}
+
+    print(f"frames {summary['frames']} ({summary['frames_per_camera']})  "
+          f"elapsed {summary['elapsed_sec']} s  →  {summary['fps']} fps")
+    print(f"{'camera':<8}{'stage':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stages in summary["stages"].items():
+        for stage, p in stages.items():
+            print(f"{name:<8}{stage:<12}{p['count']:>8}{p['p50_ms']:>10}{p['p95_ms']:>10}{p['p99_ms']:>10}")
+    for name, sched in summary["schedulers"].items():
+        print(f"{name} scheduler: skipped {sched['skipped']}/{sched['frames']}  modes {sched['mode_frames']}")
+    for name, lead in summary["decision_lead"].items():
+        print(f"{name} decision ready at ROI entry: {lead['ready_at_roi_entry']}/{lead['decisions']}  "
+              f"(late {lead['late']}, lead frames {lead['lead_frames']}, lead p50 {lead['lead_ms']['p50_ms']} ms)")
+    for cam_id, d in summary["decisions"].items():
+        print(f"CAM{cam_id}: Good {d['good']} / Bad {d['bad']}")
+        for r in d["results"]:
+            print(f"  {r}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# result_store.py
+# ------------------------------------------------------------
+# 판정 이력 저장소 — 고정 폭 NumPy 레코드를 카메라/날짜별 바이너리 파일에 append
+#
+#   results/cam0/20251209.bin   (1 레코드 = 24 byte, 시간순)
+#
+# 파일 하나가 시간순 정렬된 배열이므로 timestamp 컬럼 자체가 인덱스:
+# 구간 [T1, T2)는 searchsorted 2번(O(log n))으로 찾고, 그 구간만 memmap으로 읽어 집계한다.
+#
+#   python result_store.py import cam0_log.txt --camera 0      # 기존 로그(repr / JSONL) 가져오기
+#   python result_store.py rate --camera 0 --start 2025-12-09 --end 2025-12-10
+#   python result_store.py bench --rows 5000000                # 대량 조회 시간 측정
+# ------------------------------------------------------------
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+RECORD_DTYPE = np.dtype([
+    ("ts_us", "<i8"),        # epoch µs (로컬 시간 기준 datetime.timestamp())
+    ("object_id", "<i4"),
+    ("confidence", "<f4"),
+    ("frames", "<u4"),
+    ("defective", "u1"),
+    ("_pad", "u1", (3,)),
+])
+
+
+def _to_us(t: datetime | str | float) -> int:
+    if isinstance(t, str):
+        t = datetime.fromisoformat(t)
+    if isinstance(t, datetime):
+        t = t.timestamp()
+    return int(round(t * 1e6))
+
+
+class ResultStore:
+    """
+    카메라별 판정 이력.
+    - append(camera, records)       : to_dict() 형태 dict 목록 추가 (DataLogger 쓰기 스레드에서 호출)
+    - query(camera, start, end)     : [start, end) 구간 레코드 배열 (RECORD_DTYPE)
+    - defect_rate(camera, start, end) : {"total", "defective", "rate"}
+    한 카메라의 레코드는 한 스레드(비전 루프 → DataLogger)에서 시간순으로 들어온다고 가정.
+    순서가 어긋난 파일은 조회 시 정렬 여부를 확인해 마스크 방식으로 처리한다.
+    """
+    def __init__(self, root: str = "results"):
+        self.root = root
+        self._lock = threading.Lock()
+        # 경로 → (레코드 수, 시간순 정렬 여부, 마지막 ts_us) — append 때 새 레코드만 비교해 갱신
+        self._sorted_cache: Dict[str, tuple[int, bool, int]] = {}
+
+    # ---------------- 쓰기 ----------------
+    def _path(self, camera: int, day: str) -> str:
+        return os.path.join(self.root, f"cam{camera}", f"{day}.bin")
+
+    def _pack(self, records: Iterable[dict]) -> np.ndarray:
+        records = list(records)
+        arr = np.zeros(len(records), dtype=RECORD_DTYPE)
+        for i, r in enumerate(records):
+            arr[i]["ts_us"] = _to_us(r["timestamp"])
+            arr[i]["object_id"] = r["object_id"]
+            arr[i]["confidence"] = r["confidence"]
+            arr[i]["frames"] = r["frames"]
+            arr[i]["defective"] = r["defective"]
+        return arr
+
+    def append(self, camera: int, records: Iterable[dict]) -> int:
+        arr = self._pack(records)
+        if not len(arr):
+            return 0
+
+        days = np.array([datetime.fromtimestamp(us / 1e6).strftime("%Y%m%d") for us in arr["ts_us"]])
+        with self._lock:
+            os.makedirs(os.path.join(self.root, f"cam{camera}"), exist_ok=True)
+            for day in np.unique(days):
+                path = self._path(camera, day)
+                part = arr[days == day]
+                count = os.path.getsize(path) // RECORD_DTYPE.itemsize if os.path.exists(path) else 0
+                with open(path, "ab") as f:
+                    part.tofile(f)
+                self._update_sorted(path, count, part["ts_us"])
+        return len(arr)
+
+    def _update_sorted(self, path: str, count: int, ts: np.ndarray) -> None:
+        """
+        append한 레코드만으로 정렬 여부 갱신 (O(새 레코드 수)).
+        기존 count개에 대한 캐시가 없으면(다른 프로세스가 쓴 파일 등) 조회 시 1회 전체 확인
+        """
+        cached = self._sorted_cache.get(path)
+        if count and (cached is None or cached[0] != count):
+            self._sorted_cache.pop(path, None)
+            return
+        ok = bool(np.all(ts[1:] >= ts[:-1]))
+        if count:
+            ok = ok and cached[1] and int(ts[0]) >= cached[2]
+        self._sorted_cache[path] = (count + len(ts), ok, int(ts[-1]))
+
+    # ---------------- 조회 ----------------
+    def _load(self, path: str) -> np.ndarray | None:
+        size = os.path.getsize(path) // RECORD_DTYPE.itemsize
+        if size == 0:
+            return None
+        return np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(size,))
+
+    def _is_sorted(self, path: str, ts: np.ndarray) -> bool:
+        with self._lock:
+            cached = self._sorted_cache.get(path)
+        if cached is not None and cached[0] == len(ts):
+            return cached[1]
+        # 전체 확인은 잠금 밖에서 (append를 막지 않음)
+        ok = bool(np.all(ts[1:] >= ts[:-1]))
+        with self._lock:
+            # 그 사이 append가 더 긴 파일 기준으로 갱신했다면 덮어쓰지 않음
+            current = self._sorted_cache.get(path)
+            if current is None or current[0] < len(ts):
+                self._sorted_cache[path] = (len(ts), ok, int(ts[-1]))
+        return ok
+
+    def _days(self, start: datetime, end: datetime) -> List[str]:
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        days = []
+        while day < end:
+            days.append(day.strftime("%Y%m%d"))
+            day += timedelta(days=1)
+        return days
+
+    def query(self, camera: int, start: datetime, end: datetime) -> np.ndarray:
+        """[start, end) 구간 레코드 (시간순)"""
+        lo_us, hi_us = _to_us(start), _to_us(end)
+        parts = []
+        for day in self._days(start, end):
+            path = self._path(camera, day)
+            if not os.path.exists(path):
+                continue
+            data = self._load(path)
+            if data is None:
+                continue
+            ts = data["ts_us"]
+            if self._is_sorted(path, ts):
+                lo, hi = np.searchsorted(ts, [lo_us, hi_us], side="left")
+                parts.append(data[lo:hi])
+            else:
+                parts.append(data[(ts >= lo_us) & (ts < hi_us)])
+        if not parts:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        return np.concatenate(parts)
+
+    def defect_rate(self, camera: int, start: datetime, end: datetime) -> dict:
+        """카메라 1대의 [start, end) 불량률 — 구간 레코드의 defective 컬럼 합만 계산"""
+        lo_us, hi_us = _to_us(start), _to_us(end)
+        total = 0
+        defective = 0
+        for day in self._days(start, end):
+            path = self._path(camera, day)
+            if not os.path.exists(path):
+                continue
+            data = self._load(path)
+            if data is None:
+                continue
+            ts = data["ts_us"]
+            if self._is_sorted(path, ts):
+                lo, hi = np.searchsorted(ts, [lo_us, hi_us], side="left")
+                total += int(hi - lo)
+                defective += int(np.count_nonzero(data["defective"][lo:hi]))
+            else:
+                mask = (ts >= lo_us) & (ts < hi_us)
+                total += int(np.count_nonzero(mask))
+                defective += int(np.count_nonzero(data["defective"][mask]))
+        return {
+            "total": total,
+            "defective": defective,
+            "rate": defective / total if total else 0.0,
+        }
+
+
+# ============================================================
+# 기존 로그 가져오기 / CLI
+# ============================================================
+def read_legacy_log(path: str) -> List[dict]:
+    """camN_log.txt (str(dict) 줄) 또는 DataLogger JSONL → to_dict() 형태 목록"""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("==="):
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                try:
+                    records.append(ast.literal_eval(line))
+                except (ValueError, SyntaxError):
+                    print(f"[result_store] 건너뜀: {line[:80]}")
+    return records
+
+
+def _bench(rows: int) -> None:
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as root:
+        store = ResultStore(root)
+        day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        # 하루 동안 균일하게 분포한 rows개 (불량 약 5%)
+        rng = np.random.default_rng(0)
+        arr = np.zeros(rows, dtype=RECORD_DTYPE)
+        arr["ts_us"] = _to_us(day) + np.sort(rng.integers(0, 86_400_000_000, rows))
+        arr["defective"] = rng.random(rows) < 0.05
+        os.makedirs(os.path.join(root, "cam0"))
+        arr.tofile(store._path(0, day.strftime("%Y%m%d")))
+
+        for hours in (1, 6, 24):
+            start = day + timedelta(hours=6)
+            end = min(start + timedelta(hours=hours), day + timedelta(days=1))
+            t0 = time.perf_counter()
+            result = store.defect_rate(0, start, end)
+            ms = (time.perf_counter() - t0) * 1e3
+            print(f"{hours:>3} h  rows {result['total']:>9}  rate {result['rate']:.4f}  {ms:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="판정 이력 저장소")
+    parser.add_argument("--root", default="results")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_import = sub.add_parser("import", help="기존 camN_log.txt / JSONL 가져오기")
+    p_import.add_argument("path")
+    p_import.add_argument("--camera", type=int, required=True)
+
+    p_rate = sub.add_parser("rate", help="구간 불량률")
+    p_rate.add_argument("--camera", type=int, required=True)
+    p_rate.add_argument("--start", required=True, help="ISO 시각 (예: 2025-12-09T08:00)")
+    p_rate.add_argument("--end", required=True)
+
+    p_bench = sub.add_parser("bench", help="대량 레코드 조회 시간 측정")
+    p_bench.add_argument("--rows", type=int, default=5_000_000)
+
+    args = parser.parse_args()
+
+    if args.cmd == "import":
+        records = sorted(read_legacy_log(args.path), key=lambda r: r["timestamp"])
+        n = ResultStore(args.root).append(args.camera, records)
+        print(f"{args.path} → {args.root}/cam{args.camera}: {n} records")
+    elif args.cmd == "rate":
+        store = ResultStore(args.root)
+        result = store.defect_rate(args.camera, datetime.fromisoformat(args.start),
+                                   datetime.fromisoformat(args.end))
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        _bench(args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+# conftest.py
+# 저장소 루트(detector, decision_policy ...)와 benchmarks/(synthetic)를 import 경로에 추가
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
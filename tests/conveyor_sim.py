@@ -0,0 +1,79 @@
+# conveyor_sim.py
+# ------------------------------------------------------------
+# 테스트 공용: SyntheticConveyor 장면을 VisionAI.process_frame()에 프레임 단위로 흘려 보내고
+# 판정 결과를 정답 물체와 짝지어 돌려준다 (StubEngine = 정답 bbox, 모델 없음).
+# capture 시각은 프레임 번호 / fps로 고정 → 벽시계와 무관하게 재현 가능
+# ------------------------------------------------------------
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+from detector import InferenceScheduler, MotionGate, VisionAI
+from decision_policy import DecisionPolicy
+from synthetic import StubEngine, SyntheticConveyor
+
+GOOD = ["Orange_Waper"]
+BAD = ["Brown_Waper"]
+
+
+@dataclass
+class ConveyorRun:
+    scene: SyntheticConveyor
+    vision: VisionAI
+    judged: List[tuple] = field(default_factory=list)      # [(DetectionResult, SceneObject), ...]
+
+    @property
+    def ids_created(self) -> int:
+        return self.vision.next_object_id
+
+    def decisions_per_object(self) -> Dict[int, int]:
+        counts = {obj.object_id: 0 for obj in self.scene.objects}
+        for _, obj in self.judged:
+            counts[obj.object_id] += 1
+        return counts
+
+    def wrong(self) -> List[int]:
+        bad = set(BAD)
+        return [obj.object_id for r, obj in self.judged if r.is_defective != (obj.cls_name in bad)]
+
+
+def run_conveyor(scene: SyntheticConveyor, motion_model: str | None = None,
+                 motion_gate: MotionGate | None = None, scheduler: InferenceScheduler | None = None,
+                 policy: DecisionPolicy | None = None, infer_every: int = 1,
+                 on_result: Callable[[VisionAI, object], None] | None = None,
+                 engine: StubEngine | None = None) -> ConveyorRun:
+    """
+    infer_every=n → n프레임에 1번만 추론 (나머지는 추론 생략 프레임으로 전달)
+    on_result     → finalize 콜백 안에서 (vision, DetectionResult)로 호출 (판정 시점 트랙 상태 확인용)
+    engine        → 검출을 일부러 빼는 등 StubEngine 변형 (기본: 정답 그대로)
+    """
+    engine = engine if engine is not None else StubEngine(scene)
+    vision = VisionAI("stub", good_list=GOOD, bad_list=BAD, engine=engine, imgsz=None, render=False,
+                      name="CAM0", motion_model=motion_model, motion_gate=motion_gate,
+                      scheduler=scheduler, policy=policy)
+    run = ConveyorRun(scene, vision)
+    frame_index = 0
+
+    def match(r):
+        # 판정 시점 트랙 중심과 가장 가까운 정답 물체 (화면을 벗어난 뒤 늦게 판정된 경우도 포함)
+        x1, y1, x2, y2 = vision.tracked_objects[r.object_id].bbox
+        t = frame_index / scene.fps
+        obj = min(scene.objects, key=lambda o: abs(-scene.size / 2 + (t - o.enter_t) * scene.speed - (x1 + x2) / 2)
+                                              + abs(o.lane_y - (y1 + y2) / 2))
+        run.judged.append((r, obj))
+        if on_result is not None:
+            on_result(vision, r)
+
+    vision.register_callback(match)
+
+    frame = scene.render(0)
+    frame_ns = int(1e9 / scene.fps)
+    for frame_index in range(scene.n_frames):
+        scene.render(frame_index, frame)
+        capture_ns = (frame_index + 1) * frame_ns
+        if frame_index % infer_every:
+            vision.process_detections(frame, None, capture_ns)
+        else:
+            vision.process_frame(frame, capture_ns=capture_ns)
+    return run
@@ -0,0 +1,92 @@
+# test_connection_pool.py
+# ConnectionPool: ping 도중 요청이 취소돼도 자리(_size / _in_use)가 새지 않음
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("aiomysql")
+
+import bridge_server  # noqa: E402
+
+
+class HangingPingConn:
+    def __init__(self):
+        self.closed = False
+        self.ping_started = asyncio.Event()
+
+    async def ping(self, reconnect=False):
+        self.ping_started.set()
+        await asyncio.Event().wait()    # 응답 없는 DB
+
+    def close(self):
+        self.closed = True
+
+
+def _make_pool(max_size=1):
+    conns = []
+
+    async def connect():
+        conns.append(HangingPingConn())
+        return conns[-1]
+
+    # ping_idle < 0 → 쉬던 연결은 항상 ping
+    return bridge_server.ConnectionPool(connect, max_size=max_size, timeout=1.0, ping_idle=-1.0), conns
+
+
+def test_cancel_during_ping_releases_slot():
+    async def scenario():
+        pool, conns = _make_pool()
+        async with pool.connection():
+            pass
+        assert pool.stats()["idle"] == 1
+
+        async def request():
+            async with pool.connection():
+                pass
+
+        task = asyncio.create_task(request())
+        await conns[0].ping_started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert conns[0].closed
+        assert pool._size == 0
+        assert pool._in_use == 0
+        assert pool.stats()["idle"] == 0
+
+        # 자리가 돌아왔으므로 새 연결로 다시 사용 가능
+        async with pool.connection() as conn:
+            assert conn is conns[1]
+        assert pool._size == 1
+        assert pool._in_use == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancel_during_ping_hands_slot_to_waiter():
+    async def scenario():
+        pool, conns = _make_pool(max_size=1)
+        async with pool.connection():
+            pass
+
+        async def request():
+            async with pool.connection() as conn:
+                return conn
+
+        pinging = asyncio.create_task(request())
+        await conns[0].ping_started.wait()
+        waiting = asyncio.create_task(request())
+        await asyncio.sleep(0)
+        assert pool.stats()["waiting"] == 1
+
+        pinging.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pinging
+        # 대기자는 PoolTimeout 없이 새로 만든 연결을 받음
+        assert await waiting is conns[1]
+        assert pool._size == 1
+        assert pool._in_use == 0
+
+    asyncio.run(scenario())
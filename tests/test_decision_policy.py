@@ -0,0 +1,77 @@
+# test_decision_policy.py
+# decision_policy.yaml 기본값 = 기존 하드코딩 기준, ratio / sprt 판정 경계, 설정 우선순위
+import os
+
+import pytest
+
+from conveyor_sim import run_conveyor
+from decision_policy import DecisionPolicy, load_policy
+from synthetic import SyntheticConveyor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POLICY_YAML = os.path.join(ROOT, "decision_policy.yaml")
+
+
+def _decide(policy, n_good, n_bad, conf=0.95):
+    llr = n_good * policy.llr_step(True, conf) + n_bad * policy.llr_step(False, conf)
+    n = n_good + n_bad
+    return policy.decide(n, n_good * conf, n * conf, llr)
+
+
+@pytest.mark.parametrize("camera, good_list", [("CAM0", ["Orange_Waper"]), ("CAM1", ["Square"])])
+def test_yaml_defaults_match_legacy_thresholds(camera, good_list):
+    policy = load_policy(POLICY_YAML, camera, good_list)
+    assert policy == DecisionPolicy()
+    assert (policy.method, policy.conf, policy.min_detections, policy.good_ratio) == ("ratio", 0.85, 15, 0.7)
+    assert (policy.min_frames_for_decision, policy.max_missing_times) == (10, 30)
+    assert policy.ready_frames == 15
+
+
+def test_ratio_thresholds():
+    policy = load_policy(POLICY_YAML, "CAM0", ["Orange_Waper"])
+    assert _decide(policy, 14, 0) is None                    # 검출 15개 미만
+    assert _decide(policy, 14, 6)[0] is True                 # 0.70 >= good_ratio
+    assert _decide(policy, 13, 7)[0] is False                # 0.65
+
+
+def test_sprt_decides_at_min_frames_when_clear():
+    policy = DecisionPolicy(method="sprt")
+    assert policy.ready_frames == 5
+    assert _decide(policy, 4, 0) is None
+    assert _decide(policy, 5, 0)[0] is True
+    assert _decide(policy, 0, 5)[0] is False
+    # 섞여 있으면 경계를 못 넘음 → min_detections까지 기다렸다가 ratio 판정
+    assert _decide(policy, 3, 3) is None
+    assert _decide(policy, 11, 4)[0] is True
+
+
+def test_priority_default_product_camera(tmp_path):
+    path = tmp_path / "policy.yaml"
+    path.write_text(
+        "default: {good_ratio: 0.6}\n"
+        "products: {Orange_Waper: {method: sprt, good_ratio: 0.8}}\n"
+        "cameras: {CAM1: {good_ratio: 0.9}}\n",
+        encoding="utf-8",
+    )
+    assert load_policy(str(path), "CAM0", ["Square"]).good_ratio == 0.6
+    cam0 = load_policy(str(path), "CAM0", ["Orange_Waper"])
+    assert (cam0.method, cam0.good_ratio) == ("sprt", 0.8)
+    assert load_policy(str(path), "CAM1", ["Orange_Waper"]).good_ratio == 0.9
+
+
+def test_invalid_config_rejected(tmp_path):
+    path = tmp_path / "policy.yaml"
+    path.write_text("default: {min_detection: 10}\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_policy(str(path), "CAM0", [])
+    with pytest.raises(ValueError):
+        DecisionPolicy(method="vote")
+    assert load_policy(str(tmp_path / "missing.yaml")) == DecisionPolicy()
+
+
+def test_sprt_pipeline_decides_every_wafer():
+    scene = SyntheticConveyor(n_objects=10, speed=600)
+    run = run_conveyor(scene, policy=DecisionPolicy(method="sprt"))
+    assert all(n == 1 for n in run.decisions_per_object().values())
+    assert run.wrong() == []
+    assert run.vision.decision_stats()["late"] == 0
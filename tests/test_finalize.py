@@ -0,0 +1,105 @@
+# test_finalize.py
+# ROI 진입 전에 판정 준비 → 중심이 rx1을 넘는 바로 그 추론 주기에 finalize (lead >= 0)
+import pytest
+
+from conveyor_sim import run_conveyor
+from decision_policy import DecisionPolicy
+from detector import InferenceScheduler
+from synthetic import StubEngine, SyntheticConveyor
+
+
+class DropAfterReadyEngine(StubEngine):
+    """물체마다 drop_at번째로 보이는 프레임의 검출 1개를 뺀다 (판정 준비 후 검출 누락 재현)"""
+    def __init__(self, scene, drop_at):
+        super().__init__(scene)
+        self.drop_at = drop_at
+        self.seen = {}
+
+    def infer(self, frames):
+        out = []
+        for f in frames:
+            dets = []
+            for obj, bbox in self.scene.visible(SyntheticConveyor.frame_index(f)):
+                self.seen[obj.object_id] = self.seen.get(obj.object_id, 0) + 1
+                if self.seen[obj.object_id] != self.drop_at:
+                    dets.append((bbox, obj.cls_name, self.scene.conf))
+            out.append(dets)
+        return out
+
+
+@pytest.mark.parametrize("adaptive", [False, True])
+def test_lead_non_negative_on_nominal_scene(adaptive):
+    # late_allowance=0 → 판정 준비가 ROI 진입 뒤로 밀리지 않도록 idle 간격을 계산
+    scene = SyntheticConveyor(n_objects=10)
+    run = run_conveyor(scene, motion_model="kalman",
+                       scheduler=InferenceScheduler(late_allowance=0) if adaptive else None)
+
+    stats = run.vision.decision_stats()
+    assert stats["decisions"] == len(scene.objects)
+    assert stats["late"] == 0
+    assert stats["min_lead_frames"] >= 0
+
+
+def test_sprt_lead_with_scheduler_at_speed():
+    # 첫 물체부터 여유를 두려면 예상 속도를 알려줘야 함 (setup_camera(conveyor_speed=...))
+    scene = SyntheticConveyor(n_objects=10, speed=600)
+    run = run_conveyor(scene, motion_model="kalman", scheduler=InferenceScheduler(max_speed=600, late_allowance=0),
+                       policy=DecisionPolicy(method="sprt"))
+    stats = run.vision.decision_stats()
+    assert stats["decisions"] == len(scene.objects)
+    assert stats["late"] == 0
+
+
+@pytest.mark.parametrize("motion_model", [None, "kalman"])
+def test_finalized_on_roi_entry_cycle(motion_model):
+    scene = SyntheticConveyor(n_objects=10)
+    entries = []
+
+    def on_result(vision, r):
+        obj = vision.tracked_objects[r.object_id]
+        x1, _, x2, _ = obj.bbox
+        entries.append((obj.roi_frame, vision._frame_index, (x1 + x2) / 2, vision.roi[0]))
+
+    run = run_conveyor(scene, motion_model=motion_model, on_result=on_result)
+
+    assert len(entries) == len(scene.objects)
+    for roi_frame, frame_index, cx, rx1 in entries:
+        assert roi_frame == frame_index     # ROI에 처음 들어온 바로 그 주기
+        assert rx1 <= cx < rx1 + scene.speed / scene.fps + 1
+    assert run.vision.decision_stats()["late"] == 0
+
+
+def test_unreachable_lead_is_reported(capsys):
+    # ratio 15프레임 @30fps는 600 px/s에서 가장자리 → ROI 구간(약 0.3초)에 모을 수 없음 → 경고 + late로 집계
+    scene = SyntheticConveyor(n_objects=5, speed=600)
+    run = run_conveyor(scene, motion_model="kalman", scheduler=InferenceScheduler())
+    assert "ROI 진입 전에" in capsys.readouterr().out
+    stats = run.vision.decision_stats()
+    assert stats["decisions"] == len(scene.objects)
+    assert stats["late"] > 0
+
+
+def test_late_allowance_bounds_lateness():
+    # 기본 late_allowance(ROI 통과 시간의 25%) → 판정이 늦어져도 ROI 안에서, 모든 물체 1회
+    scene = SyntheticConveyor(n_objects=10, gap_s=3.0)
+    scheduler = InferenceScheduler()
+    run = run_conveyor(scene, motion_model="kalman", scheduler=scheduler)
+    stats = run.vision.decision_stats()
+
+    assert all(n == 1 for n in run.decisions_per_object().values())
+    rx1, _, rx2, _ = run.vision.roi
+    late_frames = scheduler.late_allowance * (rx2 - rx1) / scene.speed * scene.fps
+    assert -stats["min_lead_frames"] <= late_frames + 1
+
+
+@pytest.mark.parametrize("motion_model", [None, "kalman"])
+def test_missed_detection_after_ready_keeps_track(motion_model):
+    # sprt: 5프레임에 판정 준비, min_frames_for_decision(10) 전에 검출 1회 누락 → 트랙 유지, ROI 진입 시 판정
+    scene = SyntheticConveyor(n_objects=10)
+    policy = DecisionPolicy(method="sprt")
+    run = run_conveyor(scene, motion_model=motion_model, policy=policy,
+                       engine=DropAfterReadyEngine(scene, drop_at=policy.sprt_min_frames + 2))
+
+    assert run.ids_created == len(scene.objects)
+    assert all(n == 1 for n in run.decisions_per_object().values())
+    assert run.vision.decision_stats()["late"] == 0
@@ -0,0 +1,27 @@
+# test_motion_gate.py
+# MotionGate 사용 시에도 물체마다 판정 1회 (벨트와 대비가 낮은 불량 웨이퍼 포함)
+from conveyor_sim import run_conveyor
+from detector import MotionGate
+from synthetic import SyntheticConveyor
+
+
+def test_low_contrast_defects_each_decided_once():
+    # Brown_Waper gray ≈ 82, 벨트 ≈ 93 → 프레임 차분이 pixel_threshold(25) 아래
+    scene = SyntheticConveyor(n_objects=10, bad_ratio=1.0)
+    gate = MotionGate()
+    run = run_conveyor(scene, motion_gate=gate)
+
+    assert run.ids_created == len(scene.objects)
+    assert all(n == 1 for n in run.decisions_per_object().values())
+    assert run.wrong() == []
+    # 물체가 없는 구간은 여전히 생략
+    assert gate.skipped > 0
+
+
+def test_mixed_scene_with_gate():
+    scene = SyntheticConveyor(n_objects=10)
+    run = run_conveyor(scene, motion_gate=MotionGate())
+
+    assert run.ids_created == len(scene.objects)
+    assert all(n == 1 for n in run.decisions_per_object().values())
+    assert run.wrong() == []
@@ -0,0 +1,66 @@
+# test_result_store.py
+# ResultStore 정렬 여부 캐시: append마다 새 레코드만 비교해서 갱신 (파일 전체 재확인 없음)
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from result_store import ResultStore
+
+DAY = datetime(2025, 12, 9)
+
+
+def _records(minutes):
+    return [{"timestamp": (DAY + timedelta(minutes=m)).isoformat(), "object_id": i, "confidence": 0.9,
+             "frames": 15, "defective": i % 4 == 0} for i, m in enumerate(minutes)]
+
+
+def test_sorted_appends_reuse_cache(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path))
+    for start in range(0, 60, 10):
+        store.append(0, _records(range(start, start + 10)))
+
+    # 캐시가 append로 최신 상태 → 조회 시 전체 확인(np.all) 없이 searchsorted
+    def no_scan(*args, **kwargs):
+        raise AssertionError("full sortedness scan")
+    monkeypatch.setattr(np, "all", no_scan)
+    rate = store.defect_rate(0, DAY + timedelta(minutes=5), DAY + timedelta(minutes=25))
+    assert rate["total"] == 20
+
+
+def test_out_of_order_append_falls_back_to_mask(tmp_path):
+    store = ResultStore(str(tmp_path))
+    store.append(0, _records(range(30, 40)))
+    store.append(0, _records(range(0, 10)))      # 앞 시각 레코드가 뒤에 추가됨
+
+    path = store._path(0, DAY.strftime("%Y%m%d"))
+    assert store._sorted_cache[path][:2] == (20, False)
+    rows = store.query(0, DAY, DAY + timedelta(minutes=35))
+    assert len(rows) == 15
+
+
+def test_unknown_file_scanned_once(tmp_path):
+    ResultStore(str(tmp_path)).append(0, _records(range(10)))
+    store = ResultStore(str(tmp_path))           # 다른 인스턴스가 쓴 파일 → 캐시 없음
+    store.append(0, _records(range(10, 20)))
+    assert store.query(0, DAY, DAY + timedelta(days=1)).shape == (20,)
+    path = store._path(0, DAY.strftime("%Y%m%d"))
+    assert store._sorted_cache[path][:2] == (20, True)
+
+
+def test_long_tracks_keep_frame_count(tmp_path):
+    store = ResultStore(str(tmp_path))
+    records = _records([0])
+    records[0]["frames"] = 70_000                # u2였다면 4464로 wrap
+    store.append(0, records)
+    assert int(store.query(0, DAY, DAY + timedelta(days=1))["frames"][0]) == 70_000
+
+
+def test_stale_query_does_not_overwrite_newer_cache(tmp_path):
+    store = ResultStore(str(tmp_path))
+    store.append(0, _records(range(10)))
+    path = store._path(0, DAY.strftime("%Y%m%d"))
+    stale_ts = store._load(path)["ts_us"][:5].copy()     # append 전에 읽은 짧은 memmap
+    store.append(0, _records(range(10, 20)))
+
+    assert store._is_sorted(path, stale_ts)
+    assert store._sorted_cache[path][0] == 20
@@ -0,0 +1,70 @@
+# test_scheduler.py
+# InferenceScheduler로 추론을 생략해도 물체마다 판정 정확히 1회
+import os
+
+import pytest
+
+from conveyor_sim import run_conveyor
+from decision_policy import DecisionPolicy, load_policy
+from detector import InferenceScheduler
+from synthetic import SyntheticConveyor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POLICY_YAML = os.path.join(ROOT, "decision_policy.yaml")
+
+
+@pytest.mark.parametrize("method", ["ratio", "sprt"])
+@pytest.mark.parametrize("speed", [300, 900])
+def test_every_wafer_decided_once(speed, method):
+    # 예상 속도 = 실제 속도 (setup_camera(conveyor_speed=...))
+    scene = SyntheticConveyor(n_objects=10, speed=speed)
+    run = run_conveyor(scene, motion_model="kalman", scheduler=InferenceScheduler(max_speed=speed),
+                       policy=DecisionPolicy(method=method))
+
+    assert run.ids_created == len(scene.objects)
+    assert all(n == 1 for n in run.decisions_per_object().values())
+    assert run.wrong() == []
+
+
+def test_skips_frames_when_geometry_allows():
+    # SPRT(5프레임) + 300 px/s → 물체 사이 빈 구간은 idle 간격으로 생략
+    scene = SyntheticConveyor(n_objects=10, gap_s=3.0)
+    scheduler = InferenceScheduler()
+    run = run_conveyor(scene, motion_model="kalman", scheduler=scheduler,
+                       policy=DecisionPolicy(method="sprt"))
+
+    assert all(n == 1 for n in run.decisions_per_object().values())
+    assert scheduler.skip_ratio > 0.5
+
+
+def test_idle_interval_shrinks_with_speed():
+    # 화면 가장자리 → ROI 시간이 짧으면 idle 간격도 짧아진다 (idle_fps는 상한)
+    scene = SyntheticConveyor(n_objects=1)
+    run = run_conveyor(scene, motion_model="kalman", scheduler=InferenceScheduler(),
+                       policy=DecisionPolicy(method="sprt"))
+    slow = InferenceScheduler(max_speed=100)._idle_interval_ns(run.vision)
+    fast = InferenceScheduler(max_speed=900)._idle_interval_ns(run.vision)
+    assert fast < slow <= InferenceScheduler().max_idle_ns
+
+
+@pytest.mark.parametrize("gap_s", [1.5, 3.0, 10.0])
+def test_shipped_policy_skips_frames(gap_s):
+    # decision_policy.yaml 기본값(ratio 15프레임) + 기본 ROI + 300 px/s에서도 idle 구간은 생략
+    policy = load_policy(POLICY_YAML, "CAM0", ["Orange_Waper"])
+    scene = SyntheticConveyor(n_objects=6, gap_s=gap_s)
+    scheduler = InferenceScheduler()
+    run = run_conveyor(scene, motion_model="kalman", scheduler=scheduler, policy=policy)
+
+    assert scheduler.skip_ratio > 0.5
+    assert all(n == 1 for n in run.decisions_per_object().values())
+    assert run.wrong() == []
+
+
+def test_warns_when_idle_interval_below_frame(capsys):
+    # late_allowance=0: ROI 진입 시점에 판정 준비 요구 → idle 간격 < 1프레임 → 경고
+    policy = load_policy(POLICY_YAML, "CAM0", ["Orange_Waper"])
+    scheduler = InferenceScheduler(late_allowance=0)
+    run_conveyor(SyntheticConveyor(n_objects=3), motion_model="kalman", scheduler=scheduler, policy=policy)
+
+    assert "< 프레임 간격" in capsys.readouterr().out
+    assert scheduler.skip_ratio == 0
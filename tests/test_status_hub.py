@@ -0,0 +1,56 @@
+# test_status_hub.py
+# StatusHub: DB에서 읽은 값(Decimal / str)과 요청 값(int)을 같은 타입으로 비교
+import asyncio
+from contextlib import asynccontextmanager
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("aiomysql")
+
+import bridge_server  # noqa: E402
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, args=None):
+        pass
+
+    async def fetchall(self):
+        return list(self.rows)
+
+
+class FakePool:
+    def __init__(self, rows):
+        self.rows = rows
+
+    @asynccontextmanager
+    async def connection(self):
+        class Conn:
+            def cursor(_self, cursor_cls=None):
+                return FakeCursor(self.rows)
+        yield Conn()
+
+
+def test_db_values_normalized_before_compare(monkeypatch):
+    monkeypatch.setattr(bridge_server, "pool", FakePool([("PLC1", "M100", Decimal(1)), ("PLC1", "M101", "0")]))
+    hub = bridge_server.StatusHub()
+    asyncio.run(hub.ensure_loaded())
+    sub = hub.subscribe()
+
+    # 같은 값 → diff 없음
+    assert hub.publish([("PLC1", "M100", 1), ("PLC1", "M101", 0)]) == 0
+    assert sub.empty()
+
+    assert hub.publish([("PLC1", "M101", 1)]) == 1
+    assert sub.get_nowait()["rows"] == [{"plc_id": "PLC1", "tag": "M101", "val": 1}]
+    assert hub.snapshot()["rows"][0]["val"] == 1 and type(hub.state[("PLC1", "M100")]) is int
@@ -0,0 +1,83 @@
+# test_status_publisher.py
+# StatusPublisher 재시도 정책: 연결 오류 / 5xx만 backoff 재시도, 4xx는 버림
+import threading
+
+import pytest
+
+pytest.importorskip("pymcprotocol")
+requests = pytest.importorskip("requests")
+
+from plc_conn import StatusPublisher  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = "detail"
+
+
+class FakeSession:
+    """응답 순서대로 돌려주는 session.post (int = HTTP 상태 코드, 예외 = 연결 오류)"""
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.posts = []
+        self.done = threading.Event()
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append(json["items"])
+        result = self.responses.pop(0) if self.responses else 200
+        if not self.responses:
+            self.done.set()
+        if isinstance(result, Exception):
+            raise result
+        return FakeResponse(result)
+
+
+def _publish(session, **kwargs):
+    publisher = StatusPublisher(session, "http://bridge/status/update_many", window=0.01,
+                                retry_interval=0.01, **kwargs)
+    publisher.publish("M100", 1)
+    publisher.publish("M101", 0)
+    return publisher
+
+
+def test_client_error_is_dropped():
+    session = FakeSession([422])
+    publisher = _publish(session)
+    assert publisher.flush(2.0)
+    publisher.close()
+    assert len(session.posts) == 1
+    assert publisher.stats["rejected"] == 2
+    assert publisher.stats["sent"] == 0
+
+
+def test_server_and_connection_errors_are_retried():
+    session = FakeSession([503, requests.ConnectionError("refused"), requests.Timeout("slow"), 200])
+    publisher = _publish(session)
+    assert publisher.flush(2.0)
+    publisher.close()
+    assert len(session.posts) == 4
+    assert session.posts[-1] == session.posts[0]
+    assert publisher.stats["failed"] == 3
+    assert publisher.stats["sent"] == 2
+    assert publisher.stats["rejected"] == 0
+
+
+def test_backoff_grows_and_is_capped():
+    waits = []
+    session = FakeSession([500] * 6)
+    publisher = StatusPublisher(session, "http://bridge/status/update_many", window=0.0,
+                                retry_interval=0.01, max_retry_interval=0.04)
+    cond = publisher._cond
+    original = cond.wait_for
+
+    def wait_for(predicate, timeout=None):
+        waits.append(timeout)
+        return original(predicate, 0)
+    cond.wait_for = wait_for
+
+    publisher.publish("M100", 1)
+    assert session.done.wait(2.0)
+    assert publisher.flush(2.0)
+    publisher.close()
+    assert waits[:5] == [0.01, 0.02, 0.04, 0.04, 0.04]
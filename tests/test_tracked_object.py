@@ -0,0 +1,55 @@
+# test_tracked_object.py
+# TrackedObject 누적 점수 판정 = detection 목록 전체로 다시 계산한 결과 / 메모리는 윈도우 크기로 고정
+import numpy as np
+import pytest
+
+from conveyor_sim import GOOD, run_conveyor
+from decision_policy import DecisionPolicy
+from detector import TrackedObject
+from synthetic import SyntheticConveyor
+
+
+def _recomputed(history, policy):
+    """기존 방식: 전체 detection 목록을 매번 다시 합산"""
+    if len(history) < policy.min_detections:
+        return None
+    total = sum(c for _, c in history)
+    good = sum(c for cls, c in history if cls in GOOD)
+    return good / total >= policy.good_ratio, total / len(history)
+
+
+@pytest.mark.parametrize("good_prob", [0.9, 0.7, 0.5, 0.1])
+def test_incremental_matches_recomputed(good_prob):
+    rng = np.random.default_rng(1)
+    policy = DecisionPolicy()
+    obj = TrackedObject(0, (0, 0, 10, 10), GOOD, policy=policy)
+    history = []
+    for _ in range(200):
+        cls = "Orange_Waper" if rng.random() < good_prob else "Brown_Waper"
+        conf = float(rng.uniform(0.85, 1.0))
+        obj.add_detection(cls, conf)
+        history.append((cls, conf))
+
+        expected = _recomputed(history, policy)
+        decision = obj.get_final_decision()
+        if expected is None:
+            assert decision is None
+        else:
+            assert decision[0] == expected[0]
+            assert decision[1] == pytest.approx(expected[1])
+
+
+def test_detection_window_is_bounded():
+    obj = TrackedObject(0, (0, 0, 10, 10), GOOD)
+    for _ in range(10 * TrackedObject.DETECTION_WINDOW):
+        obj.add_detection("Orange_Waper", 0.9)
+    assert obj.frame_count == 10 * TrackedObject.DETECTION_WINDOW
+    assert len(obj.detections) == TrackedObject.DETECTION_WINDOW
+    assert not hasattr(obj, "__dict__")
+
+
+def test_one_decision_per_wafer():
+    scene = SyntheticConveyor(n_objects=20)
+    run = run_conveyor(scene)
+    assert all(n == 1 for n in run.decisions_per_object().values())
+    assert run.wrong() == []
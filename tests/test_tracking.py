@@ -0,0 +1,48 @@
+# test_tracking.py
+# 물체 1개 = ID 1개 (IoU 매칭 / 칼만 예측 매칭), 추론 주기가 길어져도 칼만 모드는 ID 유지
+import pytest
+
+from conveyor_sim import run_conveyor
+from synthetic import SyntheticConveyor
+
+SCENES = {
+    "nominal": dict(speed=300),
+    "fast": dict(speed=900),
+    "dense": dict(speed=300, lanes=4, gap_s=0.8),
+}
+
+
+@pytest.mark.parametrize("motion_model", [None, "kalman"])
+@pytest.mark.parametrize("scene_name", list(SCENES))
+def test_one_id_and_decision_per_wafer(scene_name, motion_model):
+    scene = SyntheticConveyor(n_objects=12, **SCENES[scene_name])
+    run = run_conveyor(scene, motion_model=motion_model)
+
+    assert run.ids_created == len(scene.objects)
+    assert all(n == 1 for n in run.decisions_per_object().values())
+    assert run.wrong() == []
+
+
+@pytest.mark.parametrize("infer_every", [2, 3, 4])
+@pytest.mark.parametrize("scene_name", list(SCENES))
+def test_kalman_keeps_ids_at_low_inference_rate(scene_name, infer_every):
+    scene = SyntheticConveyor(n_objects=12, **SCENES[scene_name])
+    run = run_conveyor(scene, motion_model="kalman", infer_every=infer_every)
+
+    assert run.ids_created == len(scene.objects)
+    assert all(n <= 1 for n in run.decisions_per_object().values())
+    assert run.wrong() == []
+
+
+def test_kalman_decides_every_wafer_at_lower_rate():
+    # 300 px/s, 3프레임에 1번 추론 → ROI를 지나기 전에 검출 15개 확보 가능
+    scene = SyntheticConveyor(n_objects=12)
+    run = run_conveyor(scene, motion_model="kalman", infer_every=3)
+    assert all(n == 1 for n in run.decisions_per_object().values())
+
+
+def test_iou_only_loses_ids_when_boxes_stop_overlapping():
+    # 마지막 bbox 기준 IoU 매칭은 추론 간 이동이 크면 새 ID를 만든다 (칼만 모드가 필요한 이유)
+    scene = SyntheticConveyor(n_objects=12, speed=600)
+    run = run_conveyor(scene, infer_every=2)
+    assert run.ids_created > len(scene.objects)
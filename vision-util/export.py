@@ -0,0 +1,21 @@
+# export.py
+# ------------------------------------------------------------
+# 학습된 best.pt → CPU 추론용 ONNX / OpenVINO IR 변환
+# 변환 후 detector.model_path 를 결과 경로로 바꾸면 해당 백엔드로 추론한다.
+#   ../yolov8/dataset/weights/best.onnx
+#   ../yolov8/dataset/weights/best_openvino_model/
+# ------------------------------------------------------------
+import sys
+from ultralytics import YOLO
+
+def export_model(fmt="onnx"):
+    model = YOLO("../yolov8/dataset/weights/best.pt")
+
+    # 학습 해상도(imgsz=320)와 동일하게 내보냄
+    path = model.export(format=fmt, imgsz=320, dynamic=(fmt == "onnx"), simplify=(fmt == "onnx"))
+    return path
+
+if __name__ == '__main__':
+    fmt = sys.argv[1] if len(sys.argv) > 1 else "onnx"   # onnx | openvino
+    path = export_model(fmt)
+    print(f"✅ 변환 완료: {path}")
@@ -0,0 +1,355 @@
+# vision_metrics.py
+# ------------------------------------------------------------
+# 비전 파이프라인 단계별 지연 측정 (운영 중 상시 사용 가능한 수준의 오버헤드)
+#   LatencyHistogram : 고정 크기 로그-선형 버킷 히스토그램 (HdrHistogram 방식)
+#   StageRecorder    : 카메라 1대의 단계별 히스토그램 묶음 (capture / preprocess / inference ...)
+#   MetricsReporter  : 주기적 로그 1줄 + JSON 스냅샷 파일
+#   FrameTrace / E2ETracer : 객체별 capture → PLC ack 경로 추적, deadline 초과 표시
+#   DecisionLead     : 판정이 ROI 진입보다 몇 프레임 / 몇 ms 먼저 준비됐는지
+# 시간은 모두 time.perf_counter_ns() (monotonic) 기준
+# ------------------------------------------------------------
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List
+
+
+class LatencyHistogram:
+    """
+    µs 단위 로그-선형 버킷 히스토그램.
+    - 0 ~ 2^SUB_BITS µs 는 1µs 단위, 그 이상은 2배 구간마다 2^(SUB_BITS-1)개 버킷 (상대오차 약 1.5%)
+    - 최대 2^36 µs (약 19시간), 초과 값은 마지막 버킷에 기록
+    - 버킷 배열 크기 고정 → 기록 O(1), 메모리 일정
+    """
+    SUB_BITS = 6
+    MAX_BITS = 36
+
+    _SUB = 1 << SUB_BITS
+    _HALF = 1 << (SUB_BITS - 1)
+    _SIZE = _SUB + (MAX_BITS + 1 - SUB_BITS) * _HALF
+
+    def __init__(self):
+        self.counts = [0] * self._SIZE
+        self.total = 0
+        self.sum_us = 0
+        self.min_us: int | None = None
+        self.max_us = 0
+
+    @classmethod
+    def _index(cls, us: int) -> int:
+        if us < cls._SUB:
+            return us
+        shift = us.bit_length() - cls.SUB_BITS
+        idx = cls._SUB + (shift - 1) * cls._HALF + ((us >> shift) - cls._HALF)
+        return min(idx, cls._SIZE - 1)
+
+    @classmethod
+    def _value(cls, idx: int) -> int:
+        """버킷 대표값 (구간 중앙, µs)"""
+        if idx < cls._SUB:
+            return idx
+        k = idx - cls._SUB
+        shift = k // cls._HALF + 1
+        sub = k % cls._HALF + cls._HALF
+        return (sub << shift) + ((1 << shift) >> 1)
+
+    def record(self, ns: int) -> None:
+        us = ns // 1000 if ns > 0 else 0
+        self.counts[self._index(us)] += 1
+        self.total += 1
+        self.sum_us += us
+        if self.min_us is None or us < self.min_us:
+            self.min_us = us
+        if us > self.max_us:
+            self.max_us = us
+
+    def percentile(self, p: float) -> float:
+        """p 백분위 값 (ms), 기록 없으면 0.0"""
+        if self.total == 0:
+            return 0.0
+        target = max(1, int(self.total * p / 100.0 + 0.5))
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._value(idx), self.max_us) / 1000.0
+        return self.max_us / 1000.0
+
+    def merge(self, other: LatencyHistogram) -> None:
+        for idx, count in enumerate(other.counts):
+            if count:
+                self.counts[idx] += count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def reset(self) -> None:
+        self.counts = [0] * self._SIZE
+        self.total = 0
+        self.sum_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    def stats(self) -> dict:
+        return {
+            "count": self.total,
+            "mean_ms": round(self.sum_us / self.total / 1000.0, 3) if self.total else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max_us / 1000.0, 3),
+        }
+
+
+class _Span:
+    __slots__ = ("recorder", "stage", "start")
+
+    def __init__(self, recorder: StageRecorder, stage: str):
+        self.recorder = recorder
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.record(self.stage, time.perf_counter_ns() - self.start)
+        return False
+
+
+class StageRecorder:
+    """
+    단계 이름 → LatencyHistogram.
+    - record(stage, ns) : 측정값 기록 (hot path에서는 perf_counter_ns 차이를 직접 넘김)
+    - span(stage)       : with 블록 시간 측정
+    - stats()           : {stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}
+    """
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    def record(self, stage: str, ns: int) -> None:
+        hist = self.histograms.get(stage)
+        if hist is None:
+            hist = self.histograms.setdefault(stage, LatencyHistogram())
+        hist.record(ns)
+
+    def span(self, stage: str) -> _Span:
+        return _Span(self, stage)
+
+    def stats(self) -> Dict[str, dict]:
+        return {stage: hist.stats() for stage, hist in list(self.histograms.items())}
+
+    def reset(self) -> None:
+        for hist in list(self.histograms.values()):
+            hist.reset()
+
+
+class MetricsReporter:
+    """
+    interval 초마다 단계별 p50/p95/p99 로그 1줄 출력 + (json_path 지정 시) JSON 스냅샷 저장.
+    recorders : StageRecorder 또는 name / stats()를 가진 객체 (예: VisionProcess)
+    extra()   : 주어지면 그 dict도 스냅샷에 포함 (예: MotionGate 생략 비율)
+    """
+    LOG_STAGES = ("capture", "preprocess", "inference", "tracking", "callbacks", "drawing", "e2e")
+
+    def __init__(self, recorders: List[StageRecorder], interval: float = 30.0,
+                 json_path: str | None = None, extra: Callable[[], dict] | None = None):
+        self.recorders = recorders
+        self.interval = interval
+        self.json_path = json_path
+        self.extra = extra
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def snapshot(self) -> dict:
+        snap = {
+            "time": datetime.now().isoformat(),
+            "stages": {rec.name: rec.stats() for rec in self.recorders},
+        }
+        if self.extra is not None:
+            snap["extra"] = self.extra()
+        return snap
+
+    def log_line(self, snap: dict | None = None) -> str:
+        snap = snap or self.snapshot()
+        parts = []
+        for name, stages in snap["stages"].items():
+            items = [
+                f"{stage} {s['p50_ms']:.1f}/{s['p95_ms']:.1f}/{s['p99_ms']:.1f}"
+                for stage, s in stages.items() if stage in self.LOG_STAGES and s["count"]
+            ]
+            parts.append(f"{name}: " + ", ".join(items))
+        return "[metrics p50/p95/p99 ms] " + " | ".join(parts)
+
+    def write_json(self, snap: dict | None = None) -> None:
+        if not self.json_path:
+            return
+        snap = snap or self.snapshot()
+        tmp = self.json_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snap, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.json_path)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                snap = self.snapshot()
+                print(self.log_line(snap))
+                self.write_json(snap)
+            except Exception as e:
+                print(f"[metrics] 리포트 오류: {e}")
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="MetricsReporter")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class DecisionLead:
+    """
+    finalize된 객체마다 (ROI 진입 시점 - 판정 준비 시점) 기록.
+    lead_frames >= 0 : ROI 진입 전에 판정 준비 완료 → 진입한 그 주기에 신호 출력
+    lead_frames < 0  : ROI 진입 후 |lead_frames| 추론 프레임이 지나서야 판정 가능 (late)
+    """
+    def __init__(self):
+        self.frames: Dict[int, int] = {}          # lead_frames → 객체 수
+        self.lead_ms = LatencyHistogram()         # 준비 → ROI 진입 여유 시간 (early만)
+        self.late_ms = LatencyHistogram()         # ROI 진입 → 준비 지연 (late만)
+
+    def record(self, lead_frames: int, lead_ns: int) -> None:
+        self.frames[lead_frames] = self.frames.get(lead_frames, 0) + 1
+        if lead_frames >= 0:
+            self.lead_ms.record(lead_ns)
+        else:
+            self.late_ms.record(-lead_ns)
+
+    def stats(self) -> dict:
+        total = sum(self.frames.values())
+        early = sum(n for lead, n in self.frames.items() if lead >= 0)
+        leads = sorted(self.frames.items())
+        return {
+            "decisions": total,
+            "ready_at_roi_entry": early,
+            "late": total - early,
+            "min_lead_frames": leads[0][0] if leads else 0,
+            "lead_frames": {str(lead): n for lead, n in leads},
+            "lead_ms": self.lead_ms.stats(),
+            "late_ms": self.late_ms.stats(),
+        }
+
+    def reset(self) -> None:
+        self.frames = {}
+        self.lead_ms.reset()
+        self.late_ms.reset()
+
+
+# ============================================================
+# capture → PLC ack end-to-end 추적
+# ============================================================
+class FrameTrace:
+    """
+    finalize된 객체 1개가 지나온 경로의 시각 기록 (perf_counter_ns).
+    capture(프레임 수신) → finalize → dispatch(신호 컨트롤러) → plc_ack(PLC 쓰기 완료)
+    perf_counter는 Windows(QPC) / Linux(CLOCK_MONOTONIC) 모두 프로세스 간 공통 시계라
+    워커 프로세스에서 만든 trace도 부모에서 이어서 기록할 수 있다.
+    """
+    __slots__ = ("camera", "object_id", "capture_ns", "marks")
+
+    def __init__(self, camera: str, object_id: int, capture_ns: int):
+        self.camera = camera
+        self.object_id = object_id
+        self.capture_ns = capture_ns
+        self.marks: List[tuple[str, int]] = []
+
+    def mark(self, stage: str, ns: int | None = None) -> None:
+        self.marks.append((stage, ns if ns is not None else time.perf_counter_ns()))
+
+    def elapsed_ms(self) -> float:
+        last = self.marks[-1][1] if self.marks else self.capture_ns
+        return (last - self.capture_ns) / 1e6
+
+    def hops_ms(self) -> Dict[str, float]:
+        """구간별 시간 {stage: 이전 시점 → stage (ms)}"""
+        hops = {}
+        prev = self.capture_ns
+        for stage, ns in self.marks:
+            hops[stage] = round((ns - prev) / 1e6, 3)
+            prev = ns
+        return hops
+
+    def finish(self, tracer: E2ETracer | None = None) -> float:
+        """마지막 구간(PLC ack 등) 기록 후 호출 → E2E 히스토그램에 반영"""
+        return (tracer or e2e_tracer).complete(self)
+
+
+class E2ETracer:
+    """
+    카메라별 capture → PLC ack 히스토그램 + 구간별 히스토그램 + deadline 초과 객체 기록.
+    deadline_ms를 넘긴 객체는 로그로 경고하고 recent_misses에 남긴다.
+    attach(name, recorder) : 해당 카메라 StageRecorder에도 "e2e" 단계로 기록 (MetricsReporter 로그에 표시)
+    """
+    def __init__(self, deadline_ms: float = 500.0, keep_misses: int = 50):
+        self.deadline_ms = deadline_ms
+        self.total = StageRecorder("E2E")        # stage = 카메라 이름
+        self.hops = StageRecorder("E2E-hops")    # stage = "카메라/구간"
+        self.completed = 0
+        self.missed = 0
+        self.recent_misses: deque = deque(maxlen=keep_misses)
+        self._recorders: Dict[str, StageRecorder] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, name: str, recorder: StageRecorder) -> None:
+        self._recorders[name] = recorder
+
+    def complete(self, trace: FrameTrace) -> float:
+        total_ms = trace.elapsed_ms()
+        hops = trace.hops_ms()
+
+        with self._lock:
+            self.total.record(trace.camera, int(total_ms * 1e6))
+            recorder = self._recorders.get(trace.camera)
+            if recorder is not None:
+                recorder.record("e2e", int(total_ms * 1e6))
+            for stage, ms in hops.items():
+                self.hops.record(f"{trace.camera}/{stage}", int(ms * 1e6))
+            self.completed += 1
+            missed = total_ms > self.deadline_ms
+            if missed:
+                self.missed += 1
+                self.recent_misses.append({
+                    "time": datetime.now().isoformat(),
+                    "camera": trace.camera,
+                    "object_id": trace.object_id,
+                    "total_ms": round(total_ms, 3),
+                    "hops_ms": hops,
+                })
+
+        if missed:
+            print(f"[E2E ⚠️] {trace.camera} object {trace.object_id} deadline 초과: "
+                  f"{total_ms:.1f} ms > {self.deadline_ms:.0f} ms {hops}")
+        return total_ms
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "deadline_ms": self.deadline_ms,
+                "completed": self.completed,
+                "missed": self.missed,
+                "total": self.total.stats(),
+                "hops": self.hops.stats(),
+                "recent_misses": list(self.recent_misses),
+            }
+
+
+# 프로세스 공용 기본 tracer (PLC 쓰기 측에서 trace.finish()로 기록)
+e2e_tracer = E2ETracer()
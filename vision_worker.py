@@ -0,0 +1,218 @@
+# vision_worker.py
+# ------------------------------------------------------------
+# 카메라별 VisionAI를 별도 프로세스에서 실행 (GIL 분리)
+#
+#   부모 프로세스                               워커 프로세스 (카메라 1대)
+#   CameraStream ─ 최신 프레임 ─▶ 공유메모리 ───▶ VisionAI.process_frame()
+#   콜백 (Inspector / Logger / 신호 컨트롤러) ◀── Pipe ── DetectionResult 목록
+#
+# 프레임은 공유메모리로 넘기고(pickle 없음), Pipe에는 작은 제어 메시지와
+# finalize된 DetectionResult만 오간다. PLC 콜백은 기존처럼 부모 프로세스에서 호출된다.
+# ------------------------------------------------------------
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, List
+
+import cv2
+import numpy as np
+
+from detector import CameraStream, DetectionResult, VisionAI, draw_roi, draw_tracks
+from vision_metrics import StageRecorder
+
+STATS_INTERVAL = 2.0    # 워커 → 부모 단계별 지연 통계 전달 주기 (초)
+
+
+def _worker_main(cam_id: int, model_path: str, good_list: List[str], bad_list: List[str],
+                 conn, show: bool, display_fps: float | None, vision_kwargs: dict) -> None:
+    """워커 프로세스 진입점 — 메시지: ("shm", name, shape) / ("frame", seq, capture_ns) / ("stop",)"""
+    # 화면 합성은 VisionAI가 매 프레임 하지 않고, 표시 주기가 된 프레임에서만 아래에서 직접 수행
+    vision = VisionAI(model_path, good_list=good_list, bad_list=bad_list, render=False, **vision_kwargs)
+    results: List[DetectionResult] = []
+    vision.register_callback(results.append)
+
+    shm = None
+    frame = None
+    last_stats = time.monotonic()
+    display_interval = 1.0 / display_fps if display_fps else 0.0
+    last_display = 0.0
+    conn.send(("ready",))
+
+    try:
+        while True:
+            msg = conn.recv()
+
+            if msg[0] == "stop":
+                break
+
+            if msg[0] == "shm":
+                if shm is not None:
+                    shm.close()
+                _, name, shape = msg
+                shm = shared_memory.SharedMemory(name=name)
+                if os.name == "posix":
+                    # 워커는 attach만 함 — 해제(unlink)는 부모 담당이므로 tracker 등록 해제
+                    resource_tracker.unregister(shm._name, "shared_memory")
+                frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+                continue
+
+            if msg[0] == "frame":
+                key = -1
+                error = None
+                try:
+                    # 부모는 "done"을 받기 전까지 공유메모리를 덮어쓰지 않으므로 복사 없이 사용
+                    vision.process_frame(frame, msg[2])
+                    if show and time.monotonic() - last_display >= display_interval:
+                        # display_fps 주기마다 1회만 복사 / 그리기 / imshow (DisplayThread와 같은 방식)
+                        last_display = time.monotonic()
+                        t0 = time.perf_counter_ns()
+                        disp = frame.copy()
+                        draw_roi(disp, vision.roi)
+                        draw_tracks(disp, vision.snapshot())
+                        vision.metrics.record("drawing", time.perf_counter_ns() - t0)
+                        cv2.imshow(f"CAM{cam_id}", disp)
+                        key = cv2.waitKey(1)
+                except Exception as e:
+                    error = str(e)
+
+                stats = None
+                if time.monotonic() - last_stats >= STATS_INTERVAL:
+                    stats = (vision.latency_stats(), vision.decision_stats())
+                    last_stats = time.monotonic()
+
+                conn.send(("done", msg[1], results[:], key, error, stats))
+                results.clear()
+    finally:
+        if show:
+            cv2.destroyAllWindows()
+        if shm is not None:
+            shm.close()
+
+
+class VisionProcess:
+    """
+    카메라 1대 = 워커 프로세스 1개.
+    - register_callback(fn) : 부모 프로세스에서 DetectionResult를 받을 콜백 (VisionAI와 동일)
+    - start(cam)            : 워커 실행 + 프레임 전달 스레드 시작
+    - stop()                : 워커 종료 / 공유메모리 해제
+    - stats()               : 부모 측 단계(capture 등) + 워커가 주기적으로 보내는 단계별 지연 통계
+    - decision_stats()      : 워커가 보내는 판정 준비 시점 vs ROI 진입 통계
+    show=False면 워커는 그리기 / imshow를 전혀 하지 않고, True면 최대 display_fps로만 화면 갱신
+    (None이면 매 프레임). vision_kwargs는 워커 안에서 VisionAI(...)에 그대로 전달된다 (pickle 가능해야 함).
+    """
+    def __init__(self, cam_id: int, model_path: str, good_list: List[str], bad_list: List[str],
+                 show: bool = True, metrics: StageRecorder | None = None,
+                 display_fps: float | None = 15.0, **vision_kwargs):
+        self.cam_id = cam_id
+        self.name = f"CAM{cam_id}"
+        self.callbacks: List[Callable[[DetectionResult], None]] = []
+        self.running = False
+        self.metrics = metrics if metrics is not None else StageRecorder(self.name)
+        self._worker_stats: dict = {}
+        self._decision_stats: dict = {}
+
+        self.conn, child_conn = mp.Pipe()
+        self.process = mp.Process(
+            target=_worker_main,
+            args=(cam_id, model_path, good_list, bad_list, child_conn, show, display_fps, vision_kwargs),
+            daemon=True,
+            name=f"Vision-CAM{cam_id}",
+        )
+
+        self.shm: shared_memory.SharedMemory | None = None
+        self.frame: np.ndarray | None = None
+        self._thread: threading.Thread | None = None
+
+    def register_callback(self, fn: Callable[[DetectionResult], None]) -> None:
+        self.callbacks.append(fn)
+
+    def stats(self) -> dict:
+        return {**self.metrics.stats(), **self._worker_stats}
+
+    latency_stats = stats
+
+    def decision_stats(self) -> dict:
+        """워커 VisionAI의 판정 준비 시점 vs ROI 진입 통계 (주기적으로 전달받은 값)"""
+        return self._decision_stats
+
+    def _ensure_shm(self, frame: np.ndarray) -> None:
+        """첫 프레임(또는 해상도 변경) 시 공유메모리 생성 후 워커에 알림"""
+        if self.frame is not None and self.frame.shape == frame.shape:
+            return
+        self._release_shm()
+        self.shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        self.frame = np.ndarray(frame.shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.conn.send(("shm", self.shm.name, frame.shape))
+
+    def _release_shm(self) -> None:
+        if self.shm is None:
+            return
+        self.frame = None
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+
+    def _dispatch(self, results: List[DetectionResult]) -> None:
+        for r in results:
+            for cb in self.callbacks:
+                try:
+                    cb(r)
+                except Exception as e:
+                    print(f"Vision callback error (CAM{self.cam_id}): {e}")
+
+    def _feed_loop(self, cam: CameraStream) -> None:
+        seq = 0
+        try:
+            # 모델 로딩 완료 대기
+            self.conn.recv()
+
+            while self.running:
+                seq, frame = cam.read_latest(self.cam_id, seq, timeout=0.5)
+                if frame is None:
+                    continue
+
+                self._ensure_shm(frame)
+                np.copyto(self.frame, frame)
+                self.conn.send(("frame", seq, cam.capture_ns(self.cam_id)))
+
+                # 워커가 처리하는 동안 이 스레드는 recv()에서 GIL 없이 대기
+                _, _, results, key, error, stats = self.conn.recv()
+                if error:
+                    print(f"[Vision CAM{self.cam_id}] 처리 오류: {error}")
+                if stats is not None:
+                    self._worker_stats, self._decision_stats = stats
+
+                t0 = time.perf_counter_ns()
+                self._dispatch(results)
+                if results:
+                    self.metrics.record("callbacks", time.perf_counter_ns() - t0)
+
+                if key == 27:   # 워커 화면에서 ESC
+                    self.running = False
+        except (EOFError, OSError) as e:
+            print(f"[Vision CAM{self.cam_id}] 워커 연결 종료: {e}")
+            self.running = False
+
+    def start(self, cam: CameraStream) -> None:
+        self.running = True
+        self.process.start()
+        self._thread = threading.Thread(target=self._feed_loop, args=(cam,), daemon=True,
+                                        name=f"VisionFeed-CAM{self.cam_id}")
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        try:
+            self.conn.send(("stop",))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._release_shm()